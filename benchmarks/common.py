@@ -0,0 +1,74 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from statistics import mean
+from typing import Dict, List
+
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCHMARKS_DIR)
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+# Os benchmarks importam o pacote app direto de src/, como os scripts de carga
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    # Interpolação linear entre os vizinhos (mesmo método do numpy por padrão)
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_summary(samples_ms: List[float]) -> Dict[str, float]:
+    return {
+        "samples": len(samples_ms),
+        "mean_ms": round(mean(samples_ms), 3) if samples_ms else 0.0,
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "max_ms": round(max(samples_ms), 3) if samples_ms else 0.0,
+    }
+
+
+def git_revision() -> Dict[str, str]:
+    def _git(*args: str) -> str:
+        try:
+            return subprocess.check_output(
+                ["git", *args], cwd=PROJECT_ROOT, stderr=subprocess.DEVNULL, text=True
+            ).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "branch": _git("rev-parse", "--abbrev-ref", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+def environment_info() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(name: str, payload: dict, output_dir: str = RESULTS_DIR) -> str:
+
+    os.makedirs(output_dir, exist_ok=True)
+    revision = payload.get("revision", {}).get("commit", "")[:10] or "nogit"
+    path = os.path.join(output_dir, f"{name}-{datetime.now():%Y%m%d-%H%M%S}-{revision}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False, default=str)
+    return path
@@ -0,0 +1,66 @@
+"""
+Compara dois resultados de benchmark (JSON) e aponta regressões.
+
+    python benchmarks/compare_results.py base.json novo.json --threshold 10
+
+Sai com código 1 se alguma métrica piorar mais que --threshold por cento.
+"""
+import argparse
+import json
+import sys
+from typing import Dict
+
+
+# Métricas em que "maior é melhor"; para o resto (tempos, memória), menor é melhor
+HIGHER_IS_BETTER = ("per_second",)
+# Campos numéricos que são parâmetros/contagens, não desempenho
+IGNORED = ("parameters", "revision", "environment", "fake_server", "window", "samples",
+           "territories", "se", "weeks", "concurrency", "geocodes", "rows_written", "errors")
+
+
+def flatten(data, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key in IGNORED:
+                continue
+            flat.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        flat[prefix.rstrip(".")] = float(data)
+    return flat
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compara resultados de benchmark")
+    parser.add_argument("base")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regressão máxima tolerada (%%)")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = flatten(json.load(f))
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = flatten(json.load(f))
+
+    regressions = 0
+    print(f"{'métrica':55} {'base':>12} {'novo':>12} {'delta':>9}")
+    for key in sorted(base.keys() & candidate.keys()):
+        old, new = base[key], candidate[key]
+        if old == 0:
+            continue
+        change = (new - old) / old * 100
+        worse = -change if key.endswith(HIGHER_IS_BETTER) else change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  <-- REGRESSÃO"
+            regressions += 1
+        print(f"{key:55} {old:12.3f} {new:12.3f} {change:+8.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{regressions} métrica(s) pioraram mais de {args.threshold}%.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
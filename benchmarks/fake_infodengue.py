@@ -0,0 +1,189 @@
+"""
+Servidor fake da API AlertCity do InfoDengue, para benchmarks locais.
+
+Gera payloads determinísticos (mesmo geocode + SE = mesmos números) com
+latência e taxa de erros configuráveis. Qualquer geocode é aceito, então
+funciona com os 5.570 municípios reais ou com territórios sintéticos.
+
+Uso standalone:
+    python benchmarks/fake_infodengue.py --port 8765 --latency-ms 80 --error-rate 0.01
+e então INFODENGUE_API_URL=http://127.0.0.1:8765/api/alertcity/
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+from datetime import datetime, timezone
+from typing import List
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+import common  # noqa: F401  (coloca src/ no sys.path para o calendário de SEs do app)
+from app.core.epiweek import epiweek_start, se_range, split_se
+
+
+def iter_window(ew_start: int, ey_start: int, ew_end: int, ey_end: int):
+    for se in se_range(ey_start * 100 + ew_start, ey_end * 100 + ew_end):
+        yield split_se(se)
+
+
+def _city_profile(geocode: str) -> dict:
+    # Características estáveis por município: população e sazonalidade
+    rng = random.Random(f"city-{geocode}")
+    population = int(math.exp(rng.uniform(math.log(800), math.log(12_000_000))))
+    return {
+        "population": population,
+        "base_rate": rng.uniform(0.5, 40.0),   # casos por 100k/semana fora do pico
+        "peak_week": rng.randint(8, 20),
+        "amplitude": rng.uniform(1.5, 12.0),
+    }
+
+
+def generate_city_payload(geocode: str, window: dict) -> List[dict]:
+
+    profile = _city_profile(geocode)
+    population = profile["population"]
+    rows = []
+    for year, week in iter_window(window["ew_start"], window["ey_start"], window["ew_end"], window["ey_end"]):
+        rng = random.Random(f"{geocode}-{year}-{week}")
+        seasonal = 1 + profile["amplitude"] * math.exp(-((week - profile["peak_week"]) ** 2) / 60)
+        expected = profile["base_rate"] * seasonal * population / 100_000
+        cases = max(0, int(rng.gauss(expected, math.sqrt(expected + 1))))
+        estimated = cases * rng.uniform(1.0, 1.4)
+        incidence = cases / population * 100_000
+        level = 1 if incidence < 10 else 2 if incidence < 50 else 3 if incidence < 300 else 4
+        start = epiweek_start(year, week)
+        start_ms = int(datetime(start.year, start.month, start.day, tzinfo=timezone.utc).timestamp() * 1000)
+
+        rows.append({
+            "data_iniSE": start_ms,
+            "SE": year * 100 + week,
+            "casos_est": round(estimated, 1),
+            "casos_est_min": int(estimated * 0.8),
+            "casos_est_max": int(estimated * 1.3) + 1,
+            "casos": cases,
+            "municipio_geocodigo": int(geocode),
+            "p_rt1": round(rng.random(), 4),
+            "p_inc100k": round(incidence, 3),
+            "Localidade_id": 0,
+            "nivel": level,
+            "id": int(f"{geocode}{year}{week:02d}"),
+            "versao_modelo": "2025-01-01",
+            "tweet": None,
+            "Rt": round(rng.uniform(0.4, 2.2), 4),
+            "pop": float(population),
+            "tempmin": round(rng.uniform(14, 24), 2),
+            "umidmax": round(rng.uniform(70, 98), 2),
+            "receptivo": rng.randint(0, 3),
+            "transmissao": rng.randint(0, 3),
+            "nivel_inc": rng.randint(0, 2),
+            "umidmed": round(rng.uniform(55, 85), 2),
+            "umidmin": round(rng.uniform(30, 60), 2),
+            "tempmed": round(rng.uniform(20, 29), 2),
+            "tempmax": round(rng.uniform(26, 36), 2),
+            "casprov": cases,
+            "casprov_est": None,
+            "casprov_est_min": None,
+            "casprov_est_max": None,
+            "casconf": None,
+            "notif_accum_year": cases * week,
+        })
+    # A API real devolve as semanas mais recentes primeiro
+    rows.reverse()
+    return rows
+
+
+def create_app(latency_ms: float = 50.0, jitter_ms: float = 25.0,
+               error_rate: float = 0.0, not_found_rate: float = 0.0, seed: int = 42) -> Starlette:
+
+    rng = random.Random(seed)
+    stats = {"requests": 0, "errors": 0, "not_found": 0}
+
+    async def alertcity(request: Request) -> Response:
+        stats["requests"] += 1
+        params = request.query_params
+        delay = max(0.0, rng.gauss(latency_ms, jitter_ms)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+
+        roll = rng.random()
+        if roll < error_rate:
+            stats["errors"] += 1
+            return Response("upstream error", status_code=500)
+        if roll < error_rate + not_found_rate:
+            stats["not_found"] += 1
+            return Response("not found", status_code=404)
+
+        try:
+            window = {k: int(params[k]) for k in ("ew_start", "ey_start", "ew_end", "ey_end")}
+            geocode = params["geocode"]
+        except (KeyError, ValueError):
+            return Response("parâmetros inválidos", status_code=400)
+
+        body = json.dumps(generate_city_payload(geocode, window))
+        return Response(body, media_type="application/json")
+
+    async def fake_stats(request: Request) -> Response:
+        return Response(json.dumps(stats), media_type="application/json")
+
+    app = Starlette(routes=[
+        Route("/api/alertcity/", alertcity),
+        Route("/_stats", fake_stats),
+    ])
+    app.state.stats = stats
+    return app
+
+
+class FakeInfoDengueServer:
+    # Sobe o app fake com uvicorn no mesmo event loop do benchmark
+
+    def __init__(self, app: Starlette, host: str = "127.0.0.1", port: int = 8765):
+        import uvicorn
+
+        self.host = host
+        self.port = port
+        self.app = app
+        self._server = uvicorn.Server(uvicorn.Config(
+            app, host=host, port=port, log_level="warning", access_log=False,
+            # backlog alto: o sync abre até CONCURRENT_REQUESTS_LIMIT conexões simultâneas
+            backlog=4096, limit_concurrency=None,
+        ))
+        self._task = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/alertcity/"
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._server.serve())
+        while not self._server.started:
+            if self._task.done():
+                self._task.result()
+            await asyncio.sleep(0.05)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.should_exit = True
+        await self._task
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servidor fake da API AlertCity (InfoDengue)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=25.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--not-found-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.not_found_rate),
+        host=args.host, port=args.port, log_level="warning",
+    )
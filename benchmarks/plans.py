@@ -0,0 +1,64 @@
+"""
+EXPLAIN (ANALYZE, BUFFERS) das queries de leitura (app/services/report_queries.py).
+
+Usado pelo teste de escala e pela verificação de planos (plan_check.py).
+"""
+import json
+from typing import Dict, List
+
+
+def plan_nodes(plan: dict) -> List[dict]:
+    nodes = [{
+        "node": plan.get("Node Type"),
+        "relation": plan.get("Relation Name"),
+        "index": plan.get("Index Name"),
+        # Actual Rows é a média por execução do nó; o total lido é rows * loops
+        "rows": plan.get("Actual Rows"),
+        "loops": plan.get("Actual Loops"),
+        "filtered": plan.get("Rows Removed by Filter"),
+        "heap_fetches": plan.get("Heap Fetches"),
+    }]
+    for child in plan.get("Plans", []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+
+async def explain(session, stmt) -> dict:
+
+    from sqlalchemy import text
+    from sqlalchemy.dialects import postgresql
+
+    # Literais no SQL: o planner enxerga os valores (e poda as partições) como em produção
+    sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    result = await session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"))
+    raw = result.scalar()
+    document = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+    plan = document["Plan"]
+    nodes = plan_nodes(plan)
+    return {
+        "execution_ms": document.get("Execution Time"),
+        "planning_ms": document.get("Planning Time"),
+        "shared_hit_blocks": plan.get("Shared Hit Blocks"),
+        "shared_read_blocks": plan.get("Shared Read Blocks"),
+        "seq_scans": [n["relation"] for n in nodes if n["node"] == "Seq Scan"],
+        "nodes": nodes,
+    }
+
+
+def query_cases(se: int, state_code: int, geocode: str) -> Dict[str, object]:
+
+    from app.services import report_queries as q
+
+    return {
+        "reports_latest": q.reports_list_query(limit=100),
+        "reports_by_se": q.reports_list_query(se=se, limit=100),
+        "reports_by_geocode": q.reports_list_query(geocode=geocode, limit=100),
+        "reports_by_state_range": q.reports_list_query(state_code=state_code, se_start=se - 4, se_end=se),
+        "by_state": q.state_aggregation_query(se),
+        "map_choropleth": q.choropleth_query(se),
+        "map_city": q.city_map_query(se, state_code),
+        "by_state_incidence": q.state_metric_query(se, "incidence"),
+        "map_city_growth": q.city_map_query(se, state_code, "growth_rate"),
+        "tile_data": q.tile_data_query(se),
+        "dashboard_ses": q.available_ses_query(),
+    }
@@ -31,12 +31,22 @@ if not config.get_main_option("sqlalchemy.url"):
 
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Partições anuais de weekly_reports são criadas em runtime (services/partitions.py),
+    # não pelo autogenerate
+    if type_ == "table" and reflected and compare_to is None and name.startswith("weekly_reports_"):
+        return False
+    return True
+
+
 def run_migrations_offline() -> None:
     
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -47,7 +57,7 @@ def run_migrations_offline() -> None:
 
 def do_run_migrations(connection: Connection) -> None:
     
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
 
     with context.begin_transaction():
         context.run_migrations()
@@ -0,0 +1,32 @@
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+revision: str = '3f9c2a7d1b4e'
+down_revision: Union[str, Sequence[str], None] = '12685d2fd5cf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    
+    
+    op.create_table('scheduler_leases',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('holder', sa.String(length=255), nullable=False, comment='Identificador do processo líder (host:pid)'),
+    sa.Column('acquired_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    
+
+
+def downgrade() -> None:
+    
+    
+    op.drop_table('scheduler_leases')
+    
@@ -0,0 +1,29 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+revision: str = '5b2e8d1f4a67'
+down_revision: Union[str, Sequence[str], None] = 'c7e1d4a2f985'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+
+
+    # Rodízio dos municípios quietos: cada run que pula quietos recebe a fatia seguinte à do
+    # último run bem-sucedido (o id do run é compartilhado com api/backfill e não serve de contador)
+    op.add_column('sync_runs', sa.Column(
+        'quiet_slot', sa.Integer(), nullable=True,
+        comment='Fatia de municípios quietos atualizada pelo run (NULL = run sem rodízio)'
+    ))
+
+
+
+def downgrade() -> None:
+
+
+    op.drop_column('sync_runs', 'quiet_slot')
@@ -0,0 +1,49 @@
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+revision: str = '8a1d4e6f2c90'
+down_revision: Union[str, Sequence[str], None] = '3f9c2a7d1b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    
+    
+    op.create_table('sync_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('trigger', sa.String(length=20), nullable=False, comment='Origem: scheduled, api, api_wait, backfill'),
+    sa.Column('status', sa.String(length=20), nullable=False, comment='running, success, failed'),
+    sa.Column('host', sa.String(length=255), nullable=True),
+    sa.Column('ew_start', sa.Integer(), nullable=True),
+    sa.Column('ey_start', sa.Integer(), nullable=True),
+    sa.Column('ew_end', sa.Integer(), nullable=True),
+    sa.Column('ey_end', sa.Integer(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('fetch_seconds', sa.Float(), nullable=True),
+    sa.Column('parse_seconds', sa.Float(), nullable=True),
+    sa.Column('upsert_seconds', sa.Float(), nullable=True),
+    sa.Column('inserted', sa.Integer(), nullable=True),
+    sa.Column('updated', sa.Integer(), nullable=True),
+    sa.Column('geocodes_synced', sa.Integer(), nullable=True),
+    sa.Column('geocodes_failed', sa.Integer(), nullable=True),
+    sa.Column('concurrency', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sync_runs_status'), 'sync_runs', ['status'], unique=False)
+    
+
+
+def downgrade() -> None:
+    
+    
+    op.drop_index(op.f('ix_sync_runs_status'), table_name='sync_runs')
+    op.drop_table('sync_runs')
+    
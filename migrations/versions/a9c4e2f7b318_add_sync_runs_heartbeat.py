@@ -0,0 +1,30 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+revision: str = 'a9c4e2f7b318'
+down_revision: Union[str, Sequence[str], None] = 'e4b8f1c7a2d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+
+
+    # Renovado pelo processo que executa (ou aguarda o lock de execução) e pelos consumidores
+    # da fila; o coordenador expira runs ativos por este campo, e não por started_at
+    op.add_column('sync_runs', sa.Column(
+        'heartbeat_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False,
+        comment='Último sinal de vida de quem executa o run'
+    ))
+    op.execute("UPDATE sync_runs SET heartbeat_at = COALESCE(finished_at, started_at)")
+
+
+
+def downgrade() -> None:
+
+
+    op.drop_column('sync_runs', 'heartbeat_at')
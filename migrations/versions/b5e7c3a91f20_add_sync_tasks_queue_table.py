@@ -0,0 +1,51 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+
+revision: str = 'b5e7c3a91f20'
+down_revision: Union[str, Sequence[str], None] = '8a1d4e6f2c90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    
+    
+    op.create_table('sync_tasks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('run_id', sa.Integer(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False, comment='Posição do shard na ordem de prioridade do run'),
+    sa.Column('geocodes', postgresql.ARRAY(sa.String(length=7)), nullable=False),
+    sa.Column('status', sa.String(length=20), server_default='pending', nullable=False, comment='pending, claimed, done, failed'),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('claimed_by', sa.String(length=255), nullable=True),
+    sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('visible_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='Claim expira aqui (visibility timeout): o shard volta a ser elegível'),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('inserted', sa.Integer(), nullable=True),
+    sa.Column('updated', sa.Integer(), nullable=True),
+    sa.Column('geocodes_failed', sa.Integer(), nullable=True),
+    sa.Column('ses', postgresql.ARRAY(sa.Integer()), nullable=True),
+    sa.Column('fetch_seconds', sa.Float(), nullable=True),
+    sa.Column('parse_seconds', sa.Float(), nullable=True),
+    sa.Column('upsert_seconds', sa.Float(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['run_id'], ['sync_runs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sync_tasks_run_id'), 'sync_tasks', ['run_id'], unique=False)
+    op.create_index('idx_sync_tasks_claimable', 'sync_tasks', ['id'], unique=False,
+                    postgresql_where=sa.text("status IN ('pending', 'claimed')"))
+    
+
+
+def downgrade() -> None:
+    
+    
+    op.drop_index('idx_sync_tasks_claimable', table_name='sync_tasks', postgresql_where=sa.text("status IN ('pending', 'claimed')"))
+    op.drop_index(op.f('ix_sync_tasks_run_id'), table_name='sync_tasks')
+    op.drop_table('sync_tasks')
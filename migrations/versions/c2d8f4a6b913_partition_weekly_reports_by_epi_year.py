@@ -0,0 +1,109 @@
+
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+revision: str = 'c2d8f4a6b913'
+down_revision: Union[str, Sequence[str], None] = 'b5e7c3a91f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = (
+    "id, se, geocode, data_ini_se, reported_cases, estimated_cases, estimated_cases_min, "
+    "estimated_cases_max, alert_level, population, rt_value, last_synced_at"
+)
+
+INDEXES = (
+    ('idx_report_se_level', ['se', 'alert_level']),
+    ('ix_weekly_reports_alert_level', ['alert_level']),
+    ('ix_weekly_reports_geocode', ['geocode']),
+    ('ix_weekly_reports_se', ['se']),
+)
+
+
+def _weekly_reports_columns():
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('weekly_reports_id_seq')"), nullable=False),
+        sa.Column('se', sa.Integer(), nullable=False, comment='Semana Epidemiológica (ex: 202544)'),
+        sa.Column('geocode', sa.String(length=7), nullable=False),
+        sa.Column('data_ini_se', sa.Date(), nullable=False, comment='Data de início da SE'),
+        sa.Column('reported_cases', sa.Integer(), nullable=True),
+        sa.Column('estimated_cases', sa.Float(), nullable=True),
+        sa.Column('estimated_cases_min', sa.Integer(), nullable=True),
+        sa.Column('estimated_cases_max', sa.Integer(), nullable=True),
+        sa.Column('alert_level', sa.Integer(), nullable=True),
+        sa.Column('population', sa.Float(), nullable=True),
+        sa.Column('rt_value', sa.Float(), nullable=True),
+        sa.Column('last_synced_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['geocode'], ['territories.geocode'], ),
+    ]
+
+
+def _detach_legacy_table(legacy: str, pkey: str) -> None:
+    # Libera nomes de tabela, constraints, índices e a sequence para a nova tabela
+    op.rename_table('weekly_reports', legacy)
+    op.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {pkey} TO {legacy}_pkey")
+    op.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT uq_geocode_se_report TO {legacy}_uq_geocode_se")
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name=legacy)
+    op.execute("ALTER SEQUENCE weekly_reports_id_seq OWNED BY NONE")
+
+
+def _finish_new_table(legacy: str) -> None:
+    op.execute("ALTER SEQUENCE weekly_reports_id_seq OWNED BY weekly_reports.id")
+    for name, columns in INDEXES:
+        op.create_index(name, 'weekly_reports', columns, unique=False)
+    op.execute(f"INSERT INTO weekly_reports ({COLUMNS}) SELECT {COLUMNS} FROM {legacy}")
+    op.drop_table(legacy)
+    op.execute("ANALYZE weekly_reports")
+
+
+def upgrade() -> None:
+
+
+    bind = op.get_bind()
+    first_year, last_year = bind.execute(
+        sa.text("SELECT min(se) / 100, max(se) / 100 FROM weekly_reports")
+    ).one()
+    current_year = datetime.now().year
+
+    _detach_legacy_table('weekly_reports_legacy', 'weekly_reports_pkey')
+
+    # PK e unique precisam incluir a chave de partição (se)
+    op.create_table('weekly_reports',
+    *_weekly_reports_columns(),
+    sa.PrimaryKeyConstraint('id', 'se', name='weekly_reports_pkey'),
+    sa.UniqueConstraint('geocode', 'se', name='uq_geocode_se_report'),
+    postgresql_partition_by='RANGE (se)'
+    )
+
+    # Uma partição por ano epidemiológico: do dado mais antigo até o ano seguinte ao corrente
+    years = range(min(first_year or current_year, current_year), max(last_year or 0, current_year + 1) + 1)
+    for year in years:
+        op.execute(
+            f"CREATE TABLE weekly_reports_{year} PARTITION OF weekly_reports "
+            f"FOR VALUES FROM ({year * 100}) TO ({(year + 1) * 100})"
+        )
+
+    _finish_new_table('weekly_reports_legacy')
+
+
+
+def downgrade() -> None:
+
+
+    _detach_legacy_table('weekly_reports_partitioned', 'weekly_reports_pkey')
+
+    op.create_table('weekly_reports',
+    *_weekly_reports_columns(),
+    sa.PrimaryKeyConstraint('id', name='weekly_reports_pkey'),
+    sa.UniqueConstraint('geocode', 'se', name='uq_geocode_se_report')
+    )
+
+    # DROP da tabela particionada remove também todas as partições
+    _finish_new_table('weekly_reports_partitioned')
@@ -0,0 +1,65 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+revision: str = 'c7e1d4a2f985'
+down_revision: Union[str, Sequence[str], None] = 'a9c4e2f7b318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Mesmas fórmulas de services/derived_metrics.compute_metrics, em SQL: a SE anterior é a
+# semana cujo domingo fica 7 dias antes (calendário epidemiológico, atravessa a virada do
+# ano); semana ausente ou sem casos vira NULL e propaga nas médias móveis.
+BACKFILL_METRICS_SQL = """
+WITH r AS (
+    SELECT
+        geocode, se, reported_cases::float8 AS cases,
+        CASE WHEN population > 0 THEN reported_cases / population * 100000 END AS incidence,
+        make_date(se / 100, 1, 4) - EXTRACT(DOW FROM make_date(se / 100, 1, 4))::int
+            + 7 * (se % 100 - 1) AS week_start
+    FROM weekly_reports
+    WHERE reported_cases IS NOT NULL
+)
+INSERT INTO weekly_report_metrics (se, geocode, incidence, growth_rate, cases_ma3, incidence_ma3)
+SELECT
+    r0.se,
+    r0.geocode,
+    r0.incidence,
+    CASE WHEN r1.cases > 0 THEN (r0.cases - r1.cases) / r1.cases END,
+    (r0.cases + r1.cases + r2.cases) / 3,
+    (r0.incidence + r1.incidence + r2.incidence) / 3
+FROM r r0
+LEFT JOIN r r1 ON r1.geocode = r0.geocode AND r1.week_start = r0.week_start - 7
+LEFT JOIN r r2 ON r2.geocode = r0.geocode AND r2.week_start = r0.week_start - 14
+ON CONFLICT (se, geocode) DO UPDATE SET
+    incidence = EXCLUDED.incidence,
+    growth_rate = EXCLUDED.growth_rate,
+    cases_ma3 = EXCLUDED.cases_ma3,
+    incidence_ma3 = EXCLUDED.incidence_ma3,
+    computed_at = now()
+"""
+
+
+def upgrade() -> None:
+
+
+    # Tempo das métricas derivadas, separado de upsert_seconds
+    op.add_column('sync_runs', sa.Column('derive_seconds', sa.Float(), nullable=True))
+    op.add_column('sync_tasks', sa.Column('derive_seconds', sa.Float(), nullable=True))
+
+    # weekly_report_metrics (e4b8f1c7a2d6) só é preenchida pelo sync; o histórico já carregado
+    # é calculado aqui. Em bases grandes, rebuild_derived_metrics.py faz o mesmo em blocos.
+    op.execute(BACKFILL_METRICS_SQL)
+    op.execute("ANALYZE weekly_report_metrics")
+
+
+
+def downgrade() -> None:
+
+
+    op.drop_column('sync_tasks', 'derive_seconds')
+    op.drop_column('sync_runs', 'derive_seconds')
@@ -0,0 +1,40 @@
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+
+revision: str = 'd7a3e9c15b42'
+down_revision: Union[str, Sequence[str], None] = 'c2d8f4a6b913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+
+
+    # Redundantes: geocode é prefixo de uq_geocode_se_report, se é prefixo do índice
+    # coberto abaixo, e nenhuma query filtra só por alert_level
+    op.drop_index('ix_weekly_reports_geocode', table_name='weekly_reports')
+    op.drop_index('ix_weekly_reports_se', table_name='weekly_reports')
+    op.drop_index('ix_weekly_reports_alert_level', table_name='weekly_reports')
+    op.drop_index('idx_report_se_level', table_name='weekly_reports')
+
+    # Mapa, tiles e agregação por UF filtram por se e leem só estas colunas (index-only scan);
+    # a listagem de /reports ordena por (se DESC, geocode) e usa o mesmo índice de trás para frente
+    op.create_index('idx_report_se_geocode_covering', 'weekly_reports', ['se', 'geocode'], unique=False,
+                    postgresql_include=['alert_level', 'reported_cases', 'population'])
+
+    op.execute("ANALYZE weekly_reports")
+
+
+
+def downgrade() -> None:
+
+
+    op.drop_index('idx_report_se_geocode_covering', table_name='weekly_reports')
+    op.create_index('idx_report_se_level', 'weekly_reports', ['se', 'alert_level'], unique=False)
+    op.create_index(op.f('ix_weekly_reports_alert_level'), 'weekly_reports', ['alert_level'], unique=False)
+    op.create_index(op.f('ix_weekly_reports_geocode'), 'weekly_reports', ['geocode'], unique=False)
+    op.create_index(op.f('ix_weekly_reports_se'), 'weekly_reports', ['se'], unique=False)
@@ -0,0 +1,37 @@
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+revision: str = 'e4b8f1c7a2d6'
+down_revision: Union[str, Sequence[str], None] = 'd7a3e9c15b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+
+
+    # Preenchida pelo sync a cada upsert; para o histórico já carregado rode
+    # src/app/scripts/rebuild_derived_metrics.py depois da migração
+    op.create_table('weekly_report_metrics',
+    sa.Column('se', sa.Integer(), nullable=False),
+    sa.Column('geocode', sa.String(length=7), nullable=False),
+    sa.Column('incidence', sa.Float(), nullable=True, comment='Casos notificados por 100 mil habitantes'),
+    sa.Column('growth_rate', sa.Float(), nullable=True, comment='Variação relativa dos casos sobre a SE anterior (0.25 = +25%)'),
+    sa.Column('cases_ma3', sa.Float(), nullable=True, comment='Média móvel de 3 semanas dos casos notificados'),
+    sa.Column('incidence_ma3', sa.Float(), nullable=True, comment='Média móvel de 3 semanas da incidência'),
+    sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['geocode'], ['territories.geocode'], ),
+    sa.PrimaryKeyConstraint('se', 'geocode')
+    )
+
+
+
+def downgrade() -> None:
+
+
+    op.drop_table('weekly_report_metrics')
@@ -3,8 +3,14 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import text 
 
-from app.db.session import get_db
-from app.core.scheduler import job_status, scheduler
+from app.db.session import get_read_db, read_engine
+from app.db.read_routing import read_replica_status, release_read_session
+from app.core.scheduler import scheduler
+from app.core.leader import SYNC_LEASE_NAME, INSTANCE_ID, get_lease_status
+from app.services.render_pool import render_pool_stats
+from app.services.territory_registry import territory_registry
+from app.services.sync_runs import get_latest_sync_run
+from app.schemas.sync import SyncRunPublic
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -13,7 +19,7 @@ router = APIRouter()
     "/health", 
     summary="Verifica a saúde da aplicação, DB e Scheduler"
 )
-async def health_check(db: AsyncSession = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_read_db)):
     
     
     
@@ -27,10 +33,27 @@ async def health_check(db: AsyncSession = Depends(get_db)):
 
     
     scheduler_running = scheduler.running
+
+    # Status compartilhado entre todos os workers (lease no banco)
+    try:
+        sync_leader = await get_lease_status(db, SYNC_LEASE_NAME)
+        latest_run = await get_latest_sync_run(db)
+        last_sync_run = SyncRunPublic.model_validate(latest_run) if latest_run else None
+    except Exception as e:
+        logger.error(f"Health check: Falha ao ler status do sync: {e}")
+        await db.rollback()
+        sync_leader = None
+        last_sync_run = None
+    await release_read_session(db)
     
     return {
         "status": "ok",
         "database_status": db_status,
         "scheduler_status": "running" if scheduler_running else "stopped",
-        "last_sync_job": job_status
+        "instance_id": INSTANCE_ID,
+        "sync_leader": sync_leader,
+        "last_sync_run": last_sync_run,
+        "render_pool": render_pool_stats,
+        "read_replica": read_replica_status(read_engine is not None),
+        "territory_registry": territory_registry.stats(),
     }
\ No newline at end of file
@@ -1,39 +1,95 @@
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import HTMLResponse
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import HTMLResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
 
-from app.db.session import get_db
-from app.models.models import WeeklyReport
-from app.services.map_service import generate_choropleth_map, generate_city_map
+from app.db.session import get_read_db
+from app.db.read_routing import release_read_session
+from app.core.config import settings
+from app.core.epiweek import se_label
+from app.services.map_service import render_map, MAP_METRICS
+from app.services.render_pool import RenderQueueFullError
+from app.services.map_artifacts import read_map_artifact
+from app.services.geo_store import available_states, UF_TO_STATE_CODE
+from app.services.tile_service import get_tile, TileServiceError
+from app.services.report_queries import available_ses_query
 
 router = APIRouter()
 
 @router.get("/render", response_class=HTMLResponse, summary="Renderiza o HTML do mapa")
 async def render_map_html(
     se: int = Query(..., description="Semana Epidemiológica (ex: 202545)"),
-    scope: str = Query("br", description="Escopo: 'br' (Brasil) ou 'pe' (Pernambuco)"),
-    db: AsyncSession = Depends(get_db)
+    scope: str = Query("br", description=(
+        "Escopo: 'br' (Brasil) ou a sigla da UF (ex: 'pe', 'sp'). UFs sem malha municipal "
+        "(o repositório traz só PE; ver scripts/fetch_municipality_geometries.py) retornam 404"
+    )),
+    metric: str = Query("alert", description="Cor do mapa: 'alert', 'incidence', 'incidence_ma3' ou 'growth'"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Retorna o HTML puro do mapa Folium.
     """
-    if scope == 'pe':
-        map_html = await generate_city_map(db, se)
-    else:
-        map_html = await generate_choropleth_map(db, se)
-        
-    return map_html
+    scope = scope.lower()
+    if scope != "br" and scope.upper() not in UF_TO_STATE_CODE:
+        raise HTTPException(status_code=400, detail=f"Escopo inválido: '{scope}'. Use 'br' ou a sigla de uma UF.")
+    # UF válida mas sem GeoJSON municipal: 404 (não chega ao render nem ao cache)
+    if scope != "br" and scope.upper() not in available_states():
+        raise HTTPException(status_code=404, detail=f"Mapa municipal indisponível para a UF '{scope.upper()}'.")
+    if metric not in MAP_METRICS:
+        raise HTTPException(status_code=400, detail=f"Métrica inválida: '{metric}'. Use {', '.join(MAP_METRICS)}.")
+
+    # Artefato pré-renderizado após o último sync (só o mapa padrão): serve direto do disco
+    if metric == "alert":
+        artifact_html = await read_map_artifact(se, scope)
+        if artifact_html is not None:
+            return artifact_html
+
+    try:
+        return await render_map(db, se, scope, metric)
+    except RenderQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+
+@router.get("/tiles/{z}/{x}/{y}.pbf", summary="Vector tile (MVT) municipal do Brasil")
+async def get_vector_tile(
+    z: int,
+    x: int,
+    y: int,
+    se: int = Query(..., description="Semana Epidemiológica (ex: 202545)"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Retorna um Mapbox Vector Tile (camada "municipalities") com geocode,
+    nível de alerta, casos e métricas derivadas (incidence, growth_rate,
+    incidence_ma3) de cada município no tile.
+    """
+    try:
+        tile = await get_tile(db, se, z, x, y)
+    except TileServiceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImportError:
+        raise HTTPException(
+            status_code=501,
+            detail="Geração de vector tiles requer o pacote 'mapbox-vector-tile'."
+        )
+    except RenderQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    return Response(
+        content=tile,
+        media_type="application/vnd.mapbox-vector-tile",
+        headers={"Cache-Control": f"public, max-age={settings.CACHE_MAX_AGE_SECONDS}"},
+    )
 
 
 @router.get("/dashboard", response_class=HTMLResponse, summary="Página principal do Dashboard")
-async def get_dashboard_page(db: AsyncSession = Depends(get_db)):
+async def get_dashboard_page(db: AsyncSession = Depends(get_read_db)):
     """
     Retorna a página HTML completa do Dashboard com seletores.
     """
-    stmt = select(WeeklyReport.se).distinct().order_by(desc(WeeklyReport.se))
+    stmt = available_ses_query()
     result = await db.execute(stmt)
     available_ses = result.scalars().all()
+    await release_read_session(db)
 
     if not available_ses:
         return HTMLResponse("<h1>Nenhum dado disponível. Execute o script de backfill.</h1>")
@@ -43,10 +99,18 @@ async def get_dashboard_page(db: AsyncSession = Depends(get_db)):
     # Gera opções do select
     options_html = ""
     for se in available_ses:
-        year = str(se)[:4]
-        week = str(se)[4:]
         selected = "selected" if se == latest_se else ""
-        options_html += f'<option value="{se}" {selected}>Ano {year} - Semana {week} (SE {se})</option>'
+        options_html += f'<option value="{se}" {selected}>{se_label(se)}</option>'
+
+    metric_options_html = ""
+    for key, spec in MAP_METRICS.items():
+        selected = "selected" if key == "alert" else ""
+        metric_options_html += f'<option value="{key}" {selected}>{spec["label"]}</option>'
+
+    # UFs com geometria municipal disponível para o drill-down
+    uf_options_html = '<option value="" selected disabled>Estado...</option>'
+    for uf in available_states():
+        uf_options_html += f'<option value="{uf.lower()}">{uf}</option>'
 
     # 2. HTML do Dashboard
     html_content = f"""
@@ -76,7 +140,16 @@ async def get_dashboard_page(db: AsyncSession = Depends(get_db)):
             <div class="flex items-center space-x-2 md:space-x-4">
                 <div class="bg-blue-800 rounded-lg p-1 flex">
                     <button id="btn-br" class="px-3 py-1 rounded bg-blue-600 text-white font-medium text-sm shadow transition duration-200">Brasil</button>
-                    <button id="btn-pe" class="px-3 py-1 rounded hover:bg-blue-700 text-blue-200 font-medium text-sm ml-1 transition duration-200">Pernambuco</button>
+                    <select id="uf-selector" class="bg-blue-800 text-blue-200 text-sm rounded ml-1 border-none focus:ring-2 focus:ring-blue-500 py-1 pl-2 pr-1 cursor-pointer">
+                        {uf_options_html}
+                    </select>
+                </div>
+
+                <div class="flex items-center bg-blue-800 rounded-lg p-1">
+                    <label for="metric-selector" class="hidden md:inline mr-2 text-sm font-medium pl-2">Cor:</label>
+                    <select id="metric-selector" class="bg-blue-700 text-white text-sm rounded-md border-none focus:ring-2 focus:ring-blue-500 py-2 pl-3 pr-2 cursor-pointer">
+                        {metric_options_html}
+                    </select>
                 </div>
 
                 <div class="flex items-center bg-blue-800 rounded-lg p-1">
@@ -104,7 +177,8 @@ async def get_dashboard_page(db: AsyncSession = Depends(get_db)):
             const mapFrame = document.getElementById('map-frame');
             const loading = document.getElementById('loading');
             const btnBr = document.getElementById('btn-br');
-            const btnPe = document.getElementById('btn-pe');
+            const ufSelector = document.getElementById('uf-selector');
+            const metricSelector = document.getElementById('metric-selector');
             
             let currentScope = 'br';
 
@@ -112,24 +186,26 @@ async def get_dashboard_page(db: AsyncSession = Depends(get_db)):
                 const selectedSe = selector.value;
                 loading.classList.remove('hidden');
                 // Adiciona timestamp para evitar cache do navegador
-                mapFrame.src = `/api/v1/map/render?se=${{selectedSe}}&scope=${{currentScope}}&t=${{new Date().getTime()}}`;
+                mapFrame.src = `/api/v1/map/render?se=${{selectedSe}}&scope=${{currentScope}}&metric=${{metricSelector.value}}&t=${{new Date().getTime()}}`;
             }}
 
             function setScope(scope) {{
                 currentScope = scope;
                 if (scope === 'br') {{
                     btnBr.className = "px-3 py-1 rounded bg-blue-600 text-white font-medium text-sm shadow transition duration-200";
-                    btnPe.className = "px-3 py-1 rounded hover:bg-blue-700 text-blue-200 font-medium text-sm ml-1 transition duration-200";
+                    ufSelector.className = "bg-blue-800 text-blue-200 text-sm rounded ml-1 border-none focus:ring-2 focus:ring-blue-500 py-1 pl-2 pr-1 cursor-pointer";
+                    ufSelector.selectedIndex = 0;
                 }} else {{
-                    btnPe.className = "px-3 py-1 rounded bg-blue-600 text-white font-medium text-sm shadow transition duration-200 ml-1";
+                    ufSelector.className = "bg-blue-600 text-white text-sm rounded ml-1 border-none focus:ring-2 focus:ring-blue-500 py-1 pl-2 pr-1 cursor-pointer shadow";
                     btnBr.className = "px-3 py-1 rounded hover:bg-blue-700 text-blue-200 font-medium text-sm transition duration-200";
                 }}
                 updateMap();
             }}
 
             selector.addEventListener('change', updateMap);
+            metricSelector.addEventListener('change', updateMap);
             btnBr.addEventListener('click', () => setScope('br'));
-            btnPe.addEventListener('click', () => setScope('pe'));
+            ufSelector.addEventListener('change', () => setScope(ufSelector.value));
 
             mapFrame.addEventListener('load', () => {{
                 loading.classList.add('hidden');
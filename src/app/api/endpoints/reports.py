@@ -3,18 +3,18 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
-from sqlalchemy.orm import selectinload
 
-from app.db.session import get_db
-from app.models.models import WeeklyReport, Territory
-from app.schemas.reports import WeeklyReportPublic, StateAggregation
+from app.db.session import get_read_db
+from app.db.read_routing import release_read_session
+from app.schemas.reports import WeeklyReportPublic, WeeklyReportMetricsPublic, StateAggregation, TerritoryPublic
+from app.services.report_queries import reports_list_query, state_aggregation_query
+from app.services.territory_registry import ensure_territory_registry, territory_registry
 
 router = APIRouter()
 
 @router.get("/", response_model=List[WeeklyReportPublic], summary="Lista relatórios semanais (detalhado)")
 async def read_reports(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     skip: int = 0,
     limit: int = 100,
     geocode: Optional[str] = Query(None, description="Filtra por código IBGE do município"),
@@ -24,53 +24,40 @@ async def read_reports(
     se_end: Optional[int] = Query(None, description="Semana Epidemiológica final"),
 ):
     
-    stmt = select(WeeklyReport).options(selectinload(WeeklyReport.territory))
-
-    
-    if geocode:
-        stmt = stmt.where(WeeklyReport.geocode == geocode)
-    
-    if state_code:
-        
-        stmt = stmt.join(WeeklyReport.territory).where(Territory.state_code == state_code)
-    
-    if se:
-        stmt = stmt.where(WeeklyReport.se == se)
-    
-    if se_start:
-        stmt = stmt.where(WeeklyReport.se >= se_start)
-    if se_end:
-        stmt = stmt.where(WeeklyReport.se <= se_end)
-
-    
-    stmt = stmt.order_by(desc(WeeklyReport.se), WeeklyReport.geocode).offset(skip).limit(limit)
+    await ensure_territory_registry(db)
+    stmt = reports_list_query(
+        skip=skip, limit=limit, geocode=geocode, state_code=state_code,
+        se=se, se_start=se_start, se_end=se_end,
+    )
 
     result = await db.execute(stmt)
-    return result.scalars().all()
+    rows = result.all()
+    await release_read_session(db)
+
+    # territory vem do registro em memória, sem join nem segunda query
+    public = []
+    for report, metrics in rows:
+        item = WeeklyReportPublic.model_validate(report)
+        info = territory_registry.get(report.geocode)
+        if info is not None:
+            item.territory = TerritoryPublic.model_validate(info)
+        if metrics is not None:
+            item.metrics = WeeklyReportMetricsPublic.model_validate(metrics)
+        public.append(item)
+    return public
 
 
 @router.get("/by_state", response_model=List[StateAggregation], summary="Dados agregados por Estado (Para o Mapa)")
 async def read_reports_by_state(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     se: int = Query(..., description="Semana Epidemiológica obrigatória para o mapa (ex: 202544)")
 ):
     
-    stmt = (
-        select(
-            Territory.state_code,
-            func.sum(WeeklyReport.reported_cases).label("total_cases"),
-            func.avg(WeeklyReport.alert_level).label("avg_alert_level"),
-            func.sum(WeeklyReport.population).label("total_population"),
-            func.count(WeeklyReport.id).label("report_count")
-        )
-        .join(Territory, WeeklyReport.geocode == Territory.geocode)
-        .where(WeeklyReport.se == se)
-        .group_by(Territory.state_code)
-        .order_by(Territory.state_code)
-    )
+    stmt = state_aggregation_query(se)
 
     result = await db.execute(stmt)
     rows = result.fetchall()
+    await release_read_session(db)
 
     
     return [
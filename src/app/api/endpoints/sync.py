@@ -2,14 +2,17 @@
 
 import logging
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db, AsyncSessionFactory
+from app.schemas.sync import SyncRunPublic
 
 
-from app.services.infodengue_sync import InfoDengueSyncService, SyncServiceError
+from app.services.infodengue_sync import SyncServiceError
+from app.services.sync_coordinator import submit_sync, run_submitted_sync, coordinated_sync
+from app.services.sync_runs import list_sync_runs, get_sync_run, list_active_sync_runs
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -27,6 +30,7 @@ class SyncResponse(BaseModel):
     task_id: str | None = None
     time_window: dict
     stats: dict | None = None
+    coalesced: bool = False
 
 @router.post(
     "/sync", 
@@ -36,32 +40,38 @@ class SyncResponse(BaseModel):
 async def trigger_sync(
     request: SyncRequest,
     background_tasks: BackgroundTasks,
-    db: AsyncSession = Depends(get_db)
 ):
     
     
     time_window = request.model_dump()
+
+    # O run é registrado antes de agendar a task para que o task_id já exista na resposta.
+    # Pedidos cuja janela já está coberta por um run ativo reaproveitam esse run.
+    submission = await submit_sync(AsyncSessionFactory, "api", time_window)
+    run_id = submission.run_id
+
+    if submission.coalesced:
+        return SyncResponse(
+            message=f"Sincronização (InfoDengue) já em andamento (run #{run_id}); pedido agrupado.",
+            task_id=str(run_id),
+            time_window=submission.window,
+            coalesced=True
+        )
     
-    async def background_sync_task(params: dict):
-        async with AsyncSessionFactory() as session:
-            try:
-                
-                service = InfoDengueSyncService(session)
-                logger.info(f"Iniciando task de sincronização (InfoDengue) em background com params: {params}")
-                stats = await service.run_full_sync(**params)
-                await session.commit()
-                logger.info(f"Task de sincronização (InfoDengue) em background concluída. Stats: {stats}")
-            except Exception as e:
-                await session.rollback()
-                logger.error(f"Erro na task de sincronização (InfoDengue) em background: {e}")
-            finally:
-                await session.close()
+    async def background_sync_task():
+        try:
+            logger.info(f"Iniciando task de sincronização #{run_id} (InfoDengue) em background com janela: {submission.window}")
+            stats = await run_submitted_sync(AsyncSessionFactory, submission, "api")
+            logger.info(f"Task de sincronização #{run_id} (InfoDengue) em background concluída. Stats: {stats}")
+        except Exception as e:
+            logger.error(f"Erro na task de sincronização #{run_id} (InfoDengue) em background: {e}")
     
-    background_tasks.add_task(background_sync_task, time_window)
+    background_tasks.add_task(background_sync_task)
     
     return SyncResponse(
         message="Sincronização (InfoDengue) iniciada em background.",
-        time_window=time_window
+        task_id=str(run_id),
+        time_window=submission.window
     )
 
 @router.post(
@@ -71,7 +81,6 @@ async def trigger_sync(
 )
 async def trigger_sync_and_wait(
     request: SyncRequest,
-    db: AsyncSession = Depends(get_db)
 ):
     
     
@@ -80,15 +89,51 @@ async def trigger_sync_and_wait(
     
     try:
         
-        service = InfoDengueSyncService(db)
-        stats = await service.run_full_sync(**time_window)
+        stats = await coordinated_sync(AsyncSessionFactory, "api_wait", time_window)
         
         
         return SyncResponse(
             message="Sincronização (InfoDengue) concluída.",
+            task_id=str(stats["run_id"]),
             time_window=time_window,
-            stats=stats
+            stats=stats,
+            coalesced=stats.get("coalesced", False)
         )
-    except SyncServiceError as e:
+    except (SyncServiceError, RuntimeError) as e:
         logger.error(f"Falha na sincronização 'wait' (InfoDengue): {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get(
+    "/runs",
+    response_model=List[SyncRunPublic],
+    summary="Histórico de execuções do sync (mais recentes primeiro)"
+)
+async def read_sync_runs(
+    db: AsyncSession = Depends(get_db),
+    skip: int = 0,
+    limit: int = Query(50, le=500),
+    status: Optional[str] = Query(None, description="Filtra por status: queued, running, success, failed"),
+):
+    return await list_sync_runs(db, skip=skip, limit=limit, status=status)
+
+
+@router.get(
+    "/runs/active",
+    response_model=List[SyncRunPublic],
+    summary="Execuções do sync em fila ou em andamento"
+)
+async def read_active_sync_runs(db: AsyncSession = Depends(get_db)):
+    return await list_active_sync_runs(db)
+
+
+@router.get(
+    "/runs/{run_id}",
+    response_model=SyncRunPublic,
+    summary="Detalhes de uma execução do sync"
+)
+async def read_sync_run(run_id: int, db: AsyncSession = Depends(get_db)):
+    run = await get_sync_run(db, run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Execução de sync {run_id} não encontrada.")
+    return run
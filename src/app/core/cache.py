@@ -0,0 +1,272 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.core.leader import INSTANCE_ID
+from app.core.metrics import cache_requests_total
+from app.core.pg_events import listen_forever, publish
+from app.db.read_routing import note_primary_write
+
+logger = logging.getLogger(__name__)
+
+
+# Parâmetros que não alteram a resposta (ex: o cache-buster "t" do dashboard)
+IGNORED_QUERY_PARAMS = {"t"}
+
+# Canal Postgres (LISTEN/NOTIFY) usado para propagar invalidações entre processos
+CACHE_INVALIDATION_CHANNEL = "dengue_cache_invalidation"
+
+
+class CacheBackend(ABC):
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    async def get_generation(self) -> int:
+        ...
+
+    @abstractmethod
+    async def bump_generation(self) -> int:
+        ...
+
+
+class InMemoryLRUCache(CacheBackend):
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._generation = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_generation(self) -> int:
+        return self._generation
+
+    async def bump_generation(self) -> int:
+        self._generation += 1
+        # Entradas de gerações antigas nunca mais serão lidas; libera memória já
+        self._entries.clear()
+        return self._generation
+
+
+class RedisCache(CacheBackend):
+
+    GENERATION_KEY = "dengue:cache:generation"
+
+    def __init__(self, client, prefix: str = "dengue:cache:"):
+        # Qualquer cliente compatível com redis.asyncio (get/set/incr) serve,
+        # inclusive um fake local.
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self.client.set(self.prefix + key, value, ex=ttl)
+
+    async def get_generation(self) -> int:
+        value = await self.client.get(self.GENERATION_KEY)
+        return int(value or 0)
+
+    async def bump_generation(self) -> int:
+        return int(await self.client.incr(self.GENERATION_KEY))
+
+
+def create_cache_backend() -> CacheBackend:
+
+    if settings.CACHE_BACKEND == "redis":
+        try:
+            import redis.asyncio as redis_asyncio
+
+            client = redis_asyncio.from_url(settings.CACHE_REDIS_URL)
+            logger.info("Cache de respostas usando backend Redis.")
+            return RedisCache(client)
+        except Exception as e:
+            logger.warning(f"Não foi possível iniciar o cache Redis ({e}). Usando LRU em memória.")
+
+    return InMemoryLRUCache(max_entries=settings.CACHE_MAX_ENTRIES)
+
+
+cache_backend: CacheBackend = create_cache_backend()
+
+
+async def invalidate_read_cache() -> None:
+
+    try:
+        note_primary_write()
+        generation = await cache_backend.bump_generation()
+        logger.info(f"Cache de leitura invalidado (geração {generation}).")
+    except Exception as e:
+        logger.error(f"Falha ao invalidar o cache de leitura: {e}")
+
+    # Avisa os demais processos (ex: API quando o sync roda no worker dedicado)
+    try:
+        await publish(CACHE_INVALIDATION_CHANNEL, INSTANCE_ID)
+    except Exception as e:
+        logger.error(f"Falha ao publicar invalidação do cache: {e}")
+
+
+_listener_task: Optional[asyncio.Task] = None
+
+
+def _local_generation() -> bool:
+    # Com Redis a geração já é compartilhada entre processos; só o LRU em memória precisa do aviso
+    return settings.CACHE_ENABLED and isinstance(cache_backend, InMemoryLRUCache)
+
+
+def _on_invalidation(connection, pid, channel, payload) -> None:
+    if payload == INSTANCE_ID:
+        return
+    # Commit de outro processo: a réplica pode ainda não ter o dado (vale para qualquer backend)
+    note_primary_write()
+    if _local_generation():
+        asyncio.get_running_loop().create_task(cache_backend.bump_generation())
+        logger.info(f"Cache de leitura invalidado por notificação de {payload}.")
+
+
+def start_invalidation_listener(read_replica: bool = False) -> None:
+    # Com réplica de leitura a API precisa saber dos commits do worker mesmo com Redis ou
+    # com o cache desligado: é o que manda as leituras ao primário logo após o sync
+
+    global _listener_task
+    if not (_local_generation() or read_replica):
+        return
+    if _listener_task is None:
+        _listener_task = asyncio.get_running_loop().create_task(
+            listen_forever(CACHE_INVALIDATION_CHANNEL, _on_invalidation)
+        )
+
+
+async def stop_invalidation_listener() -> None:
+
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
+
+
+def normalize_query(query_string: str) -> str:
+
+    params = [
+        (k, v) for k, v in parse_qsl(query_string, keep_blank_values=False)
+        if k not in IGNORED_QUERY_PARAMS
+    ]
+    return urlencode(sorted(params))
+
+
+def build_cache_key(generation: int, path: str, query_string: str) -> str:
+    return f"resp:{generation}:{path.rstrip('/')}?{normalize_query(query_string)}"
+
+
+def _serialize(status_code: int, headers: Dict[str, str], body: bytes) -> bytes:
+    return json.dumps({
+        "status": status_code,
+        "headers": headers,
+        "body": base64.b64encode(body).decode("ascii"),
+    }).encode("utf-8")
+
+
+def _deserialize(raw: bytes) -> Tuple[int, Dict[str, str], bytes]:
+    data = json.loads(raw)
+    return data["status"], data["headers"], base64.b64decode(data["body"])
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+
+    def __init__(self, app, path_prefixes: Iterable[str], backend: Optional[CacheBackend] = None):
+        super().__init__(app)
+        self.path_prefixes = tuple(path_prefixes)
+        self.backend = backend or cache_backend
+
+    def _is_cacheable(self, request: Request) -> bool:
+        return request.method == "GET" and request.url.path.startswith(self.path_prefixes)
+
+    def _with_cache_headers(self, response: Response, etag: str, status: str) -> Response:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = f"public, max-age={settings.CACHE_MAX_AGE_SECONDS}"
+        response.headers["X-Cache"] = status
+        return response
+
+    async def dispatch(self, request: Request, call_next):
+        if not self._is_cacheable(request):
+            return await call_next(request)
+
+        try:
+            generation = await self.backend.get_generation()
+            key = build_cache_key(generation, request.url.path, request.url.query)
+            cached = await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Cache indisponível, servindo direto do banco: {e}")
+            return await call_next(request)
+
+        cache_requests_total.labels(cache="response", result="miss" if cached is None else "hit").inc()
+        if cached is not None:
+            status_code, headers, body = _deserialize(cached)
+            etag = headers["etag"]
+            if request.headers.get("if-none-match") == etag:
+                return self._with_cache_headers(Response(status_code=304), etag, "HIT")
+
+            response = Response(content=body, status_code=status_code, media_type=headers.get("content-type"))
+            return self._with_cache_headers(response, etag, "HIT")
+
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        etag = f'"{generation}-{hashlib.sha1(body).hexdigest()[:16]}"'
+        headers = {
+            "content-type": response.headers.get("content-type", "application/octet-stream"),
+            "etag": etag,
+        }
+
+        try:
+            await self.backend.set(key, _serialize(200, headers, body), settings.CACHE_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Falha ao gravar resposta no cache: {e}")
+
+        if request.headers.get("if-none-match") == etag:
+            return self._with_cache_headers(Response(status_code=304), etag, "MISS")
+
+        response = Response(content=body, status_code=200, media_type=headers["content-type"])
+        return self._with_cache_headers(response, etag, "MISS")
@@ -5,9 +5,85 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    # Prepared statements mantidos por conexão (LRU do adaptador asyncpg); 0 desliga o cache
+    DB_STATEMENT_CACHE_SIZE: int = 500
+    # Réplica de leitura opcional para reports/map/health (vazio = tudo no primário)
+    DATABASE_READ_URL: str = ""
+    READ_DB_POOL_SIZE: int = 10
+    READ_DB_MAX_OVERFLOW: int = 20
+    READ_REPLICA_MAX_LAG_SECONDS: float = 30.0  # acima disso as leituras voltam ao primário
+    READ_REPLICA_LAG_CHECK_SECONDS: float = 5.0
+    READ_REPLICA_LAG_QUERY_TIMEOUT_SECONDS: float = 1.0
+
+    # Desative na API quando o sync roda no worker dedicado (python -m app.worker)
+    SCHEDULER_ENABLED: bool = True
+    WORKER_DB_POOL_SIZE: int = 4
+    WORKER_DB_MAX_OVERFLOW: int = 4
     SYNC_INTERVAL_MINUTES: int = 60
+    INFODENGUE_API_URL: str = "https://info.dengue.mat.br/api/alertcity/"
+    # Lease de liderança: só o processo líder executa o sync agendado
+    SYNC_LEADER_LEASE_SECONDS: int = 300
+    SYNC_LEADER_HEARTBEAT_SECONDS: int = 60
+    # Runs em queued/running sem heartbeat há mais tempo que isso são considerados abandonados
+    SYNC_RUN_STALE_MINUTES: int = 15
+    SYNC_RUN_HEARTBEAT_SECONDS: int = 60
+    # Ordem de prioridade do sync: municípios buscados e commitados em blocos
+    SYNC_PRIORITY_CHUNK_SIZE: int = 500
+    # Municípios quietos (verde, zero casos) atualizados a cada N runs; 1 = todo run
+    SYNC_QUIET_REFRESH_EVERY_N_RUNS: int = 1
+    # "inline": o processo que dispara executa o sync inteiro
+    # "queue": o run vira shards em sync_tasks, consumidos por workers em qualquer nó
+    SYNC_EXECUTION_MODE: str = "inline"
+    SYNC_QUEUE_SHARD_SIZE: int = 250
+    SYNC_QUEUE_CONSUMERS: int = 2
+    SYNC_QUEUE_POLL_SECONDS: int = 5
+    SYNC_TASK_VISIBILITY_SECONDS: int = 600
+    SYNC_TASK_MAX_ATTEMPTS: int = 3
+    # weekly_reports particionada por ano epidemiológico: partições criadas com N anos de antecedência
+    WEEKLY_REPORTS_PARTITIONS_AHEAD: int = 1
     PYSUS_CACHE_DIR: str = "./.pysus_cache"
+    # Cópia local do CSV de municípios baixado pelo seed (usada com --offline)
+    TERRITORIES_CSV_CACHE_PATH: str = "./.territories_cache/municipios.csv"
     MAP_OUTPUT_DIR: str = "./map_exports"
 
+    # Cache de respostas dos endpoints de leitura
+    CACHE_ENABLED: bool = True
+    CACHE_BACKEND: str = "memory"  # "memory" ou "redis"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_MAX_ENTRIES: int = 512
+    CACHE_TTL_SECONDS: int = 3600
+    CACHE_MAX_AGE_SECONDS: int = 60
+
+    # Pool de renderização de mapas (Folium/pandas fora do event loop)
+    MAP_RENDER_EXECUTOR: str = "process"  # "process" ou "thread"
+    MAP_RENDER_WORKERS: int = 2
+    MAP_RENDER_MAX_QUEUE: int = 32
+
+    # Pré-renderização dos mapas após cada sync (artefatos em MAP_OUTPUT_DIR)
+    MAP_PRERENDER_ENABLED: bool = True
+
+    # Máximo de camadas municipais (por UF) mantidas em memória por processo
+    GEO_STORE_MAX_STATES: int = 6
+
+    # Vector tiles (MVT) municipais
+    MVT_MAX_ZOOM: int = 14
+    # SEs com dados de tile mantidos em memória por processo da API
+    MVT_DATA_CACHE_SES: int = 4
+
+    # Métricas Prometheus (/metrics na API; porta própria no worker, 0 = desligado)
+    METRICS_ENABLED: bool = True
+    METRICS_WORKER_PORT: int = 0
+
+    # Profiling opt-in (artefatos em PROFILING_OUTPUT_DIR)
+    PROFILING_OUTPUT_DIR: str = "./profiles"
+    PROFILING_SYNC_ENABLED: bool = False      # cProfile por fase (fetch/parse/upsert/derive) em cada run
+    PROFILING_REQUESTS_ENABLED: bool = False  # perfila todas as requisições de PROFILING_ROUTES
+    PROFILING_HEADER_ENABLED: bool = False    # perfila requisições com o header "X-Profile: 1"
+    PROFILING_ROUTES: str = ""                # prefixos separados por vírgula; vazio = todas
+    SLOW_REQUEST_THRESHOLD_MS: int = 0       # 0 desliga o log de requisições lentas
+    SLOW_QUERY_THRESHOLD_MS: int = 500        # 0 desliga o log de queries lentas
+
 
 settings = Settings()
\ No newline at end of file
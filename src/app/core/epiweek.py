@@ -0,0 +1,116 @@
+from array import array
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+
+# Calendário de Semanas Epidemiológicas (SE) do Ministério da Saúde / SINAN:
+# semanas de domingo a sábado; a SE 1 é a semana que contém 4 de janeiro, então
+# um ano epidemiológico tem 52 ou 53 semanas e pode começar no fim de dezembro
+# (ex: SE 202501 começa em 29/12/2024). Os valores de `se` são ano * 100 + semana.
+#
+# As tabelas cobrem FIRST_YEAR..LAST_YEAR e são montadas uma vez na importação;
+# todas as consultas são aritmética/indexação, sem laço por data.
+
+FIRST_YEAR = 1990
+LAST_YEAR = 2100
+
+
+def _first_sunday(year: int) -> date:
+    jan4 = date(year, 1, 4)
+    return jan4 - timedelta(days=(jan4.weekday() + 1) % 7)
+
+
+# Índice global da semana: 0 = SE 1 de FIRST_YEAR; ordinal do domingo = _BASE + 7 * índice
+_BASE = _first_sunday(FIRST_YEAR).toordinal()
+
+# _YEAR_FIRST_INDEX[y - FIRST_YEAR] = índice global da SE 1 do ano y (com sentinela em LAST_YEAR + 1)
+_YEAR_FIRST_INDEX = array("I", (
+    (_first_sunday(y).toordinal() - _BASE) // 7 for y in range(FIRST_YEAR, LAST_YEAR + 2)
+))
+
+
+def _build_se_table() -> array:
+    table = array("I")
+    for offset in range(LAST_YEAR - FIRST_YEAR + 1):
+        weeks = _YEAR_FIRST_INDEX[offset + 1] - _YEAR_FIRST_INDEX[offset]
+        table.extend((FIRST_YEAR + offset) * 100 + w for w in range(1, weeks + 1))
+    return table
+
+
+# _SE_BY_INDEX[i] = se da i-ésima semana
+_SE_BY_INDEX = _build_se_table()
+
+
+def _check_year(year: int) -> int:
+    if not FIRST_YEAR <= year <= LAST_YEAR:
+        raise ValueError(f"Ano epidemiológico fora do calendário ({FIRST_YEAR}-{LAST_YEAR}): {year}")
+    return year - FIRST_YEAR
+
+
+def split_se(se: int) -> Tuple[int, int]:
+    return se // 100, se % 100
+
+
+def weeks_in_year(year: int) -> int:
+    offset = _check_year(year)
+    return _YEAR_FIRST_INDEX[offset + 1] - _YEAR_FIRST_INDEX[offset]
+
+
+def _index_of(se: int) -> int:
+    year, week = split_se(se)
+    offset = _check_year(year)
+    first = _YEAR_FIRST_INDEX[offset]
+    if not 1 <= week <= _YEAR_FIRST_INDEX[offset + 1] - first:
+        raise ValueError(f"Semana epidemiológica inválida: {se}")
+    return first + week - 1
+
+
+def epiweek_start(year: int, week: int) -> date:
+    # Domingo que abre a SE
+    return date.fromordinal(_BASE + 7 * _index_of(year * 100 + week))
+
+
+def se_date_range(se: int) -> Tuple[date, date]:
+    # (domingo, sábado) da SE
+    start = _BASE + 7 * _index_of(se)
+    return date.fromordinal(start), date.fromordinal(start + 6)
+
+
+def se_of(day: date) -> int:
+
+    index = (day.toordinal() - _BASE) // 7
+    if not 0 <= index < len(_SE_BY_INDEX):
+        raise ValueError(f"Data fora do calendário epidemiológico ({FIRST_YEAR}-{LAST_YEAR}): {day}")
+    return _SE_BY_INDEX[index]
+
+
+def current_se(today: Optional[date] = None) -> int:
+    return se_of(today or date.today())
+
+
+def shift_se(se: int, weeks: int) -> int:
+    # SE deslocada em `weeks` semanas, atravessando a virada do ano (ex: 202501 - 1 = 202452)
+    index = _index_of(se) + weeks
+    if not 0 <= index < len(_SE_BY_INDEX):
+        raise ValueError(f"SE {se} deslocada em {weeks} semanas sai do calendário.")
+    return _SE_BY_INDEX[index]
+
+
+def se_range(start_se: int, end_se: int) -> List[int]:
+    # SEs de start_se a end_se, inclusive
+    return _SE_BY_INDEX[_index_of(start_se):_index_of(end_se) + 1].tolist()
+
+
+def sync_window(weeks_back: int, today: Optional[date] = None) -> Dict[str, int]:
+    # Janela no formato da API do InfoDengue: da SE de `weeks_back` semanas atrás até a SE atual
+    end_se = current_se(today)
+    start_year, start_week = split_se(shift_se(end_se, -weeks_back))
+    end_year, end_week = split_se(end_se)
+    return {"ew_start": start_week, "ey_start": start_year, "ew_end": end_week, "ey_end": end_year}
+
+
+def se_label(se: int) -> str:
+    # Rótulo do dashboard, ex: "SE 45/2025 (02/11 a 08/11)"
+    year, week = split_se(se)
+    start, end = se_date_range(se)
+    return f"SE {week:02d}/{year} ({start:%d/%m} a {end:%d/%m})"
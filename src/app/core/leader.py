@@ -0,0 +1,76 @@
+import logging
+import os
+import socket
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import case, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from app.models.models import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+
+# Identifica este processo (worker uvicorn/gunicorn) no lease
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+SYNC_LEASE_NAME = "full_sync_job"
+
+
+async def try_acquire_leadership(session: AsyncSession, name: str, ttl_seconds: int) -> bool:
+
+    # Um único UPSERT atômico: cria o lease, renova se já somos o líder,
+    # ou toma o lease se o líder anterior deixou expirar.
+    expires_at = func.now() + timedelta(seconds=ttl_seconds)
+    stmt = pg_insert(SchedulerLease).values(
+        name=name,
+        holder=INSTANCE_ID,
+        acquired_at=func.now(),
+        expires_at=expires_at,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["name"],
+        set_={
+            "holder": stmt.excluded.holder,
+            "acquired_at": case(
+                (SchedulerLease.holder == INSTANCE_ID, SchedulerLease.acquired_at),
+                else_=func.now(),
+            ),
+            "expires_at": stmt.excluded.expires_at,
+        },
+        where=(SchedulerLease.holder == INSTANCE_ID) | (SchedulerLease.expires_at < func.now()),
+    ).returning(SchedulerLease.holder)
+
+    result = await session.execute(stmt)
+    acquired = result.first() is not None
+    await session.commit()
+    return acquired
+
+
+async def release_leadership(session: AsyncSession, name: str) -> None:
+
+    stmt = (
+        update(SchedulerLease)
+        .where(SchedulerLease.name == name, SchedulerLease.holder == INSTANCE_ID)
+        .values(expires_at=func.now())
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+
+async def get_lease_status(session: AsyncSession, name: str) -> Optional[dict]:
+
+    result = await session.execute(select(SchedulerLease).where(SchedulerLease.name == name))
+    lease = result.scalar_one_or_none()
+    if lease is None:
+        return None
+
+    return {
+        "leader": lease.holder,
+        "is_this_instance": lease.holder == INSTANCE_ID,
+        "lease_acquired_at": lease.acquired_at,
+        "lease_expires_at": lease.expires_at,
+    }
@@ -0,0 +1,211 @@
+import logging
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest, start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.core.query_timing import observe_query_timings
+
+logger = logging.getLogger(__name__)
+
+
+# Métricas via prometheus_client, no registro padrão (que também traz process_* e python_*).
+# Os valores são por processo: com vários workers, cada um é um alvo de scrape.
+registry = REGISTRY
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class CallbackGauge(Collector):
+    # Gauge calculado no momento do scrape; callback retorna {tupla_de_labels: valor}
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (),
+        callback: Optional[Callable[[], Dict]] = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._callback = callback
+
+    def collect(self):
+        family = GaugeMetricFamily(self.name, self.documentation, labels=self.labelnames)
+        try:
+            items = list(self._callback().items())
+        except Exception as e:
+            logger.debug(f"Falha ao coletar a métrica {self.name}: {e}")
+            items = []
+        for key, value in items:
+            family.add_metric([str(v) for v in key], value)
+        yield family
+
+    def describe(self):
+        # Sem describe(), o registro chamaria o callback já no register()
+        return [GaugeMetricFamily(self.name, self.documentation, labels=self.labelnames)]
+
+
+def register_callback_gauge(
+    name: str, documentation: str, labelnames: Iterable[str] = (), callback: Callable[[], Dict] = None
+) -> CallbackGauge:
+    gauge = CallbackGauge(name, documentation, labelnames, callback)
+    registry.register(gauge)
+    return gauge
+
+
+# --- HTTP (rotas da API) ---
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP por rota.",
+    ("method", "route", "status"),
+    buckets=DEFAULT_BUCKETS,
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress", "Requisições HTTP em andamento.",
+)
+
+# --- Banco de dados ---
+db_query_duration = Histogram(
+    "db_query_duration_seconds", "Tempo de execução das queries SQL por tipo de statement.",
+    ("statement",),
+    buckets=DEFAULT_BUCKETS,
+)
+db_query_errors = Counter(
+    "db_query_errors_total", "Queries SQL que terminaram em erro.", ("statement",),
+)
+# O asyncpg não expõe contadores de acerto do cache de prepared statements (e executemany
+# não passa por ele): só o tamanho configurado por conexão
+db_prepared_statement_cache_size = Gauge(
+    "db_prepared_statement_cache_size",
+    "Tamanho do cache de prepared statements de cada conexão asyncpg (DB_STATEMENT_CACHE_SIZE).",
+)
+
+# --- Sync (InfoDengue) ---
+sync_phase_duration = Histogram(
+    "sync_phase_duration_seconds", "Duração acumulada de cada fase do sync (por run ou shard).",
+    ("phase",), buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 2400, 3600),
+)
+infodengue_fetch_duration = Histogram(
+    "infodengue_fetch_duration_seconds", "Latência das chamadas HTTP ao InfoDengue.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 15.0, 30.0),
+)
+infodengue_fetch_total = Counter(
+    "infodengue_fetch_total", "Chamadas HTTP ao InfoDengue por resultado.", ("status",),
+)
+infodengue_fetch_in_flight = Gauge(
+    "infodengue_fetch_in_flight", "Chamadas ao InfoDengue dentro do semáforo de concorrência.",
+)
+sync_upsert_batch_rows = Histogram(
+    "sync_upsert_batch_rows", "Linhas por lote de UPSERT em weekly_reports.",
+    buckets=(10, 50, 100, 250, 500, 1000, 2000, 5000),
+)
+
+# --- Caches ---
+cache_requests_total = Counter(
+    "cache_requests_total", "Consultas aos caches de leitura por resultado (hit/miss).",
+    ("cache", "result"),
+)
+
+
+def _timed_statement_kind(statement: str) -> str:
+    head = statement.lstrip().split(None, 1)
+    return head[0].upper() if head else "UNKNOWN"
+
+
+def _observe_query(statement: str, elapsed: float, executemany: bool) -> None:
+    db_query_duration.labels(statement=_timed_statement_kind(statement)).observe(elapsed)
+
+
+def instrument_engine(engine) -> None:
+    # Eventos do SQLAlchemy (lado síncrono do AsyncEngine); o tempo de cada query vem do
+    # listener compartilhado com o log de queries lentas (core/query_timing.py)
+
+    from sqlalchemy import event
+
+    sync_engine = engine.sync_engine
+    observe_query_timings(engine, _observe_query)
+
+    db_prepared_statement_cache_size.set(settings.DB_STATEMENT_CACHE_SIZE)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        statement = exception_context.statement or ""
+        db_query_errors.labels(statement=_timed_statement_kind(statement)).inc()
+
+
+# Pools de conexão registrados no processo (api, api_read, worker), lidos no momento do scrape
+_pools: Dict[str, object] = {}
+
+
+def _pool_connections() -> dict:
+    values = {}
+    for name, pool in list(_pools.items()):
+        values[(name, "size")] = pool.size()
+        values[(name, "checked_out")] = pool.checkedout()
+        values[(name, "checked_in")] = pool.checkedin()
+        values[(name, "overflow")] = max(0, pool.overflow())
+    return values
+
+
+db_pool_connections = register_callback_gauge(
+    "db_pool_connections", "Conexões de cada pool por estado.",
+    ("pool", "state"), callback=_pool_connections,
+)
+
+
+def register_pool_metrics(engine, name: str) -> None:
+
+    _pools[name] = engine.sync_engine.pool
+
+
+def _route_template(request: Request, response: Optional[Response] = None) -> str:
+    # Usa o template da rota (/runs/{run_id}) para não explodir a cardinalidade
+    route = request.scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    # HITs do cache de respostas não passam pelo roteamento; as rotas cacheadas
+    # não têm parâmetros de path, então o próprio path é um label seguro.
+    if response is not None and "X-Cache" in response.headers:
+        return request.url.path
+    return "unmatched"
+
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+
+    async def dispatch(self, request: Request, call_next):
+        if request.url.path == "/metrics":
+            return await call_next(request)
+
+        started = time.perf_counter()
+        http_requests_in_progress.inc()
+        response = None
+        try:
+            response = await call_next(request)
+            return response
+        finally:
+            http_requests_in_progress.dec()
+            http_request_duration.labels(
+                method=request.method,
+                route=_route_template(request, response),
+                status=str(response.status_code) if response is not None else "500",
+            ).observe(time.perf_counter() - started)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0"):
+    # Servidor HTTP do prometheus_client (thread própria) para processos sem FastAPI
+    # (python -m app.worker); devolve o servidor para shutdown()
+
+    server, _ = start_http_server(port, addr=host, registry=registry)
+    logger.info(f"Métricas do worker expostas em http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from typing import Callable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# LISTEN/NOTIFY do Postgres para avisar os demais processos (API, workers, scripts)
+# de mudanças que invalidam estado em memória: cache de respostas, registro de territórios.
+
+
+def asyncpg_dsn() -> str:
+    return settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+async def publish(channel: str, payload: str) -> None:
+
+    import asyncpg
+
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        await conn.execute("SELECT pg_notify($1, $2)", channel, payload)
+    finally:
+        await conn.close()
+
+
+async def listen_forever(channel: str, callback: Callable) -> None:
+    # callback(connection, pid, channel, payload), no formato do asyncpg; reconecta se cair
+
+    import asyncpg
+
+    while True:
+        try:
+            conn = await asyncpg.connect(asyncpg_dsn())
+            closed = asyncio.get_running_loop().create_future()
+            conn.add_termination_listener(lambda _: closed.done() or closed.set_result(None))
+            await conn.add_listener(channel, callback)
+            logger.info(f"Escutando o canal '{channel}' via LISTEN/NOTIFY.")
+            try:
+                await closed
+            finally:
+                await conn.close()
+            logger.warning(f"Conexão de LISTEN do canal '{channel}' encerrada; reconectando...")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Falha no listener do canal '{channel}': {e}")
+        await asyncio.sleep(5)
@@ -0,0 +1,250 @@
+import asyncio
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core.query_timing import observe_query_timings
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("app.slow_query")
+slow_request_logger = logging.getLogger("app.slow_request")
+
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ARTIFACT_HEADER = "X-Profile-Artifact"
+PROFILE_SKIPPED_HEADER = "X-Profile-Skipped"
+
+# Um profiler ativo por processo. No 3.11 um segundo cProfile.enable() na mesma thread não
+# falha: substitui o profiler ativo em silêncio, e o primeiro passa a medir nada. Quem não
+# consegue o lock segue sem perfil.
+_active_profiler = threading.Lock()
+
+
+def _acquire_profiler() -> bool:
+    return _active_profiler.acquire(blocking=False)
+
+
+def _release_profiler() -> None:
+    _active_profiler.release()
+
+
+def _profiles_dir(*parts: str) -> str:
+    path = os.path.join(settings.PROFILING_OUTPUT_DIR, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", value).strip("_") or "root"
+
+
+def _write_cprofile(profile: cProfile.Profile, base_path: str, limit: int = 40) -> str:
+    # .prof (para snakeviz/pstats) + resumo em texto ordenado por tempo acumulado
+    profile.dump_stats(f"{base_path}.prof")
+    buffer = io.StringIO()
+    pstats.Stats(profile, stream=buffer).sort_stats("cumulative").print_stats(limit)
+    with open(f"{base_path}.txt", "w", encoding="utf-8") as f:
+        f.write(buffer.getvalue())
+    return f"{base_path}.prof"
+
+
+class SyncPhaseProfiler:
+    # Um cProfile por fase (fetch/parse/upsert/derive), ligado e desligado a cada trecho.
+    # Observação: o cProfile mede a thread inteira, então a fase "fetch" inclui
+    # o trabalho de outras corrotinas do event loop no mesmo intervalo.
+
+    def __init__(self, label: str):
+        self.label = label
+        self._profiles = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        if not _acquire_profiler():
+            # Outro profiler já ativo no processo (ex: requisição com X-Profile, outro shard)
+            logger.debug(f"Profiler ocupado; fase '{name}' do sync '{self.label}' sem perfil.")
+            yield
+            return
+        try:
+            profile = self._profiles.get(name)
+            if profile is None:
+                profile = self._profiles[name] = cProfile.Profile()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+        finally:
+            _release_profiler()
+
+    def dump(self) -> Optional[str]:
+        if not self._profiles:
+            return None
+        directory = _profiles_dir("sync", _slug(self.label))
+        for name, profile in self._profiles.items():
+            _write_cprofile(profile, os.path.join(directory, name))
+        logger.info(f"Perfis do sync '{self.label}' gravados em {directory}")
+        return directory
+
+
+def create_sync_profiler(label: str) -> Optional[SyncPhaseProfiler]:
+
+    if not settings.PROFILING_SYNC_ENABLED:
+        return None
+    return SyncPhaseProfiler(label)
+
+
+@contextmanager
+def profile_phase(profiler: Optional[SyncPhaseProfiler], name: str):
+    # No-op quando o profiling está desligado
+
+    if profiler is None:
+        yield
+        return
+    with profiler.phase(name):
+        yield
+
+
+class _RequestProfiler:
+    # pyinstrument (amostragem, ciente de async) se instalado; senão cProfile
+
+    def __init__(self):
+        try:
+            from pyinstrument import Profiler
+            self._profiler = Profiler(async_mode="enabled")
+            self.kind = "pyinstrument"
+        except ImportError:
+            self._profiler = cProfile.Profile()
+            self.kind = "cprofile"
+
+    def start(self) -> None:
+        if self.kind == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def write(self, base_path: str) -> str:
+        if self.kind == "pyinstrument":
+            path = f"{base_path}.html"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+            return path
+        return _write_cprofile(self._profiler, base_path)
+
+
+def _route_selected(path: str) -> bool:
+    prefixes = [p.strip() for p in settings.PROFILING_ROUTES.split(",") if p.strip()]
+    return not prefixes or path.startswith(tuple(prefixes))
+
+
+def _wants_profile(request: Request) -> bool:
+    if not _route_selected(request.url.path):
+        return False
+    if settings.PROFILING_REQUESTS_ENABLED:
+        return True
+    return settings.PROFILING_HEADER_ENABLED and request.headers.get(PROFILE_HEADER) == "1"
+
+
+def _log_slow_request(request: Request, status_code: int, elapsed_ms: float, artifact: Optional[str]) -> None:
+
+    entry = {
+        "timestamp": datetime.now().astimezone().isoformat(),
+        "method": request.method,
+        "path": request.url.path,
+        "query": request.url.query,
+        "status": status_code,
+        "elapsed_ms": round(elapsed_ms, 1),
+        "profile": artifact,
+    }
+    slow_request_logger.warning(
+        f"Requisição lenta: {request.method} {request.url.path} {elapsed_ms:.0f}ms (status {status_code})"
+    )
+    try:
+        with open(os.path.join(_profiles_dir(), "slow_requests.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        logger.warning(f"Falha ao gravar o log de requisições lentas: {e}")
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+
+    async def dispatch(self, request: Request, call_next):
+        wanted = _wants_profile(request)
+        profiler = None
+        artifact = None
+
+        started = time.perf_counter()
+        if wanted and _acquire_profiler():
+            try:
+                profiler = _RequestProfiler()
+                profiler.start()
+            except Exception:
+                _release_profiler()
+                raise
+        elif wanted:
+            # Só um profiler por processo; requisições concorrentes seguem sem perfil
+            logger.debug(f"Profiler ocupado; {request.url.path} sem perfil.")
+        try:
+            response = await call_next(request)
+        finally:
+            if profiler is not None:
+                try:
+                    profiler.stop()
+                finally:
+                    _release_profiler()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if profiler is not None:
+            name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{request.method}-{_slug(request.url.path)}"
+            artifact = await asyncio.to_thread(profiler.write, os.path.join(_profiles_dir("requests"), name))
+            response.headers[PROFILE_ARTIFACT_HEADER] = os.path.basename(artifact)
+        elif wanted:
+            response.headers[PROFILE_SKIPPED_HEADER] = "profiler-busy"
+
+        if 0 < settings.SLOW_REQUEST_THRESHOLD_MS <= elapsed_ms:
+            await asyncio.to_thread(_log_slow_request, request, response.status_code, elapsed_ms, artifact)
+        return response
+
+
+def instrument_slow_queries(engine) -> None:
+    # Loga queries acima de SLOW_QUERY_THRESHOLD_MS (com o SQL truncado); o tempo vem do
+    # listener compartilhado com as métricas (core/query_timing.py)
+
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+
+    def _log_if_slow(statement: str, elapsed: float, executemany: bool) -> None:
+        if elapsed >= threshold:
+            compact = " ".join(statement.split())
+            slow_query_logger.warning(
+                f"Query lenta ({elapsed * 1000:.0f}ms{', executemany' if executemany else ''}): {compact[:500]}"
+            )
+
+    observe_query_timings(engine, _log_if_slow)
+
+
+def request_profiling_enabled() -> bool:
+    # ProfilingMiddleware só entra na pilha da API se algo nele estiver ligado
+
+    return (
+        settings.PROFILING_REQUESTS_ENABLED
+        or settings.PROFILING_HEADER_ENABLED
+        or settings.SLOW_REQUEST_THRESHOLD_MS > 0
+    )
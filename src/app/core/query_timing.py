@@ -0,0 +1,46 @@
+import time
+import weakref
+from typing import Callable, List
+
+# Observador de tempo de query: (statement, segundos, executemany)
+QueryObserver = Callable[[str, float, bool], None]
+
+_START_KEY = "_query_timing_start"
+
+# Observadores por engine (lado síncrono); um único par de listeners por engine
+_observers: "weakref.WeakKeyDictionary[object, List[QueryObserver]]" = weakref.WeakKeyDictionary()
+
+
+def _install(sync_engine, observers: List[QueryObserver]) -> None:
+
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get(_START_KEY)
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        for observer in observers:
+            observer(statement, elapsed, executemany)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get(_START_KEY):
+            conn.info[_START_KEY].pop()
+
+
+def observe_query_timings(engine, observer: QueryObserver) -> None:
+    # Métricas e log de queries lentas medem a mesma query uma vez só
+
+    sync_engine = engine.sync_engine
+    observers = _observers.get(sync_engine)
+    if observers is None:
+        observers = _observers[sync_engine] = []
+        _install(sync_engine, observers)
+    observers.append(observer)
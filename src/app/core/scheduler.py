@@ -6,55 +6,94 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
 from app.core.config import settings
+from app.core.leader import (
+    SYNC_LEASE_NAME, INSTANCE_ID, try_acquire_leadership, release_leadership
+)
 
 
-from app.services.infodengue_sync import InfoDengueSyncService, SyncServiceError
+from app.services.infodengue_sync import SyncServiceError
+from app.services.partitions import ensure_partitions
+from app.services.sync_coordinator import submit_sync, run_submitted_sync
 
 logger = logging.getLogger(__name__)
 
-job_status = {
-    "last_run_time": None,
-    "last_run_status": "Not Started",
-    "last_run_error": None
-}
+# Fábrica de sessões usada pelos jobs; injetada pela API (lifespan) ou pelo worker
+_session_factory = None
 
-async def scheduled_sync_job():
+leader_state = {"is_leader": False}
+
+
+async def _try_lead(session_factory) -> bool:
     
-    from app.db.session import AsyncSessionFactory 
+    try:
+        async with session_factory() as session:
+            return await try_acquire_leadership(
+                session, SYNC_LEASE_NAME, settings.SYNC_LEADER_LEASE_SECONDS
+            )
+    except Exception as e:
+        logger.error(f"Falha ao disputar a liderança do scheduler: {e}")
+        return False
+
+
+def _get_session_factory():
     
-    logger.info("Iniciando job de sincronização agendado (InfoDengue)...")
-    job_status["last_run_status"] = "Running"
+    if _session_factory is not None:
+        return _session_factory
+    from app.db.session import AsyncSessionFactory
+    return AsyncSessionFactory
+
+
+async def leader_heartbeat_job():
     
+    session_factory = _get_session_factory()
+
+    # Renova o lease do líder (inclusive durante syncs longos) e permite que
+    # outro processo assuma quando o líder morre e o lease expira.
+    is_leader = await _try_lead(session_factory)
+    leader_state["is_leader"] = is_leader
+
+
+async def scheduled_sync_job():
+    
+    session_factory = _get_session_factory()
+
+    if not await _try_lead(session_factory):
+        logger.info(f"Processo {INSTANCE_ID} não é o líder; sincronização agendada ignorada.")
+        leader_state["is_leader"] = False
+        return
+    leader_state["is_leader"] = True
     
+    logger.info("Iniciando job de sincronização agendado (InfoDengue)...")
     
-    async with AsyncSessionFactory() as session:
-        try:
-            
-            service = InfoDengueSyncService(session)
-            
-            stats = await service.run_full_sync() 
-            await session.commit()
-            
-            
-            logger.info(f"Job de sincronização agendado concluído. Stats: {stats}")
-            job_status["last_run_status"] = "Success"
-            job_status["last_run_error"] = None
-            
-        except (SyncServiceError, Exception) as e:
-            await session.rollback()
-            logger.error(f"Erro no job de sincronização agendado (InfoDengue): {e}", exc_info=True)
-            job_status["last_run_status"] = "Failed"
-            job_status["last_run_error"] = str(e)
-            
-        finally:
-            await session.close()
-            job_status["last_run_time"] = datetime.now()
+    try:
+        # Status e histórico ficam em sync_runs, visíveis para todos os processos.
+        # Se já existe um run ativo cobrindo a janela, este disparo é descartado.
+        submission = await submit_sync(session_factory, "scheduled")
+        if submission.coalesced:
+            logger.info(f"Sync agendado ignorado: run #{submission.run_id} já cobre a janela.")
+            return
+        stats = await run_submitted_sync(session_factory, submission, "scheduled")
+        logger.info(f"Job de sincronização agendado concluído. Stats: {stats}")
+    except (SyncServiceError, Exception) as e:
+        logger.error(f"Erro no job de sincronização agendado (InfoDengue): {e}", exc_info=True)
+
+
+async def partition_maintenance_job():
+
+    # Idempotente e serializado por advisory lock: pode rodar em todos os processos
+    try:
+        await ensure_partitions(_get_session_factory())
+    except Exception as e:
+        logger.error(f"Falha ao criar partições de weekly_reports: {e}")
 
 
 scheduler = AsyncIOScheduler(timezone="America/Sao_Paulo")
 
-def setup_scheduler():
+def setup_scheduler(session_factory=None):
     
+    global _session_factory
+    _session_factory = session_factory
+
     logger.info("Configurando o scheduler...")
     
     scheduler.add_job(
@@ -64,10 +103,50 @@ def setup_scheduler():
         
         name="Sincronização InfoDengue (AlertCity)",
         replace_existing=True,
+        # Um sync longo nunca se sobrepõe ao próximo disparo; disparos perdidos viram um só
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=settings.SYNC_INTERVAL_MINUTES * 60,
+    )
+
+    scheduler.add_job(
+        leader_heartbeat_job,
+        trigger=IntervalTrigger(seconds=settings.SYNC_LEADER_HEARTBEAT_SECONDS),
+        id="leader_heartbeat_job",
+        name="Heartbeat do lease de liderança do sync",
+        replace_existing=True,
+        next_run_time=datetime.now(scheduler.timezone),
+    )
+
+    scheduler.add_job(
+        partition_maintenance_job,
+        trigger=IntervalTrigger(hours=24),
+        id="partition_maintenance_job",
+        name="Criação antecipada das partições de weekly_reports",
+        replace_existing=True,
+        next_run_time=datetime.now(scheduler.timezone),
     )
     
     try:
         scheduler.start()
         logger.info("Scheduler iniciado com sucesso.")
     except Exception as e:
-        logger.error(f"Não foi possível iniciar o scheduler: {e}")
\ No newline at end of file
+        logger.error(f"Não foi possível iniciar o scheduler: {e}")
+
+
+async def shutdown_scheduler():
+    
+    session_factory = _get_session_factory()
+
+    if scheduler.running:
+        scheduler.shutdown()
+        logger.info("Scheduler finalizado.")
+
+    # Libera o lease para que outro processo assuma sem esperar a expiração
+    if leader_state["is_leader"]:
+        try:
+            async with session_factory() as session:
+                await release_leadership(session, SYNC_LEASE_NAME)
+            logger.info("Lease de liderança do sync liberado.")
+        except Exception as e:
+            logger.error(f"Falha ao liberar o lease de liderança: {e}")
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        # Chamadas concorrentes com a mesma chave compartilham uma única execução
+        while True:
+            future = self._in_flight.get(key)
+            if future is None:
+                break
+
+            logger.debug(f"Aguardando execução em andamento para {key}.")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Se o líder foi cancelado (ex: cliente desconectou) e nós não,
+                # tentamos assumir a execução.
+                if not future.cancelled():
+                    raise
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Evita o aviso "exception was never retrieved" quando não há seguidores
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
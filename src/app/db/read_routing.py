@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from prometheus_client import Counter
+from sqlalchemy.sql import text
+
+from app.core.config import settings
+from app.core.metrics import register_callback_gauge
+
+logger = logging.getLogger(__name__)
+
+
+# Atraso da réplica em segundos. Fora de recovery (ex: DATABASE_READ_URL apontando para o
+# próprio primário) é 0; com a réplica em dia (tudo recebido já aplicado) também.
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+_state = {
+    "lag_seconds": None,
+    "checked_at": 0.0,
+    "last_error": None,
+    # Último commit conhecido no primário (sync local ou notificado por outro processo)
+    "last_write_at": 0.0,
+}
+_monitor_task: Optional[asyncio.Task] = None
+
+
+def _replica_lag_gauge() -> dict:
+    lag = _state["lag_seconds"]
+    return {(): lag} if lag is not None else {}
+
+
+db_replica_lag_seconds = register_callback_gauge(
+    "db_replica_lag_seconds", "Atraso de replicação medido na réplica de leitura.",
+    callback=_replica_lag_gauge,
+)
+db_read_routing_total = Counter(
+    "db_read_routing_total", "Sessões de leitura por destino (replica/primary).", ("target",),
+)
+
+
+async def release_read_session(session) -> None:
+    # Devolve a conexão ao pool assim que as queries da requisição terminam (antes de
+    # renderizar ou serializar). Objetos já carregados continuam legíveis, desanexados;
+    # uma nova query na mesma sessão simplesmente pega outra conexão.
+    await session.close()
+
+
+def note_primary_write() -> None:
+    # Logo após um commit, a réplica pode ainda não ter o dado: leituras vão ao primário
+    # por READ_REPLICA_MAX_LAG_SECONDS (e o cache de respostas não guarda dado antigo)
+    _state["last_write_at"] = time.monotonic()
+
+
+async def _query_lag(read_engine) -> float:
+    async with read_engine.connect() as conn:
+        return await conn.scalar(REPLICA_LAG_SQL)
+
+
+async def _refresh_lag(read_engine) -> None:
+
+    try:
+        # Timeout curto e próprio: réplica fora do ar não segura o monitor até o timeout de conexão
+        lag = await asyncio.wait_for(
+            _query_lag(read_engine), timeout=settings.READ_REPLICA_LAG_QUERY_TIMEOUT_SECONDS
+        )
+        _state["lag_seconds"] = float(lag or 0.0)
+        _state["last_error"] = None
+    except Exception as e:
+        error = str(e) or type(e).__name__
+        if _state["last_error"] is None:
+            logger.warning(f"Réplica de leitura indisponível; usando o primário: {error}")
+        _state["lag_seconds"] = None
+        _state["last_error"] = error
+    _state["checked_at"] = time.monotonic()
+
+
+async def _monitor_lag(read_engine) -> None:
+    while True:
+        await _refresh_lag(read_engine)
+        await asyncio.sleep(settings.READ_REPLICA_LAG_CHECK_SECONDS)
+
+
+def start_replica_lag_monitor(read_engine) -> None:
+    # Mede o atraso da réplica em segundo plano; as requisições só leem o último valor
+
+    global _monitor_task
+    if _monitor_task is None:
+        _monitor_task = asyncio.get_running_loop().create_task(_monitor_lag(read_engine))
+
+
+async def stop_replica_lag_monitor() -> None:
+
+    global _monitor_task
+    if _monitor_task is not None:
+        _monitor_task.cancel()
+        try:
+            await _monitor_task
+        except asyncio.CancelledError:
+            pass
+        _monitor_task = None
+
+
+def should_use_replica() -> bool:
+    # Só estado em memória: nenhuma query no caminho da requisição
+
+    now = time.monotonic()
+    if now - _state["last_write_at"] < settings.READ_REPLICA_MAX_LAG_SECONDS:
+        return False
+
+    # Medição antiga (monitor parado ou travado) não vale mais como "réplica em dia"
+    if now - _state["checked_at"] > 3 * settings.READ_REPLICA_LAG_CHECK_SECONDS:
+        return False
+
+    lag = _state["lag_seconds"]
+    return lag is not None and lag <= settings.READ_REPLICA_MAX_LAG_SECONDS
+
+
+def read_replica_status(enabled: bool) -> dict:
+
+    if not enabled:
+        return {"enabled": False}
+    lag = _state["lag_seconds"]
+    since_write = time.monotonic() - _state["last_write_at"]
+    return {
+        "enabled": True,
+        "lag_seconds": round(lag, 3) if lag is not None else None,
+        "max_lag_seconds": settings.READ_REPLICA_MAX_LAG_SECONDS,
+        "last_error": _state["last_error"],
+        "seconds_since_last_write": round(since_write, 1) if _state["last_write_at"] else None,
+        "routing": "replica" if should_use_replica() else "primary",
+    }
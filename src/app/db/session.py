@@ -1,32 +1,91 @@
 import logging
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import text 
 
 from app.core.config import settings
-from app.core.scheduler import scheduler, setup_scheduler
+from app.core.metrics import instrument_engine, register_pool_metrics
+from app.core.profiling import instrument_slow_queries
+from app.core.scheduler import setup_scheduler, shutdown_scheduler
+from app.services.render_pool import shutdown_render_pool
+from app.core.cache import start_invalidation_listener, stop_invalidation_listener
+from app.db.read_routing import (
+    db_read_routing_total, should_use_replica, start_replica_lag_monitor, stop_replica_lag_monitor,
+)
+from app.services.territory_registry import (
+    refresh_territory_registry, start_territory_listener, stop_territory_listener,
+)
 
 logger = logging.getLogger(__name__)
 
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-)
+def create_engine(pool_size: int, max_overflow: int, url: Optional[str] = None,
+                  read_only: bool = False) -> AsyncEngine:
 
+    # Queries quentes (agregação por UF, mapa, listagem, upsert UNNEST) têm texto fixo,
+    # então cada conexão prepara uma vez e reutiliza o statement no servidor
+    connect_args = {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    if read_only:
+        # Garante no servidor que o engine de leitura nunca escreve (mesmo com a DSN do primário)
+        connect_args["server_settings"] = {"default_transaction_read_only": "on"}
+
+    return create_async_engine(
+        url or settings.DATABASE_URL,
+        echo=False,
+        pool_pre_ping=True,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        connect_args=connect_args,
+    )
+
+
+def create_session_factory(bind: AsyncEngine) -> sessionmaker:
+    
+    return sessionmaker(
+        bind=bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False,
+    )
+
+
+engine = create_engine(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+    register_pool_metrics(engine, "api")
+if settings.SLOW_QUERY_THRESHOLD_MS > 0:
+    instrument_slow_queries(engine)
+
+
+def create_read_only_session_factory(bind: AsyncEngine) -> sessionmaker:
+    # Autocommit: cada SELECT roda sozinho, sem BEGIN/COMMIT, e a sessão nunca faz commit
+
+    return create_session_factory(bind.execution_options(isolation_level="AUTOCOMMIT"))
+
+
+AsyncSessionFactory = create_session_factory(engine)
+PrimaryReadSessionFactory = create_read_only_session_factory(engine)
+
+
+# Engine de leitura (réplica) com pool próprio: rajadas de escrita do sync não disputam
+# conexões com o dashboard. Sem DATABASE_READ_URL, get_read_db usa o primário.
+read_engine: Optional[AsyncEngine] = None
+ReadSessionFactory = PrimaryReadSessionFactory
+if settings.DATABASE_READ_URL:
+    read_engine = create_engine(
+        settings.READ_DB_POOL_SIZE, settings.READ_DB_MAX_OVERFLOW,
+        url=settings.DATABASE_READ_URL, read_only=True,
+    )
+    if settings.METRICS_ENABLED:
+        instrument_engine(read_engine)
+        register_pool_metrics(read_engine, "api_read")
+    if settings.SLOW_QUERY_THRESHOLD_MS > 0:
+        instrument_slow_queries(read_engine)
+    ReadSessionFactory = create_read_only_session_factory(read_engine)
 
-AsyncSessionFactory = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autoflush=False,
-)
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     
@@ -41,6 +100,22 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    # Endpoints só de leitura: réplica quando configurada e em dia, senão o primário.
+    # Sessão em autocommit, sem COMMIT no final; os serviços devolvem a conexão ao pool
+    # com release_read_session assim que terminam as queries.
+
+    use_replica = read_engine is not None and should_use_replica()
+    db_read_routing_total.labels(target="replica" if use_replica else "primary").inc()
+    factory = ReadSessionFactory if use_replica else PrimaryReadSessionFactory
+
+    async with factory() as session:
+        try:
+            yield session
+        except Exception as e:
+            logger.error(f"Erro na sessão de leitura do banco de dados: {e}")
+            raise
+
 @asynccontextmanager
 async def lifespan(app):
     
@@ -56,10 +131,24 @@ async def lifespan(app):
         logger.error(f"Não foi possível conectar ao banco de dados no startup: {e}")
     
     
-    try:
-        setup_scheduler()
-    except Exception as e:
-        logger.error(f"Falha ao iniciar o scheduler: {e}")
+    # Com o sync rodando em outro processo (python -m app.worker), a API
+    # apenas escuta as invalidações de cache publicadas pelo worker.
+    start_invalidation_listener(read_replica=read_engine is not None)
+
+    # Metadados dos municípios em memória; o seed avisa via NOTIFY quando a tabela muda
+    await refresh_territory_registry(AsyncSessionFactory)
+    start_territory_listener(AsyncSessionFactory)
+
+    if read_engine is not None:
+        start_replica_lag_monitor(read_engine)
+
+    if settings.SCHEDULER_ENABLED:
+        try:
+            setup_scheduler(AsyncSessionFactory)
+        except Exception as e:
+            logger.error(f"Falha ao iniciar o scheduler: {e}")
+    else:
+        logger.info("Scheduler desabilitado neste processo (SCHEDULER_ENABLED=false).")
 
     yield 
     
@@ -67,10 +156,15 @@ async def lifespan(app):
     logger.info("Finalizando a aplicação...")
     
     
-    if scheduler.running:
-        scheduler.shutdown()
-        logger.info("Scheduler finalizado.")
+    await shutdown_scheduler()
+
+    shutdown_render_pool()
+    await stop_invalidation_listener()
+    await stop_territory_listener()
+    await stop_replica_lag_monitor()
         
     
     await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
     logger.info("Conexão com DB fechada.")
\ No newline at end of file
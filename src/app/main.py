@@ -1,6 +1,10 @@
 from fastapi import FastAPI
 from app.db.session import lifespan  
 from app.api.api import api_router 
+from app.core.cache import ResponseCacheMiddleware
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, metrics_endpoint
+from app.core.profiling import ProfilingMiddleware, request_profiling_enabled
 import logging
 
 
@@ -16,6 +20,24 @@ app = FastAPI(
 )
 
 
+if settings.CACHE_ENABLED:
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        path_prefixes=["/api/v1/reports", "/api/v1/map/render"],
+    )
+
+
+# Log de requisições lentas e profiling opt-in (settings ou header X-Profile)
+if request_profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+
+
+# Adicionado por último para ser o middleware mais externo (mede inclusive os HITs de cache)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+
 app.include_router(api_router, prefix="/api/v1")
 
 
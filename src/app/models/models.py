@@ -1,9 +1,10 @@
 import datetime
 from sqlalchemy import (
-    Integer, String, DateTime, Index, Float, Date
+    Integer, String, DateTime, Index, Float, Date, Text
 )
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from sqlalchemy.schema import UniqueConstraint, ForeignKey
 from typing import List
 
@@ -29,18 +30,19 @@ class WeeklyReport(Base):
     
     __tablename__ = "weekly_reports"
 
-    id: Mapped[int] = mapped_column(primary_key=True)
+    # Particionada por RANGE (se), uma partição por ano epidemiológico (services/partitions.py);
+    # a chave de partição precisa fazer parte da PK e das constraints únicas.
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
     
-    se: Mapped[int] = mapped_column(Integer, nullable=False, index=True, 
+    se: Mapped[int] = mapped_column(Integer, primary_key=True,
                                    comment="Semana Epidemiológica (ex: 202544)")
     
     
     geocode: Mapped[str] = mapped_column(
         String(7), 
         ForeignKey("territories.geocode"), 
-        nullable=False, 
-        index=True
+        nullable=False
     )
 
     
@@ -60,7 +62,7 @@ class WeeklyReport(Base):
     estimated_cases_max: Mapped[int] = mapped_column(Integer, nullable=True)
 
     
-    alert_level: Mapped[int] = mapped_column(Integer, nullable=True, index=True)
+    alert_level: Mapped[int] = mapped_column(Integer, nullable=True)
     
     
     population: Mapped[float] = mapped_column(Float, nullable=True)
@@ -75,6 +77,138 @@ class WeeklyReport(Base):
 
     __table_args__ = (
         
+        # Também atende os filtros por geocode (prefixo) e o ON CONFLICT do upsert
         UniqueConstraint("geocode", "se", name="uq_geocode_se_report"),
-        Index("idx_report_se_level", "se", "alert_level"),
-    )
\ No newline at end of file
+        # Leituras por SE (mapa, tiles, agregação por UF) resolvidas só com o índice
+        Index("idx_report_se_geocode_covering", "se", "geocode",
+              postgresql_include=["alert_level", "reported_cases", "population"]),
+        {"postgresql_partition_by": "RANGE (se)"},
+    )
+
+
+class WeeklyReportMetrics(Base):
+    # Métricas derivadas de weekly_reports por (se, geocode), calculadas uma vez no ingest
+    # (services/derived_metrics.py) em vez de a cada leitura
+
+    __tablename__ = "weekly_report_metrics"
+
+    # se primeiro: mapa e tiles leem uma SE inteira; o join com weekly_reports usa a PK completa
+    se: Mapped[int] = mapped_column(Integer, primary_key=True)
+    geocode: Mapped[str] = mapped_column(String(7), ForeignKey("territories.geocode"), primary_key=True)
+
+    incidence: Mapped[float] = mapped_column(Float, nullable=True,
+                                             comment="Casos notificados por 100 mil habitantes")
+    growth_rate: Mapped[float] = mapped_column(Float, nullable=True,
+                                               comment="Variação relativa dos casos sobre a SE anterior (0.25 = +25%)")
+    cases_ma3: Mapped[float] = mapped_column(Float, nullable=True,
+                                             comment="Média móvel de 3 semanas dos casos notificados")
+    incidence_ma3: Mapped[float] = mapped_column(Float, nullable=True,
+                                                 comment="Média móvel de 3 semanas da incidência")
+
+    computed_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class SchedulerLease(Base):
+    
+    __tablename__ = "scheduler_leases"
+
+    
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+
+    
+    holder: Mapped[str] = mapped_column(String(255), nullable=False,
+                                        comment="Identificador do processo líder (host:pid)")
+    acquired_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    expires_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class SyncRun(Base):
+    
+    __tablename__ = "sync_runs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    
+    trigger: Mapped[str] = mapped_column(String(20), nullable=False,
+                                         comment="Origem: scheduled, api, api_wait, backfill")
+    status: Mapped[str] = mapped_column(String(20), nullable=False, index=True,
+                                        comment="running, success, failed")
+    host: Mapped[str] = mapped_column(String(255), nullable=True)
+
+    
+    ew_start: Mapped[int] = mapped_column(Integer, nullable=True)
+    ey_start: Mapped[int] = mapped_column(Integer, nullable=True)
+    ew_end: Mapped[int] = mapped_column(Integer, nullable=True)
+    ey_end: Mapped[int] = mapped_column(Integer, nullable=True)
+
+    
+    started_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    finished_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    heartbeat_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False,
+        comment="Último sinal de vida de quem executa o run"
+    )
+    fetch_seconds: Mapped[float] = mapped_column(Float, nullable=True)
+    parse_seconds: Mapped[float] = mapped_column(Float, nullable=True)
+    upsert_seconds: Mapped[float] = mapped_column(Float, nullable=True)
+    derive_seconds: Mapped[float] = mapped_column(Float, nullable=True)
+    quiet_slot: Mapped[int] = mapped_column(
+        Integer, nullable=True,
+        comment="Fatia de municípios quietos atualizada pelo run (NULL = run sem rodízio)"
+    )
+
+    
+    inserted: Mapped[int] = mapped_column(Integer, nullable=True)
+    updated: Mapped[int] = mapped_column(Integer, nullable=True)
+    geocodes_synced: Mapped[int] = mapped_column(Integer, nullable=True)
+    geocodes_failed: Mapped[int] = mapped_column(Integer, nullable=True)
+    concurrency: Mapped[int] = mapped_column(Integer, nullable=True)
+
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+
+
+class SyncTask(Base):
+    
+    __tablename__ = "sync_tasks"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    
+    run_id: Mapped[int] = mapped_column(Integer, ForeignKey("sync_runs.id", ondelete="CASCADE"),
+                                        nullable=False, index=True)
+    shard: Mapped[int] = mapped_column(Integer, nullable=False,
+                                       comment="Posição do shard na ordem de prioridade do run")
+    geocodes: Mapped[List[str]] = mapped_column(ARRAY(String(7)), nullable=False)
+
+    
+    status: Mapped[str] = mapped_column(String(20), nullable=False, server_default="pending",
+                                        comment="pending, claimed, done, failed")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    claimed_by: Mapped[str] = mapped_column(String(255), nullable=True)
+    claimed_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    visible_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False,
+        comment="Claim expira aqui (visibility timeout): o shard volta a ser elegível"
+    )
+    finished_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    
+    inserted: Mapped[int] = mapped_column(Integer, nullable=True)
+    updated: Mapped[int] = mapped_column(Integer, nullable=True)
+    geocodes_failed: Mapped[int] = mapped_column(Integer, nullable=True)
+    ses: Mapped[List[int]] = mapped_column(ARRAY(Integer), nullable=True)
+    fetch_seconds: Mapped[float] = mapped_column(Float, nullable=True)
+    parse_seconds: Mapped[float] = mapped_column(Float, nullable=True)
+    upsert_seconds: Mapped[float] = mapped_column(Float, nullable=True)
+    derive_seconds: Mapped[float] = mapped_column(Float, nullable=True)
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+
+    __table_args__ = (
+        # Índice parcial da fila: o claim só olha shards ainda não concluídos
+        Index("idx_sync_tasks_claimable", "id",
+              postgresql_where=text("status IN ('pending', 'claimed')")),
+    )
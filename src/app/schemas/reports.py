@@ -24,6 +24,16 @@ class WeeklyReportBase(BaseModel):
     population: Optional[float] = None
     rt_value: Optional[float] = None
 
+class WeeklyReportMetricsPublic(BaseModel):
+    incidence: Optional[float] = None
+    growth_rate: Optional[float] = None
+    cases_ma3: Optional[float] = None
+    incidence_ma3: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
 class WeeklyReportPublic(WeeklyReportBase):
     id: int
     geocode: str
@@ -31,6 +41,8 @@ class WeeklyReportPublic(WeeklyReportBase):
     
     
     territory: Optional[TerritoryPublic] = None
+    # Métricas derivadas calculadas no sync (weekly_report_metrics)
+    metrics: Optional[WeeklyReportMetricsPublic] = None
 
     class Config:
         from_attributes = True
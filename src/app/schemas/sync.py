@@ -0,0 +1,38 @@
+
+
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+
+class SyncRunPublic(BaseModel):
+    id: int
+    trigger: str
+    status: str
+    host: Optional[str] = None
+
+    
+    ew_start: Optional[int] = None
+    ey_start: Optional[int] = None
+    ew_end: Optional[int] = None
+    ey_end: Optional[int] = None
+
+    
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    fetch_seconds: Optional[float] = None
+    parse_seconds: Optional[float] = None
+    upsert_seconds: Optional[float] = None
+    derive_seconds: Optional[float] = None
+
+    
+    inserted: Optional[int] = None
+    updated: Optional[int] = None
+    geocodes_synced: Optional[int] = None
+    geocodes_failed: Optional[int] = None
+    concurrency: Optional[int] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -2,7 +2,7 @@ import asyncio
 import logging
 import sys
 import os
-from datetime import datetime
+from datetime import date
 
 
 
@@ -10,8 +10,10 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 sys.path.append(project_root)
 
 from app.db.session import AsyncSessionFactory
-from app.services.infodengue_sync import InfoDengueSyncService, SyncServiceError
+from app.services.infodengue_sync import SyncServiceError
+from app.services.sync_coordinator import coordinated_sync
 from app.core.config import settings 
+from app.core.epiweek import current_se, split_se
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("backfill_infodengue")
@@ -23,9 +25,8 @@ EY_START = 2023
 EW_START = 1
 
 
-current_date = datetime(2025, 11, 16)
-EY_END = current_date.year
-EW_END = current_date.isocalendar().week
+# Até a SE corrente (calendário epidemiológico, não semana ISO)
+EY_END, EW_END = split_se(current_se(date.today()))
 
 
 async def main():
@@ -38,27 +39,24 @@ async def main():
         logger.error("DATABASE_URL não encontrada. Verifique seu arquivo .env")
         sys.exit(1)
 
-    async with AsyncSessionFactory() as session:
-        try:
-            service = InfoDengueSyncService(session)
-            
-            stats = await service.run_full_sync(
-                ew_start=EW_START,
-                ey_start=EY_START,
-                ew_end=EW_END,
-                ey_end=EY_END
-            )
-            
-            await session.commit()
-            logger.info("--- BACKFILL CONCLUÍDO ---")
-            logger.info(f"Estatísticas: {stats}")
-
-        except (SyncServiceError, Exception) as e:
-            await session.rollback()
-            logger.error(f"Erro fatal durante o backfill: {e}", exc_info=True)
-            sys.exit(1)
-        finally:
-            logger.info("Fechando sessão.")
+    try:
+        # Registrado em sync_runs e serializado com os demais syncs (trigger "backfill")
+        stats = await coordinated_sync(
+            AsyncSessionFactory,
+            "backfill",
+            {
+                "ew_start": EW_START,
+                "ey_start": EY_START,
+                "ew_end": EW_END,
+                "ey_end": EY_END,
+            },
+        )
+        logger.info("--- BACKFILL CONCLUÍDO ---")
+        logger.info(f"Estatísticas: {stats}")
+
+    except (SyncServiceError, Exception) as e:
+        logger.error(f"Erro fatal durante o backfill: {e}", exc_info=True)
+        sys.exit(1)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
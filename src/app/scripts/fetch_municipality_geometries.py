@@ -0,0 +1,128 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import Dict, List
+
+import httpx
+
+
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.append(project_root)
+
+from app.services.geo_store import GEO_DIR, UF_TO_STATE_CODE
+
+
+
+# API de malhas do IBGE (v3): municípios de uma UF em GeoJSON, propriedade "codarea" = geocode
+MESH_URL = "https://servicodados.ibge.gov.br/api/v3/malhas/estados/{state_code}"
+# API de localidades: nomes dos municípios da UF
+NAMES_URL = "https://servicodados.ibge.gov.br/api/v1/localidades/estados/{state_code}/municipios"
+
+QUALITY_CHOICES = ("minima", "intermediaria", "superior", "maxima")
+
+# Saída no layout lido por geo_store.state_geometry_path e pela malha nacional das tiles
+MUNICIPALITIES_DIR = os.path.join(GEO_DIR, "municipalities")
+NATIONAL_PATH = os.path.join(GEO_DIR, "br_municipalities.json")
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("fetch_municipality_geometries")
+
+
+def _write_atomic(path: str, data: dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def build_layer(mesh: dict, names: Dict[str, str]) -> dict:
+    # Formato das malhas do repositório (pe_municipalities.json): properties id/name/description
+
+    features = []
+    for feature in mesh["features"]:
+        geocode = str(feature["properties"]["codarea"])
+        name = names.get(geocode, geocode)
+        features.append({
+            "type": "Feature",
+            "properties": {"id": geocode, "name": name, "description": name},
+            "geometry": feature["geometry"],
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+async def fetch_state_layer(client: httpx.AsyncClient, uf: str, quality: str) -> dict:
+
+    state_code = UF_TO_STATE_CODE[uf]
+    mesh_response = await client.get(
+        MESH_URL.format(state_code=state_code),
+        params={"formato": "application/vnd.geo+json", "intrarregiao": "municipio", "qualidade": quality},
+    )
+    mesh_response.raise_for_status()
+    names_response = await client.get(NAMES_URL.format(state_code=state_code))
+    names_response.raise_for_status()
+
+    names = {str(item["id"]): item["nome"] for item in names_response.json()}
+    return build_layer(mesh_response.json(), names)
+
+
+async def main(args) -> None:
+
+    ufs = [uf.upper() for uf in args.ufs] if args.ufs else sorted(UF_TO_STATE_CODE)
+    unknown = [uf for uf in ufs if uf not in UF_TO_STATE_CODE]
+    if unknown:
+        logger.error(f"UFs desconhecidas: {unknown}")
+        sys.exit(1)
+
+    layers: List[dict] = []
+    failed: List[str] = []
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        for uf in ufs:
+            path = os.path.join(args.output_dir, f"{uf}.json")
+            if args.skip_existing and os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    layers.append(json.load(f))
+                logger.info(f"{uf}: {path} já existe; mantido.")
+                continue
+            try:
+                layer = await fetch_state_layer(client, uf, args.quality)
+            except httpx.HTTPError as e:
+                logger.error(f"{uf}: falha ao baixar a malha: {e}")
+                failed.append(uf)
+                continue
+            _write_atomic(path, layer)
+            layers.append(layer)
+            logger.info(f"{uf}: {len(layer['features'])} municípios gravados em {path}.")
+
+    if args.national and not failed:
+        national = {"type": "FeatureCollection", "features": [f for layer in layers for f in layer["features"]]}
+        _write_atomic(NATIONAL_PATH, national)
+        logger.info(f"Malha nacional ({len(national['features'])} municípios) gravada em {NATIONAL_PATH}.")
+    elif args.national:
+        logger.warning(f"Malha nacional não gerada: faltaram as UFs {failed}.")
+
+    # A malha das tiles é carregada uma vez por processo
+    logger.info("Reinicie API e workers para que as tiles passem a usar as novas malhas.")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Baixa as malhas municipais por UF do IBGE para src/static/geo/municipalities/"
+    )
+    parser.add_argument("--ufs", nargs="*", default=None, help="UFs a baixar (padrão: todas as 27)")
+    parser.add_argument("--quality", choices=QUALITY_CHOICES, default="intermediaria",
+                        help="Nível de detalhe da malha do IBGE")
+    parser.add_argument("--output-dir", default=MUNICIPALITIES_DIR)
+    parser.add_argument("--national", action="store_true",
+                        help="Também grava br_municipalities.json (malha nacional das tiles)")
+    parser.add_argument("--skip-existing", action="store_true", help="Não baixa UFs que já têm arquivo")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
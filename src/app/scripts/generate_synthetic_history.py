@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import logging
+import sys
+import os
+import time
+from datetime import datetime
+from typing import Iterable, List
+
+import numpy as np
+
+
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.append(project_root)
+
+from app.core.config import settings
+from app.core.epiweek import epiweek_start, weeks_in_year
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("generate_synthetic_history")
+
+
+# Colunas gravadas via COPY (id e last_synced_at ficam com o default do banco)
+COPY_COLUMNS = [
+    "se", "geocode", "data_ini_se", "reported_cases", "estimated_cases",
+    "estimated_cases_min", "estimated_cases_max", "alert_level", "population", "rt_value",
+]
+
+
+def _asyncpg_dsn() -> str:
+    return settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+def generate_year(geocodes: List[str], year: int, seed: int = 42) -> List[tuple]:
+    # Gera as linhas de um ano inteiro para todos os municípios (vetorizado com numpy)
+
+    n_cities = len(geocodes)
+    weeks = weeks_in_year(year)
+
+    # Perfil estável por município (mesma semente = mesma "cidade" em todos os anos)
+    profile_rng = np.random.default_rng(seed)
+    population = np.exp(profile_rng.uniform(np.log(800), np.log(12_000_000), n_cities)).round()
+    base_rate = profile_rng.uniform(0.5, 40.0, n_cities)
+    peak_week = profile_rng.integers(8, 21, n_cities)
+    amplitude = profile_rng.uniform(1.5, 12.0, n_cities)
+
+    # Variação por ano (anos epidêmicos e anos calmos)
+    rng = np.random.default_rng(seed * 10_000 + year)
+    year_factor = rng.lognormal(0.0, 0.5)
+
+    week_idx = np.arange(1, weeks + 1)
+    seasonal = 1 + amplitude[:, None] * np.exp(-((week_idx[None, :] - peak_week[:, None]) ** 2) / 60)
+    expected = base_rate[:, None] * seasonal * year_factor * population[:, None] / 100_000
+
+    cases = rng.poisson(expected)
+    estimated = cases * rng.uniform(1.0, 1.4, cases.shape)
+    incidence = cases / population[:, None] * 100_000
+    alert = np.select([incidence < 10, incidence < 50, incidence < 300], [1, 2, 3], default=4)
+    rt = rng.uniform(0.4, 2.2, cases.shape)
+
+    starts = [epiweek_start(year, int(w)) for w in week_idx]
+    ses = [year * 100 + int(w) for w in week_idx]
+
+    records = []
+    for i, geocode in enumerate(geocodes):
+        pop = float(population[i])
+        for j in range(weeks):
+            est = float(estimated[i, j])
+            records.append((
+                ses[j], geocode, starts[j], int(cases[i, j]), round(est, 1),
+                int(est * 0.8), int(est * 1.3) + 1, int(alert[i, j]), pop, round(float(rt[i, j]), 4),
+            ))
+    return records
+
+
+async def load_synthetic_history(
+    years: Iterable[int], seed: int = 42, truncate: bool = False, geocode_limit: int = 0
+) -> int:
+
+    import asyncpg
+    from app.db.session import AsyncSessionFactory
+    from app.services.partitions import ensure_partitions
+
+    # Anos antigos do histórico sintético precisam das suas partições de weekly_reports
+    years = list(years)
+    await ensure_partitions(AsyncSessionFactory, years)
+
+    conn = await asyncpg.connect(_asyncpg_dsn())
+    try:
+        geocodes = [r["geocode"] for r in await conn.fetch("SELECT geocode FROM territories ORDER BY geocode")]
+        if geocode_limit:
+            geocodes = geocodes[:geocode_limit]
+        if not geocodes:
+            raise RuntimeError("Tabela territories vazia. Rode scripts/seed_territories.py antes.")
+
+        if truncate:
+            logger.info("Limpando weekly_reports (TRUNCATE)...")
+            await conn.execute("TRUNCATE weekly_reports RESTART IDENTITY")
+
+        total = 0
+        for year in years:
+            started = time.perf_counter()
+            records = generate_year(geocodes, year, seed)
+
+            async with conn.transaction():
+                if truncate:
+                    # Tabela vazia: COPY direto, o caminho mais rápido
+                    await conn.copy_records_to_table("weekly_reports", records=records, columns=COPY_COLUMNS)
+                else:
+                    # Dados já existentes: COPY para staging + merge sem sobrescrever o que já existe
+                    await conn.execute(
+                        "CREATE TEMP TABLE weekly_reports_staging "
+                        "(LIKE weekly_reports INCLUDING DEFAULTS) ON COMMIT DROP"
+                    )
+                    await conn.copy_records_to_table(
+                        "weekly_reports_staging", records=records, columns=COPY_COLUMNS
+                    )
+                    columns = ", ".join(COPY_COLUMNS)
+                    await conn.execute(
+                        f"INSERT INTO weekly_reports ({columns}) "
+                        f"SELECT {columns} FROM weekly_reports_staging "
+                        "ON CONFLICT (geocode, se) DO NOTHING"
+                    )
+
+            total += len(records)
+            elapsed = time.perf_counter() - started
+            logger.info(
+                f"Ano {year}: {len(records)} linhas em {elapsed:.1f}s "
+                f"({len(records) / elapsed:,.0f} linhas/s)."
+            )
+
+        logger.info("Atualizando estatísticas do planner (ANALYZE weekly_reports)...")
+        await conn.execute("ANALYZE weekly_reports")
+        return total
+    finally:
+        await conn.close()
+
+
+async def main(args):
+
+    logger.info("--- GERANDO HISTÓRICO SINTÉTICO (weekly_reports) ---")
+
+    if not settings.DATABASE_URL:
+        logger.error("DATABASE_URL não encontrada. Verifique seu arquivo .env")
+        sys.exit(1)
+
+    end_year = args.end_year or datetime.now().year - 1
+    years = list(range(end_year - args.years + 1, end_year + 1))
+    logger.info(f"Anos: {years[0]}-{years[-1]} | truncate={args.truncate}")
+
+    total = await load_synthetic_history(years, seed=args.seed, truncate=args.truncate,
+                                         geocode_limit=args.geocode_limit)
+
+    ses = [year * 100 + week for year in years for week in range(1, weeks_in_year(year) + 1)]
+
+    # O COPY não passa pelo sync: métricas derivadas calculadas aqui, uma vez
+    if not args.skip_derived_metrics:
+        from app.db.session import AsyncSessionFactory
+        from app.services.derived_metrics import rebuild_derived_metrics
+
+        await rebuild_derived_metrics(AsyncSessionFactory, ses[0], ses[-1])
+
+    # Caches de leitura e artefatos de mapas/tiles das SEs geradas ficaram obsoletos
+    from app.core.cache import invalidate_read_cache
+    from app.services.map_artifacts import invalidate_map_artifacts
+    from app.services.tile_service import invalidate_tiles
+
+    invalidate_map_artifacts(ses)
+    invalidate_tiles(ses)
+    await invalidate_read_cache()
+
+    logger.info(f"--- CONCLUÍDO: {total} linhas geradas ---")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera histórico sintético de weekly_reports via COPY")
+    parser.add_argument("--years", type=int, default=10, help="Quantidade de anos epidemiológicos")
+    parser.add_argument("--end-year", type=int, default=None, help="Último ano gerado (padrão: ano passado)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="Apaga weekly_reports antes (COPY direto)")
+    parser.add_argument("--geocode-limit", type=int, default=0, help="Usa só os N primeiros municípios")
+    parser.add_argument("--skip-derived-metrics", action="store_true",
+                        help="Não calcula weekly_report_metrics (rode rebuild_derived_metrics.py depois)")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
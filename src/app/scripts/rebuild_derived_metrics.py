@@ -0,0 +1,67 @@
+import argparse
+import asyncio
+import logging
+import sys
+import os
+
+
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.append(project_root)
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("rebuild_derived_metrics")
+
+
+async def main(args):
+
+    # O sync mantém weekly_report_metrics em dia; este script recalcula um intervalo inteiro
+    # (histórico carregado antes da tabela existir, carga sintética via COPY)
+    logger.info("--- RECALCULANDO MÉTRICAS DERIVADAS (weekly_report_metrics) ---")
+
+    if not settings.DATABASE_URL:
+        logger.error("DATABASE_URL não encontrada. Verifique seu arquivo .env")
+        sys.exit(1)
+
+    from app.db.session import AsyncSessionFactory, engine
+    from app.models.models import WeeklyReport
+    from app.services.derived_metrics import rebuild_derived_metrics
+    from app.services.sync_hooks import run_post_sync_hooks
+    from app.core.epiweek import se_range
+
+    try:
+        async with AsyncSessionFactory() as session:
+            min_se, max_se = (await session.execute(
+                select(func.min(WeeklyReport.se), func.max(WeeklyReport.se))
+            )).one()
+        if min_se is None:
+            logger.info("weekly_reports vazio; nada a calcular.")
+            return
+
+        start_se = args.start_se or min_se
+        end_se = args.end_se or max_se
+        logger.info(f"Intervalo: SE {start_se} a SE {end_se}")
+
+        total = await rebuild_derived_metrics(AsyncSessionFactory, start_se, end_se, args.geocode_chunk)
+
+        # Mapas pré-renderizados, tiles em disco e respostas em cache ainda não têm as métricas
+        # novas: mesmos hooks de um sync que alterasse essas SEs
+        await run_post_sync_hooks({"affected_ses": se_range(start_se, end_se)}, AsyncSessionFactory)
+        logger.info(f"--- CONCLUÍDO: {total} linhas de métricas gravadas ---")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcula weekly_report_metrics a partir de weekly_reports")
+    parser.add_argument("--start-se", type=int, default=None, help="SE inicial (padrão: a menor em weekly_reports)")
+    parser.add_argument("--end-se", type=int, default=None, help="SE final (padrão: a maior em weekly_reports)")
+    parser.add_argument("--geocode-chunk", type=int, default=500, help="Municípios por transação")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
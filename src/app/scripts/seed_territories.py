@@ -1,5 +1,4 @@
-
-
+import argparse
 import asyncio
 import logging
 import httpx
@@ -7,120 +6,240 @@ import pandas as pd
 import io
 import sys
 import os
-from sqlalchemy.dialects.postgresql import insert as pg_insert
-from sqlalchemy.exc import OperationalError
+from typing import Dict, List, Tuple
 
 
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 sys.path.append(project_root)
 
-from app.db.session import AsyncSessionFactory
-from app.models.models import Territory
-from app.core.config import settings 
+from app.core.config import settings
+from app.core.pg_events import asyncpg_dsn
 
 
 
 DATA_SOURCE_URL = "https://raw.githubusercontent.com/kelvins/municipios-brasileiros/main/csv/municipios.csv"
 
+# Colunas de territories gravadas via COPY, na ordem das tuplas de prepare_data
+COPY_COLUMNS = ["geocode", "name", "state_code"]
+
+# Quantas alterações de cada tipo aparecem no relatório (o total sempre aparece)
+REPORT_SAMPLE_SIZE = 20
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("seed_territories")
 
-async def fetch_municipios_csv() -> pd.DataFrame:
-    
+
+def _write_cache(path: str, content: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+async def fetch_municipios_csv(cache_path: str) -> pd.DataFrame:
+
     logger.info(f"Baixando dados de municípios de {DATA_SOURCE_URL}...")
     async with httpx.AsyncClient() as client:
         try:
             response = await client.get(DATA_SOURCE_URL)
-            response.raise_for_status() 
-            
-            
-            csv_data = io.StringIO(response.text)
-            df = pd.read_csv(csv_data)
-            logger.info(f"Total de {len(df)} municípios baixados.")
-            return df
-        except httpx.HTTPStatusError as e:
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            if os.path.exists(cache_path):
+                logger.warning(f"Falha ao baixar o CSV ({e}); usando a cópia em cache {cache_path}.")
+                return read_municipios_csv(cache_path)
             logger.error(f"Falha ao baixar o arquivo CSV: {e}")
             raise
-        except Exception as e:
-            logger.error(f"Erro inesperado ao processar o CSV: {e}")
-            raise
 
-def prepare_data(df: pd.DataFrame) -> list[dict]:
-    
+    # Guarda a cópia para execuções offline (--offline)
+    _write_cache(cache_path, response.text)
+    df = pd.read_csv(io.StringIO(response.text))
+    logger.info(f"Total de {len(df)} municípios baixados (cópia salva em {cache_path}).")
+    return df
+
+
+def read_municipios_csv(path: str) -> pd.DataFrame:
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"CSV de municípios não encontrado: {path}")
+    df = pd.read_csv(path)
+    logger.info(f"Total de {len(df)} municípios lidos de {path}.")
+    return df
+
+
+def prepare_data(df: pd.DataFrame) -> List[Tuple[str, str, int]]:
+
     logger.info("Preparando dados (limpando e renomeando colunas)...")
-    
-    
+
+
     df_clean = df[['codigo_ibge', 'nome', 'codigo_uf']].copy()
-    
-    
+
+
     df_clean.rename(columns={
         'codigo_ibge': 'geocode',
         'nome': 'name',
         'codigo_uf': 'state_code'
     }, inplace=True)
-    
-    
-    
+
+
+
     df_clean['geocode'] = df_clean['geocode'].astype(int).astype(str)
-    
-    
+    df_clean['name'] = df_clean['name'].astype(str).str.strip()
+    df_clean['state_code'] = df_clean['state_code'].astype(int)
+
+
     df_clean.drop_duplicates(subset=['geocode'], inplace=True)
-    
-    logger.info(f"Total de {len(df_clean)} municípios únicos preparados para inserção.")
-    
-    
-    return df_clean.to_dict('records')
-
-async def seed_database(territories_data: list[dict]):
-    
+
+    logger.info(f"Total de {len(df_clean)} municípios únicos preparados.")
+
+
+    return [
+        (geocode, name, int(state_code))
+        for geocode, name, state_code in df_clean[COPY_COLUMNS].itertuples(index=False, name=None)
+    ]
+
+
+def diff_territories(
+    incoming: List[Tuple[str, str, int]], current: Dict[str, Tuple[str, int]]
+) -> dict:
+    # Compara o CSV com a tabela: só inserções e alterações (nome/UF) vão para o banco.
+    # Municípios que sumiram do CSV não são apagados (weekly_reports referencia territories).
+
+    inserts, updates = [], []
+    for geocode, name, state_code in incoming:
+        existing = current.get(geocode)
+        if existing is None:
+            inserts.append((geocode, name, state_code))
+        elif existing != (name, state_code):
+            updates.append(((geocode, name, state_code), existing))
+
+    incoming_geocodes = {row[0] for row in incoming}
+    missing = sorted(geocode for geocode in current if geocode not in incoming_geocodes)
+    return {
+        "inserts": inserts,
+        "updates": updates,
+        "missing": missing,
+        "unchanged": len(incoming) - len(inserts) - len(updates),
+    }
+
+
+def report_diff(diff: dict) -> None:
+
+    logger.info(
+        f"Diferenças: {len(diff['inserts'])} novos, {len(diff['updates'])} alterados, "
+        f"{diff['unchanged']} sem alteração, {len(diff['missing'])} só no banco (mantidos)."
+    )
+    for geocode, name, state_code in diff["inserts"][:REPORT_SAMPLE_SIZE]:
+        logger.info(f"  + {geocode} {name} (UF {state_code})")
+    for (geocode, name, state_code), (old_name, old_state_code) in diff["updates"][:REPORT_SAMPLE_SIZE]:
+        logger.info(f"  ~ {geocode} {old_name} (UF {old_state_code}) -> {name} (UF {state_code})")
+    for geocode in diff["missing"][:REPORT_SAMPLE_SIZE]:
+        logger.info(f"  ? {geocode} não está no CSV")
+    shown = max(len(diff["inserts"]), len(diff["updates"]), len(diff["missing"]))
+    if shown > REPORT_SAMPLE_SIZE:
+        logger.info(f"  (mostrando até {REPORT_SAMPLE_SIZE} de cada tipo)")
+
+
+async def apply_changes(conn, rows: List[Tuple[str, str, int]]) -> None:
+    # COPY das linhas alteradas para staging + merge: um único INSERT ... ON CONFLICT,
+    # sem o limite de parâmetros de um VALUES gigante
+
+    async with conn.transaction():
+        await conn.execute(
+            "CREATE TEMP TABLE territories_staging "
+            "(LIKE territories INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        await conn.copy_records_to_table("territories_staging", records=rows, columns=COPY_COLUMNS)
+        await conn.execute(
+            "INSERT INTO territories (geocode, name, state_code) "
+            "SELECT geocode, name, state_code FROM territories_staging "
+            "ON CONFLICT (geocode) DO UPDATE SET "
+            "name = EXCLUDED.name, state_code = EXCLUDED.state_code"
+        )
+    await conn.execute("ANALYZE territories")
+
+
+async def seed_database(territories_data: List[Tuple[str, str, int]], dry_run: bool = False) -> dict:
+
+    import asyncpg
+
     logger.info("Conectando ao banco de dados...")
-    
+
     if not territories_data:
         logger.warning("Nenhum dado para inserir.")
-        return
+        return {"inserts": [], "updates": [], "missing": [], "unchanged": 0}
+
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        current = {
+            r["geocode"]: (r["name"], r["state_code"])
+            for r in await conn.fetch("SELECT geocode, name, state_code FROM territories")
+        }
+        diff = diff_territories(territories_data, current)
+        report_diff(diff)
+
+        changes = diff["inserts"] + [new for new, _ in diff["updates"]]
+        if not changes:
+            logger.info("Tabela 'territories' já está em dia; nada a gravar.")
+        elif dry_run:
+            logger.info("--dry-run: nenhuma alteração gravada.")
+        else:
+            await apply_changes(conn, changes)
+            logger.info(f"Operação de 'seed' concluída: {len(changes)} municípios gravados.")
+        return diff
+    finally:
+        await conn.close()
+
+
+async def invalidate_after_seed(diff: dict) -> None:
+
+    from app.core.cache import invalidate_read_cache
+    from app.services.map_artifacts import invalidate_map_artifacts, stored_artifact_ses
+    from app.services.territory_registry import publish_territories_changed
+
+    # API e workers recarregam o registro de territórios em memória
+    try:
+        await publish_territories_changed()
+    except Exception as e:
+        logger.error(f"Falha ao publicar a alteração de territórios: {e}")
+
+    # Respostas em cache e mapas pré-renderizados carregam os nomes antigos
+    await invalidate_read_cache()
+    if diff["updates"]:
+        invalidate_map_artifacts(stored_artifact_ses())
 
-    async with AsyncSessionFactory() as session:
-        try:
-            logger.info("Iniciando a inserção dos dados na tabela 'territories'...")
-            
-            
-            
-            stmt = pg_insert(Territory).values(territories_data)
-            stmt = stmt.on_conflict_do_nothing(
-                index_elements=['geocode'] 
-            )
-            
-            result = await session.execute(stmt)
-            await session.commit()
-            
-            
-            
-            logger.info("Operação de 'seed' concluída.")
-            logger.info("O banco de dados de territórios está populado.")
-
-        except OperationalError as e:
-            logger.error(f"Erro de conexão com o banco. Verifique a DATABASE_URL e se o DB está rodando. Erro: {e}")
-            await session.rollback()
-        except Exception as e:
-            logger.error(f"Erro durante a inserção no banco: {e}")
-            await session.rollback()
-            raise
 
-async def main():
-    
+async def main(args):
+
     try:
-        df = await fetch_municipios_csv()
+        if args.csv:
+            df = read_municipios_csv(args.csv)
+        elif args.offline:
+            df = read_municipios_csv(args.cache_path)
+        else:
+            df = await fetch_municipios_csv(args.cache_path)
         territories_data = prepare_data(df)
-        await seed_database(territories_data)
+        diff = await seed_database(territories_data, dry_run=args.dry_run)
+        if not args.dry_run and (diff["inserts"] or diff["updates"]):
+            await invalidate_after_seed(diff)
     except Exception as e:
         logger.error(f"Falha no processo de 'seed': {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    
+
     if not settings.DATABASE_URL:
         logger.error("DATABASE_URL não encontrada. Verifique seu arquivo .env")
         sys.exit(1)
-        
-    asyncio.run(main())
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(description="Carrega/atualiza a tabela territories a partir do CSV de municípios")
+    parser.add_argument("--csv", default=None, help="Usa um CSV local em vez de baixar")
+    parser.add_argument("--offline", action="store_true",
+                        help="Usa a cópia em cache do último download (TERRITORIES_CSV_CACHE_PATH)")
+    parser.add_argument("--cache-path", default=settings.TERRITORIES_CSV_CACHE_PATH,
+                        help="Onde guardar/ler a cópia em cache do CSV")
+    parser.add_argument("--dry-run", action="store_true", help="Só mostra as diferenças, sem gravar")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,199 @@
+import logging
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import String, Integer, Float, select, delete, func, cast, bindparam, any_
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+
+from app.core.epiweek import se_range, shift_se
+from app.models.models import WeeklyReport, WeeklyReportMetrics
+
+logger = logging.getLogger(__name__)
+
+
+# Métricas derivadas por (geocode, se), gravadas em weekly_report_metrics logo após o upsert
+# do sync. Dependem de até 2 semanas anteriores (variação, médias móveis de 3 semanas), então
+# uma SE alterada também recalcula as 2 seguintes.
+METRIC_COLUMNS = ("incidence", "growth_rate", "cases_ma3", "incidence_ma3")
+LOOKBACK_WEEKS = 2
+
+UPSERT_COLUMNS = ("se", "geocode") + METRIC_COLUMNS
+
+
+# Histórico recente dos municípios afetados: geocodes como um único parâmetro array
+HISTORY_STMT = (
+    select(WeeklyReport.geocode, WeeklyReport.se, WeeklyReport.reported_cases, WeeklyReport.population)
+    .where(
+        WeeklyReport.geocode == any_(bindparam("geocodes", type_=ARRAY(String))),
+        WeeklyReport.se.between(bindparam("se_start"), bindparam("se_end")),
+    )
+)
+
+
+# Linhas de métricas cujo dado de origem sumiu (reported_cases voltou NULL ou a linha de
+# weekly_reports não existe mais): o upsert só grava pares com casos, então remove as antigas
+_HAS_CASES = (
+    select(WeeklyReport.id)
+    .where(
+        WeeklyReport.geocode == WeeklyReportMetrics.geocode,
+        WeeklyReport.se == WeeklyReportMetrics.se,
+        WeeklyReport.reported_cases.is_not(None),
+    )
+    .exists()
+)
+DELETE_STALE_STMT = (
+    delete(WeeklyReportMetrics)
+    .where(
+        WeeklyReportMetrics.geocode == any_(bindparam("geocodes", type_=ARRAY(String))),
+        WeeklyReportMetrics.se.between(bindparam("se_start"), bindparam("se_end")),
+        ~_HAS_CASES,
+    )
+    .returning(WeeklyReportMetrics.se)
+)
+
+
+def _build_upsert_statement():
+    # Mesmo formato do upsert de weekly_reports (INSERT ... SELECT FROM unnest): SQL fixo
+    # para qualquer tamanho de lote; insert sobre a Table e colunas nomeadas, como lá
+
+    types = {"se": Integer(), "geocode": String()}
+    arrays = [
+        cast(bindparam(f"{column}_values"), ARRAY(types.get(column, Float())))
+        for column in UPSERT_COLUMNS
+    ]
+    rows = func.unnest(*arrays).table_valued(*UPSERT_COLUMNS).render_derived()
+
+    stmt = pg_insert(WeeklyReportMetrics.__table__).from_select(
+        list(UPSERT_COLUMNS), select(*(rows.c[column] for column in UPSERT_COLUMNS))
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=["se", "geocode"],
+        set_={
+            **{column: stmt.excluded[column] for column in METRIC_COLUMNS},
+            "computed_at": func.now(),
+        },
+    )
+
+
+UPSERT_STMT = _build_upsert_statement()
+
+
+def _nullable(values: np.ndarray) -> List[Optional[float]]:
+    # NaN vira NULL (float NaN seria gravado como 'NaN' no Postgres)
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+def compute_metrics(
+    geocodes: List[str],
+    ses: List[int],
+    reported_cases: List[Optional[int]],
+    population: List[Optional[float]],
+    weeks: List[int],
+    output_start: int,
+) -> Dict[str, list]:
+    # Matriz município x semana (semanas contíguas do calendário epidemiológico; semana sem
+    # dado fica NaN), então variação e médias móveis são deslocamentos de colunas.
+    # Só as SEs >= output_start com dado em weekly_reports são devolvidas.
+
+    unique_geocodes, rows = np.unique(np.asarray(geocodes, dtype=object), return_inverse=True)
+    column_of = {se: i for i, se in enumerate(weeks)}
+    cols = np.fromiter((column_of[se] for se in ses), dtype=np.int64, count=len(ses))
+
+    shape = (len(unique_geocodes), len(weeks))
+    cases = np.full(shape, np.nan)
+    pop = np.full(shape, np.nan)
+    cases[rows, cols] = np.array(reported_cases, dtype=float)
+    pop[rows, cols] = np.array(population, dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        incidence = np.where(pop > 0, cases / pop * 100_000, np.nan)
+
+        previous = np.full(shape, np.nan)
+        previous[:, 1:] = cases[:, :-1]
+        growth_rate = np.where(previous > 0, (cases - previous) / previous, np.nan)
+
+    # Média móvel exige as 3 semanas (qualquer NaN propaga)
+    cases_ma3 = np.full(shape, np.nan)
+    cases_ma3[:, 2:] = (cases[:, 2:] + cases[:, 1:-1] + cases[:, :-2]) / 3
+    incidence_ma3 = np.full(shape, np.nan)
+    incidence_ma3[:, 2:] = (incidence[:, 2:] + incidence[:, 1:-1] + incidence[:, :-2]) / 3
+
+    mask = ~np.isnan(cases)
+    mask[:, :column_of[output_start]] = False
+    out_rows, out_cols = np.nonzero(mask)
+
+    return {
+        "se": np.asarray(weeks)[out_cols].tolist(),
+        "geocode": unique_geocodes[out_rows].tolist(),
+        "incidence": _nullable(incidence[out_rows, out_cols]),
+        "growth_rate": _nullable(growth_rate[out_rows, out_cols]),
+        "cases_ma3": _nullable(cases_ma3[out_rows, out_cols]),
+        "incidence_ma3": _nullable(incidence_ma3[out_rows, out_cols]),
+    }
+
+
+async def refresh_derived_metrics(session, geocodes: Iterable[str], ses: Iterable[int]) -> List[int]:
+    # Recalcula as métricas dos municípios afetados, da menor SE alterada até 2 semanas após a
+    # maior. Roda na mesma transação (savepoint) do upsert que alterou os dados.
+    # Devolve a SE de cada linha gravada ou removida.
+
+    geocodes = sorted(set(geocodes))
+    ses = sorted(set(ses))
+    if not geocodes or not ses:
+        return []
+
+    output_start, output_end = ses[0], shift_se(ses[-1], LOOKBACK_WEEKS)
+    history_start = shift_se(output_start, -LOOKBACK_WEEKS)
+
+    result = await session.execute(
+        DELETE_STALE_STMT, {"geocodes": geocodes, "se_start": output_start, "se_end": output_end}
+    )
+    deleted_ses = list(result.scalars().all())
+
+    result = await session.execute(
+        HISTORY_STMT, {"geocodes": geocodes, "se_start": history_start, "se_end": output_end}
+    )
+    history = result.fetchall()
+    if not history:
+        return deleted_ses
+
+    geo_col, se_col, cases_col, pop_col = zip(*history)
+    metrics = compute_metrics(
+        list(geo_col), list(se_col), list(cases_col), list(pop_col),
+        se_range(history_start, output_end), output_start,
+    )
+    if not metrics["se"]:
+        return deleted_ses
+
+    await session.execute(UPSERT_STMT, {f"{column}_values": metrics[column] for column in UPSERT_COLUMNS})
+    return metrics["se"] + deleted_ses
+
+
+async def rebuild_derived_metrics(
+    session_factory, start_se: int, end_se: int, geocode_chunk: int = 500
+) -> int:
+    # Recalcula o intervalo inteiro (histórico carregado antes desta tabela existir, COPY do
+    # gerador sintético), em blocos de municípios com commit por bloco
+
+    async with session_factory() as session:
+        result = await session.execute(
+            select(WeeklyReport.geocode).distinct()
+            .where(WeeklyReport.se.between(start_se, end_se))
+            .order_by(WeeklyReport.geocode)
+        )
+        geocodes = [row[0] for row in result.fetchall()]
+
+    weeks = se_range(start_se, end_se)
+    total = 0
+    started = time.perf_counter()
+    for chunk_start in range(0, len(geocodes), geocode_chunk):
+        chunk = geocodes[chunk_start:chunk_start + geocode_chunk]
+        async with session_factory() as session:
+            total += len(await refresh_derived_metrics(session, chunk, weeks))
+            await session.commit()
+        logger.info(
+            f"Métricas derivadas: {chunk_start + len(chunk)}/{len(geocodes)} municípios "
+            f"({total} linhas, {time.perf_counter() - started:.1f}s)."
+        )
+    return total
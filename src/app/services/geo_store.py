@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+GEO_DIR = os.path.join("src", "static", "geo")
+
+
+STATE_CODE_TO_UF = {
+    11: "RO", 12: "AC", 13: "AM", 14: "RR", 15: "PA", 16: "AP", 17: "TO",
+    21: "MA", 22: "PI", 23: "CE", 24: "RN", 25: "PB", 26: "PE", 27: "AL", 28: "SE",
+    29: "BA", 31: "MG", 32: "ES", 33: "RJ", 35: "SP", 41: "PR", 42: "SC", 43: "RS",
+    50: "MS", 51: "MT", 52: "GO", 53: "DF"
+}
+
+UF_TO_STATE_CODE = {uf: code for code, uf in STATE_CODE_TO_UF.items()}
+
+
+class StateGeometry:
+    # GeoJSON mantido como texto bruto: ocupa bem menos memória que o dict parseado
+    # e cada render precisa de uma cópia própria de qualquer forma.
+    __slots__ = ("uf", "geojson_text", "bounds", "centroid", "feature_count")
+
+    def __init__(self, uf: str, geojson_text: str, bounds, centroid, feature_count: int):
+        self.uf = uf
+        self.geojson_text = geojson_text
+        self.bounds = bounds
+        self.centroid = centroid
+        self.feature_count = feature_count
+
+    def load_geojson(self) -> dict:
+        return json.loads(self.geojson_text)
+
+
+def state_geometry_path(uf: str) -> Optional[str]:
+
+    # Aceita tanto o layout novo (geo/municipalities/PE.json) quanto o legado (pe_municipalities.json)
+    candidates = [
+        os.path.join(GEO_DIR, "municipalities", f"{uf.upper()}.json"),
+        os.path.join(GEO_DIR, f"{uf.lower()}_municipalities.json"),
+    ]
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def available_states() -> List[str]:
+
+    return [uf for uf in UF_TO_STATE_CODE if state_geometry_path(uf)]
+
+
+def _iter_rings(geometry: dict):
+    if geometry["type"] == "Polygon":
+        yield from geometry["coordinates"][:1]
+    elif geometry["type"] == "MultiPolygon":
+        for polygon in geometry["coordinates"]:
+            yield from polygon[:1]
+
+
+def _compute_bounds_and_centroid(geo_data: dict) -> Tuple[List[List[float]], List[float]]:
+
+    min_lon = min_lat = float("inf")
+    max_lon = max_lat = float("-inf")
+    area_sum = cx_sum = cy_sum = 0.0
+
+    for feature in geo_data["features"]:
+        for ring in _iter_rings(feature["geometry"]):
+            for lon, lat, *_ in ring:
+                min_lon, max_lon = min(min_lon, lon), max(max_lon, lon)
+                min_lat, max_lat = min(min_lat, lat), max(max_lat, lat)
+
+            # Centróide ponderado pela área (fórmula do shoelace) do anel externo
+            for (x0, y0, *_), (x1, y1, *_) in zip(ring, ring[1:]):
+                cross = x0 * y1 - x1 * y0
+                area_sum += cross
+                cx_sum += (x0 + x1) * cross
+                cy_sum += (y0 + y1) * cross
+
+    bounds = [[min_lat, min_lon], [max_lat, max_lon]]
+    if area_sum:
+        centroid = [cy_sum / (3 * area_sum), cx_sum / (3 * area_sum)]
+    else:
+        centroid = [(min_lat + max_lat) / 2, (min_lon + max_lon) / 2]
+    return bounds, centroid
+
+
+class GeometryStore:
+
+    def __init__(self, max_states: int):
+        self.max_states = max_states
+        self._states: "OrderedDict[str, StateGeometry]" = OrderedDict()
+        # O store também é usado pelo pool de threads de renderização
+        self._lock = threading.Lock()
+
+    def get(self, uf: str) -> Optional[StateGeometry]:
+        uf = uf.upper()
+        with self._lock:
+            geometry = self._states.get(uf)
+            if geometry is not None:
+                self._states.move_to_end(uf)
+                return geometry
+
+        path = state_geometry_path(uf)
+        if path is None:
+            return None
+
+        with open(path, "r", encoding="utf-8") as f:
+            geojson_text = f.read()
+        geo_data = json.loads(geojson_text)
+        bounds, centroid = _compute_bounds_and_centroid(geo_data)
+        geometry = StateGeometry(uf, geojson_text, bounds, centroid, len(geo_data["features"]))
+
+        with self._lock:
+            self._states[uf] = geometry
+            self._states.move_to_end(uf)
+            while len(self._states) > self.max_states:
+                evicted, _ = self._states.popitem(last=False)
+                logger.debug(f"Geometria de {evicted} removida do store (LRU).")
+        return geometry
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"loaded": list(self._states), "max_states": self.max_states}
+
+
+geometry_store = GeometryStore(max_states=settings.GEO_STORE_MAX_STATES)
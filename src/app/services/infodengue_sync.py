@@ -2,25 +2,88 @@
 
 import asyncio
 import logging
+import time
 import httpx
-import pandas as pd
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Optional, Tuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.dialects.postgresql import insert as pg_insert
-from sqlalchemy.sql import select, func
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.sql import select, update, func, cast, bindparam
 
-from app.models.models import Territory, WeeklyReport
+from app.models.models import SyncRun, Territory, WeeklyReport
+from app.services.territory_registry import territory_registry
+from app.services.derived_metrics import refresh_derived_metrics
 from app.core.config import settings
+from app.core.epiweek import current_se, shift_se, sync_window
+from app.core.metrics import (
+    infodengue_fetch_duration, infodengue_fetch_total, infodengue_fetch_in_flight,
+    sync_phase_duration, sync_upsert_batch_rows,
+)
+from app.core.profiling import create_sync_profiler, profile_phase
 
 logger = logging.getLogger(__name__)
 
 
 CONCURRENT_REQUESTS_LIMIT = 100
 
+# Janela padrão do sync: SE atual e as 8 anteriores (o InfoDengue revisa semanas recentes)
+SYNC_WINDOW_WEEKS = 8
+
+
+# Configurável para apontar para o servidor fake dos benchmarks (benchmarks/fake_infodengue.py)
+INFODENGUE_API_URL = settings.INFODENGUE_API_URL
+
+# Colunas gravadas pelo upsert, na ordem dos arrays passados ao UNNEST
+UPSERT_COLUMNS = (
+    "geocode", "se", "data_ini_se", "reported_cases", "estimated_cases",
+    "estimated_cases_min", "estimated_cases_max", "alert_level", "population", "rt_value",
+)
+
+
+def _build_upsert_statement():
+    # INSERT ... SELECT FROM unnest($1, ..., $10): um parâmetro (array) por coluna, então o SQL
+    # é o mesmo para qualquer tamanho de lote e o prepared statement da conexão é reaproveitado.
+    # Um VALUES multi-linha gera um texto (e um plano) diferente para cada tamanho de lote.
+    # O insert é sobre a Table (Core): na entidade ORM, session.execute com dict de parâmetros
+    # viraria um "ORM bulk insert". render_derived nomeia as colunas: unnest(...) AS anon_1(geocode, ...)
+
+    table = WeeklyReport.__table__
+    arrays = [cast(bindparam(f"{column}_values"), ARRAY(table.c[column].type)) for column in UPSERT_COLUMNS]
+    rows = func.unnest(*arrays).table_valued(*UPSERT_COLUMNS).render_derived()
+
+    stmt = pg_insert(table).from_select(
+        list(UPSERT_COLUMNS), select(*(rows.c[column] for column in UPSERT_COLUMNS))
+    )
+    on_conflict_stmt = stmt.on_conflict_do_update(
+        index_elements=['geocode', 'se'],
+        set_={
+            'data_ini_se': stmt.excluded.data_ini_se,
+            'reported_cases': stmt.excluded.reported_cases,
+            'estimated_cases': stmt.excluded.estimated_cases,
+            'estimated_cases_min': stmt.excluded.estimated_cases_min,
+            'estimated_cases_max': stmt.excluded.estimated_cases_max,
+            'alert_level': stmt.excluded.alert_level,
+            'population': stmt.excluded.population,
+            'rt_value': stmt.excluded.rt_value,
+            'last_synced_at': func.now()
+        },
+        where=(
+            (WeeklyReport.reported_cases != stmt.excluded.reported_cases) |
+            (WeeklyReport.estimated_cases != stmt.excluded.estimated_cases) |
+            (WeeklyReport.alert_level != stmt.excluded.alert_level)
+        )
+    )
+    return on_conflict_stmt.returning(
+        WeeklyReport.id,
+        WeeklyReport.se,
+        WeeklyReport.geocode,
+        (WeeklyReport.estimated_cases_max != None).label("updated")
+    )
+
+
+UPSERT_STMT = _build_upsert_statement()
 
-INFODENGUE_API_URL = "https://info.dengue.mat.br/api/alertcity/"
 
 class SyncServiceError(Exception):
     
@@ -32,41 +95,109 @@ class InfoDengueSyncService:
         self.semaphore = asyncio.Semaphore(CONCURRENT_REQUESTS_LIMIT)
         
         self.client = httpx.AsyncClient(timeout=15.0)
+        # Profiler por fase (PROFILING_SYNC_ENABLED); None = desligado
+        self.profiler = None
+        # SEs já commitadas pelos blocos (commit_chunks); se o sync falhar no meio,
+        # quem chama ainda precisa invalidar caches/artefatos dessas SEs
+        self.committed_ses: set = set()
 
     async def _get_territories_to_sync(self) -> List[str]:
         
-        logger.info("Buscando lista de geocodes (municípios) no banco...")
-        stmt = select(Territory.geocode)
-        result = await self.db.execute(stmt)
-        geocodes = [row[0] for row in result.fetchall()]
+        if territory_registry.loaded:
+            geocodes = territory_registry.geocodes()
+        else:
+            logger.info("Buscando lista de geocodes (municípios) no banco...")
+            stmt = select(Territory.geocode).order_by(Territory.geocode)
+            result = await self.db.execute(stmt)
+            geocodes = [row[0] for row in result.fetchall()]
         logger.info(f"Encontrados {len(geocodes)} municípios para sincronizar.")
         return geocodes
 
-    def _calculate_sync_window(self) -> Dict[str, int]:
-        
-        today = pd.Timestamp.now()
-        
-        current_ew = today.weekofyear
-        current_ey = today.year
-        
-        
-        start_date = today - pd.DateOffset(weeks=8)
-        start_ew = start_date.weekofyear
-        start_ey = start_date.year
+    async def _claim_quiet_slot(self, run_number: int) -> Optional[int]:
+        # Fatia de quietos deste run: a seguinte à do último run bem-sucedido com rodízio.
+        # sync_runs.id é compartilhado com api/backfill e não serve de contador; um run que falha
+        # não avança o rodízio e replanejar o mesmo run mantém a fatia. O commit fica com quem chama.
+
+        next_slot = (
+            select(func.coalesce(func.max(SyncRun.quiet_slot), -1) + 1)
+            .where(SyncRun.status == "success")
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            update(SyncRun)
+            .where(SyncRun.id == run_number)
+            .values(quiet_slot=func.coalesce(SyncRun.quiet_slot, next_slot))
+            .returning(SyncRun.quiet_slot)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar_one_or_none()
+
+    async def _build_priority_schedule(
+        self, geocodes: List[str], quiet_slot: Optional[int] = None
+    ) -> Tuple[List[str], int]:
+        
+        # Último registro de cada município dentro da janela padrão do sync. Sem o filtro por SE o
+        # DISTINCT ON leria e ordenaria o histórico inteiro (geocode ASC, se DESC não segue a
+        # ordem de nenhum índice); com ele, só a partição do ano corrente (e a anterior, na
+        # virada) é lida e a ordenação é de ~8 semanas x municípios.
+        # Município sem registro na janela conta como nunca sincronizado.
+        stmt = (
+            select(
+                WeeklyReport.geocode,
+                WeeklyReport.alert_level,
+                WeeklyReport.reported_cases,
+                WeeklyReport.population,
+            )
+            .where(WeeklyReport.se >= shift_se(current_se(), -SYNC_WINDOW_WEEKS))
+            .distinct(WeeklyReport.geocode)
+            .order_by(WeeklyReport.geocode, WeeklyReport.se.desc())
+        )
+        result = await self.db.execute(stmt)
+        latest = {row.geocode: row for row in result.fetchall()}
+
+        quiet_every = max(1, settings.SYNC_QUIET_REFRESH_EVERY_N_RUNS)
+
+        scored = []
+        skipped = 0
+        for geocode in geocodes:
+            row = latest.get(geocode)
+            if row is None:
+                # Nunca sincronizado (ou sem dado recente): ordenado como nível verde, mas nunca pulado
+                scored.append(((-1, 0.0, 0), geocode))
+                continue
+
+            alert = row.alert_level or 0
+            cases = row.reported_cases or 0
+            population = row.population or 0
+
+            # Município "quieto" (nível verde e zero casos) é atualizado em 1 a cada N runs com
+            # rodízio: fatias consecutivas cobrem todos os restos de geocode % N
+            if quiet_slot is not None and alert <= 1 and cases == 0:
+                if int(geocode) % quiet_every != quiet_slot % quiet_every:
+                    skipped += 1
+                    continue
 
+            incidence = cases / population if population else 0.0
+            scored.append(((-alert, -incidence, -population), geocode))
+
+        scored.sort()
+        return [geocode for _, geocode in scored], skipped
+
+    @staticmethod
+    def _calculate_sync_window() -> Dict[str, int]:
         
-        return {
-            "ew_start": start_ew,
-            "ey_start": start_ey,
-            "ew_end": current_ew,
-            "ey_end": current_ey,
-        }
+        # SEs do calendário epidemiológico (domingo a sábado), não semanas ISO: na virada
+        # do ano a janela atravessa corretamente de 2025/52 para 2026/01
+        return sync_window(SYNC_WINDOW_WEEKS)
 
     async def _fetch_city_data(
         self, geocode: str, params: dict
     ) -> Tuple[str, List[dict]]:
         
         async with self.semaphore:
+            infodengue_fetch_in_flight.inc()
+            fetch_started = time.perf_counter()
+            status = "error"
             try:
                 
                 full_params = params.copy()
@@ -75,6 +206,7 @@ class InfoDengueSyncService:
                 full_params["format"] = "json"
                 
                 response = await self.client.get(INFODENGUE_API_URL, params=full_params)
+                status = str(response.status_code)
                 
                 response.raise_for_status() 
                 
@@ -99,6 +231,11 @@ class InfoDengueSyncService:
                 logger.error(f"Erro inesperado ao processar geocode {geocode}: {e}")
                 return geocode, []
 
+            finally:
+                infodengue_fetch_in_flight.dec()
+                infodengue_fetch_duration.observe(time.perf_counter() - fetch_started)
+                infodengue_fetch_total.labels(status=status).inc()
+
     def _parse_and_prepare_data(
         self, geocode: str, api_data: List[dict]
     ) -> List[dict]:
@@ -136,69 +273,163 @@ class InfoDengueSyncService:
         
         if not data:
             logger.info("Nenhum dado novo para inserir/atualizar.")
-            return {"inserted": 0, "updated": 0}
+            return {"inserted": 0, "updated": 0, "ses": set(), "geocodes": set()}
 
         logger.info(f"Iniciando UPSERT para {len(data)} registros semanais...")
 
-        stmt = pg_insert(WeeklyReport).values(data)
-        
-        
-        on_conflict_stmt = stmt.on_conflict_do_update(
-            index_elements=['geocode', 'se'],
-            
-            
-            set_={
-                'data_ini_se': stmt.excluded.data_ini_se,
-                'reported_cases': stmt.excluded.reported_cases,
-                'estimated_cases': stmt.excluded.estimated_cases,
-                'estimated_cases_min': stmt.excluded.estimated_cases_min,
-                'estimated_cases_max': stmt.excluded.estimated_cases_max,
-                'alert_level': stmt.excluded.alert_level,
-                'population': stmt.excluded.population,
-                'rt_value': stmt.excluded.rt_value,
-                'last_synced_at': func.now()
-            },
-            
-            
-            where=(
-                (WeeklyReport.reported_cases != stmt.excluded.reported_cases) |
-                (WeeklyReport.estimated_cases != stmt.excluded.estimated_cases) |
-                (WeeklyReport.alert_level != stmt.excluded.alert_level)
-            )
-        )
-        
-        
-        final_stmt = on_conflict_stmt.returning(WeeklyReport.id, (WeeklyReport.estimated_cases_max != None).label("updated"))
+        # Lote transposto em colunas: um array por parâmetro do statement fixo
+        params = {
+            f"{column}_values": [row[column] for row in data] for column in UPSERT_COLUMNS
+        }
 
         try:
-            result = await self.db.execute(final_stmt)
+            result = await self.db.execute(UPSERT_STMT, params)
             rows = result.fetchall()
             
             inserted_count = sum(1 for row in rows if not row.updated)
             updated_count = len(rows) - inserted_count
 
             logger.info(f"UPSERT concluído. Inseridos: {inserted_count}, Atualizados: {updated_count}.")
-            return {"inserted": inserted_count, "updated": updated_count}
+            return {
+                "inserted": inserted_count,
+                "updated": updated_count,
+                "ses": {row.se for row in rows},
+                "geocodes": {row.geocode for row in rows},
+            }
         
         except Exception as e:
             logger.error(f"Erro durante o UPSERT: {e}")
             raise SyncServiceError(f"Falha no UPSERT: {e}")
 
+    async def _upsert_batch(self, batch: List[dict], totals: dict) -> None:
+        
+        sync_upsert_batch_rows.observe(len(batch))
+        try:
+            # Savepoint por lote: uma falha não invalida os lotes já gravados no bloco.
+            # upsert e derive são fases separadas (tempo e perfil), no mesmo savepoint.
+            async with self.db.begin_nested():
+                upsert_started = time.perf_counter()
+                try:
+                    with profile_phase(self.profiler, "upsert"):
+                        batch_stats = await self._upsert_data(batch)
+                finally:
+                    totals["upsert_seconds"] += time.perf_counter() - upsert_started
+                await self._derive_metrics(batch_stats, totals)
+            totals["inserted"] += batch_stats.get("inserted", 0)
+            totals["updated"] += batch_stats.get("updated", 0)
+            totals["ses"].update(batch_stats.get("ses", ()))
+        except Exception as e:
+            logger.error(f"Falha ao processar um lote: {e}")
+
+    async def _derive_metrics(self, batch_stats: dict, totals: dict) -> None:
+        # Incidência, variação semanal e médias móveis só dos municípios/SEs que mudaram,
+        # no mesmo savepoint do upsert: dado bruto e derivado ficam sempre consistentes
+
+        derive_started = time.perf_counter()
+        try:
+            with profile_phase(self.profiler, "derive"):
+                derived_ses = await refresh_derived_metrics(self.db, batch_stats["geocodes"], batch_stats["ses"])
+        finally:
+            totals["derive_seconds"] += time.perf_counter() - derive_started
+        # Médias móveis de SEs seguintes também mudam: entram nas SEs afetadas (tiles, mapas)
+        batch_stats["ses"] = batch_stats["ses"] | set(derived_ses)
+
+    async def plan_geocodes(
+        self, run_number: Optional[int] = None, skip_quiet: bool = False
+    ) -> Tuple[List[str], int]:
+        
+        geocodes = await self._get_territories_to_sync()
+        if not geocodes:
+            return [], 0
+
+        quiet_slot = None
+        if skip_quiet and run_number is not None and settings.SYNC_QUIET_REFRESH_EVERY_N_RUNS > 1:
+            quiet_slot = await self._claim_quiet_slot(run_number)
+
+        geocodes, skipped_quiet = await self._build_priority_schedule(geocodes, quiet_slot)
+        if skipped_quiet:
+            logger.info(f"{skipped_quiet} municípios quietos ficam para um próximo run.")
+        return geocodes, skipped_quiet
+
+    async def sync_geocodes(
+        self, geocodes: List[str], time_params: dict, commit_chunks: bool = True
+    ) -> dict:
+        # Busca, parseia e faz UPSERT de uma lista de geocodes (em ordem), bloco a bloco
+
+        BATCH_SIZE = 1000  
+
+        chunk_size = max(1, settings.SYNC_PRIORITY_CHUNK_SIZE)
+        totals = {
+            "inserted": 0, "updated": 0, "ses": set(), "failed": 0,
+            "fetch_seconds": 0.0, "parse_seconds": 0.0, "upsert_seconds": 0.0, "derive_seconds": 0.0,
+        }
+        
+        logger.info(
+            f"Disparando {len(geocodes)} requisições HTTP em blocos de {chunk_size} "
+            f"(limite de {CONCURRENT_REQUESTS_LIMIT} em paralelo)..."
+        )
+
+        for chunk_start in range(0, len(geocodes), chunk_size):
+            chunk = geocodes[chunk_start:chunk_start + chunk_size]
+            tasks = [self._fetch_city_data(geo, time_params) for geo in chunk]
+
+            fetch_started = time.perf_counter()
+            with profile_phase(self.profiler, "fetch"):
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+            totals["fetch_seconds"] += time.perf_counter() - fetch_started
+
+            all_data_to_upsert = [] 
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"Uma task de fetch falhou: {result}")
+                    totals["failed"] += 1
+                elif isinstance(result, tuple):
+                    geocode, api_data = result
+                    if api_data:
+                        parse_started = time.perf_counter()
+                        with profile_phase(self.profiler, "parse"):
+                            prepared_data = self._parse_and_prepare_data(geocode, api_data)
+                        totals["parse_seconds"] += time.perf_counter() - parse_started
+                        all_data_to_upsert.extend(prepared_data)
+                
+                if len(all_data_to_upsert) >= BATCH_SIZE:
+                    logger.info(f"Processando lote de {len(all_data_to_upsert)} registros...")
+                    await self._upsert_batch(all_data_to_upsert, totals)
+                    all_data_to_upsert = [] 
+
+            if all_data_to_upsert:
+                logger.info(f"Processando lote final do bloco ({len(all_data_to_upsert)} registros)...")
+                await self._upsert_batch(all_data_to_upsert, totals)
+
+            # Commit por bloco: os municípios prioritários ficam visíveis antes do fim do sync
+            if commit_chunks:
+                await self.db.commit()
+                self.committed_ses.update(totals["ses"])
+            logger.info(f"Bloco {chunk_start // chunk_size + 1} concluído ({chunk_start + len(chunk)}/{len(geocodes)}).")
+
+        for phase in ("fetch", "parse", "upsert", "derive"):
+            sync_phase_duration.labels(phase=phase).observe(totals[f"{phase}_seconds"])
+        return totals
+
+    async def aclose(self) -> None:
+        
+        await self.client.aclose()
+
     async def run_full_sync(
         self,
         ew_start: Optional[int] = None,
         ey_start: Optional[int] = None,
         ew_end: Optional[int] = None,
-        ey_end: Optional[int] = None
+        ey_end: Optional[int] = None,
+        run_number: Optional[int] = None,
+        skip_quiet: Optional[bool] = None,
     ) -> dict:
         
         logger.info("Iniciando sincronização completa do InfoDengue...")
         
         
-        BATCH_SIZE = 1000  
-        
-        
-        if not all([ew_start, ey_start, ew_end, ey_end]):
+        default_window = not all([ew_start, ey_start, ew_end, ey_end])
+        if default_window:
             logger.info("Janela de tempo não fornecida, calculando padrão (últimas 8 semanas)...")
             time_params = self._calculate_sync_window()
         else:
@@ -209,73 +440,44 @@ class InfoDengueSyncService:
         logger.info(f"Janela de sincronização: {time_params}")
 
         
-        geocodes = await self._get_territories_to_sync()
+        # Municípios mais ativos primeiro; os quietos só são pulados na janela padrão
+        # (janelas explícitas, como o backfill, sempre buscam todos). O coordenador já
+        # resolve a janela e informa explicitamente se ela era a padrão.
+        if skip_quiet is None:
+            skip_quiet = default_window
+        geocodes, skipped_quiet = await self.plan_geocodes(run_number, skip_quiet=skip_quiet)
         if not geocodes:
             logger.error("Nenhum território (geocode) encontrado no banco. Abortando sync.")
             return {}
 
-        
-        tasks = [self._fetch_city_data(geo, time_params) for geo in geocodes]
-        
-        
-        all_data_to_upsert = [] 
-        total_inserted = 0
-        total_updated = 0
-        failed_geocodes = 0
-        
-        logger.info(f"Disparando {len(tasks)} requisições HTTP em paralelo (limite de {CONCURRENT_REQUESTS_LIMIT})...")
-        
-        
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        logger.info("Fetch concluído. Processando e fazendo UPSERT em lotes...")
-
-        
-        for result in results:
-            if isinstance(result, Exception):
-                logger.error(f"Uma task de fetch falhou: {result}")
-                failed_geocodes += 1
-            elif isinstance(result, tuple):
-                geocode, api_data = result
-                if api_data:
-                    prepared_data = self._parse_and_prepare_data(geocode, api_data)
-                    all_data_to_upsert.extend(prepared_data)
-            
-            
-            
-            if len(all_data_to_upsert) >= BATCH_SIZE:
-                logger.info(f"Processando lote de {len(all_data_to_upsert)} registros...")
-                try:
-                    batch_stats = await self._upsert_data(all_data_to_upsert)
-                    total_inserted += batch_stats.get("inserted", 0)
-                    total_updated += batch_stats.get("updated", 0)
-                except Exception as e:
-                    logger.error(f"Falha ao processar um lote: {e}")
-                finally:
-                    all_data_to_upsert = [] 
-
-        
-        if all_data_to_upsert:
-            logger.info(f"Processando lote final de {len(all_data_to_upsert)} registros...")
-            try:
-                batch_stats = await self._upsert_data(all_data_to_upsert)
-                total_inserted += batch_stats.get("inserted", 0)
-                total_updated += batch_stats.get("updated", 0)
-            except Exception as e:
-                logger.error(f"Falha ao processar o lote final: {e}")
+        self.profiler = create_sync_profiler(
+            f"run-{run_number}" if run_number is not None else f"{datetime.now():%Y%m%d-%H%M%S}"
+        )
+        totals = await self.sync_geocodes(geocodes, time_params)
 
         
         stats = {
-            "inserted": total_inserted,
-            "updated": total_updated,
-            "geocodes_synced": len(geocodes) - failed_geocodes,
-            "geocodes_failed": failed_geocodes
+            "inserted": totals["inserted"],
+            "updated": totals["updated"],
+            "geocodes_synced": len(geocodes) - totals["failed"],
+            "geocodes_failed": totals["failed"],
+            "geocodes_skipped": skipped_quiet,
+            # SEs efetivamente inseridas/alteradas (usadas para pré-renderizar mapas)
+            "affected_ses": sorted(totals["ses"]),
+            "window": time_params,
+            "concurrency": CONCURRENT_REQUESTS_LIMIT,
+            "timings": {
+                "fetch_seconds": round(totals["fetch_seconds"], 3),
+                "parse_seconds": round(totals["parse_seconds"], 3),
+                "upsert_seconds": round(totals["upsert_seconds"], 3),
+                "derive_seconds": round(totals["derive_seconds"], 3),
+            }
         }
         
+        if self.profiler is not None:
+            stats["profile_dir"] = self.profiler.dump()
+
         logger.info(f"Sincronização completa do InfoDengue finalizada. Stats: {stats}")
-        
-        
-        await self.client.aclose()
-        logger.info("Cliente HTTP fechado.")
 
+        # O cliente HTTP é fechado por quem criou o serviço (aclose)
         return stats
\ No newline at end of file
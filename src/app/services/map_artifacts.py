@@ -0,0 +1,118 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import cache_requests_total
+from app.services.map_service import render_map
+from app.services.geo_store import available_states
+
+logger = logging.getLogger(__name__)
+
+
+def prerender_scopes() -> List[str]:
+    # Brasil + todas as UFs com geometria municipal disponível
+    return ["br"] + [uf.lower() for uf in available_states()]
+
+
+def _artifact_dir(se: int) -> str:
+    return os.path.join(settings.MAP_OUTPUT_DIR, "maps", str(se))
+
+
+def stored_artifact_ses() -> List[int]:
+    # SEs com mapas pré-renderizados em disco
+    try:
+        names = os.listdir(os.path.join(settings.MAP_OUTPUT_DIR, "maps"))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name) for name in names if name.isdigit())
+
+
+def artifact_path(se: int, scope: str) -> str:
+    return os.path.join(_artifact_dir(se), f"{scope}.html")
+
+
+def _write_atomic(path: str, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Temporário próprio de cada escrita: o warm-up do worker e um render da API (ou duas
+    # threads do mesmo processo) podem gravar o mesmo artefato ao mesmo tempo
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        # os.replace é atômico: leitores nunca veem um arquivo pela metade
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _read_if_exists(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+async def read_map_artifact(se: int, scope: str) -> Optional[str]:
+
+    html = await asyncio.to_thread(_read_if_exists, artifact_path(se, scope))
+    cache_requests_total.labels(cache="map_artifact", result="miss" if html is None else "hit").inc()
+    return html
+
+
+def invalidate_map_artifacts(ses: Iterable[int]) -> None:
+
+    for se in ses:
+        shutil.rmtree(_artifact_dir(se), ignore_errors=True)
+
+
+async def _render_and_store(session_factory, se: int, scope: str, semaphore: asyncio.Semaphore) -> bool:
+
+    async with semaphore:
+        # Cada render usa sua própria sessão: AsyncSession não suporta uso concorrente
+        async with session_factory() as session:
+            try:
+                html = await render_map(session, se, scope)
+            except Exception as e:
+                logger.error(f"Falha ao pré-renderizar mapa (se={se}, scope={scope}): {e}")
+                return False
+
+    metadata = {"se": se, "scope": scope, "rendered_at": datetime.now().isoformat()}
+    await asyncio.to_thread(_write_atomic, artifact_path(se, scope), html)
+    await asyncio.to_thread(
+        _write_atomic,
+        os.path.join(_artifact_dir(se), f"{scope}.json"),
+        json.dumps(metadata),
+    )
+    return True
+
+
+async def warm_map_artifacts(session_factory, ses: Iterable[int]) -> dict:
+
+    ses = sorted(set(ses))
+    if not ses:
+        return {"rendered": 0, "failed": 0}
+
+    scopes = prerender_scopes()
+    logger.info(f"Pré-renderizando mapas para as SEs {ses} (escopos: {scopes})...")
+
+    # Limita a concorrência ao tamanho do pool de renderização
+    semaphore = asyncio.Semaphore(settings.MAP_RENDER_WORKERS)
+    tasks = [
+        _render_and_store(session_factory, se, scope, semaphore)
+        for se in ses
+        for scope in scopes
+    ]
+    results: List[bool] = await asyncio.gather(*tasks)
+
+    stats = {"rendered": sum(results), "failed": len(results) - sum(results)}
+    logger.info(f"Pré-renderização concluída. Stats: {stats}")
+    return stats
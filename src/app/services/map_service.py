@@ -2,38 +2,102 @@ import folium
 import json
 import os
 import pandas as pd
+from functools import lru_cache
+from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
 
-from app.models.models import WeeklyReport, Territory
+from app.core.singleflight import SingleFlight
+from app.db.read_routing import release_read_session
+from app.services.report_queries import choropleth_query, city_map_query, state_metric_query
+from app.services.territory_registry import ensure_territory_registry, territory_registry
+from app.services.render_pool import run_in_render_pool
+from app.services.geo_store import geometry_store, STATE_CODE_TO_UF, UF_TO_STATE_CODE
 
 
 GEOJSON_BR_PATH = os.path.join("src", "static", "geo", "br_states.json")
-GEOJSON_PE_PATH = os.path.join("src", "static", "geo", "pe_municipalities.json")
 
 
-STATE_CODE_TO_UF = {
-    11: "RO", 12: "AC", 13: "AM", 14: "RR", 15: "PA", 16: "AP", 17: "TO",
-    21: "MA", 22: "PI", 23: "CE", 24: "RN", 25: "PB", 26: "PE", 27: "AL", 28: "SE",
-    29: "BA", 31: "MG", 32: "ES", 33: "RJ", 35: "SP", 41: "PR", 42: "SC", 43: "RS",
-    50: "MS", 51: "MT", 52: "GO", 53: "DF"
+# Métrica usada na cor do mapa: o nível de alerta (padrão) ou uma das métricas derivadas
+# calculadas no sync (weekly_report_metrics). "bins" são as faixas de cor da legenda.
+MAP_METRICS = {
+    "alert": {
+        "column": None,
+        "label": "Nível de Alerta",
+        "legend": "Nível de Alerta (1=Verde, 4=Vermelho)",
+        "tooltip": "Nível:",
+        "bins": [1, 1.75, 2.5, 3.25, 4.01],
+    },
+    "incidence": {
+        "column": "incidence",
+        "label": "Incidência",
+        "legend": "Incidência (casos por 100 mil habitantes)",
+        "tooltip": "Incidência:",
+        "bins": [0, 10, 50, 300, 1000],
+    },
+    "incidence_ma3": {
+        "column": "incidence_ma3",
+        "label": "Incidência (média de 3 semanas)",
+        "legend": "Incidência, média móvel de 3 semanas (casos por 100 mil habitantes)",
+        "tooltip": "Incidência (MM3):",
+        "bins": [0, 10, 50, 300, 1000],
+    },
+    "growth": {
+        "column": "growth_rate",
+        "label": "Variação Semanal",
+        "legend": "Variação dos casos sobre a SE anterior (1 = +100%)",
+        "tooltip": "Variação:",
+        "bins": [-1, -0.25, 0, 0.25, 1, 3],
+    },
 }
 
-async def generate_choropleth_map(db: AsyncSession, se: int) -> str:
-    
+# No mapa do Brasil o nível de alerta é a média dos municípios da UF
+STATE_ALERT_SPEC = {
+    **MAP_METRICS["alert"],
+    "label": "Nível de Alerta (Médio)",
+    "legend": "Nível de Alerta Médio (1=Verde, 4=Vermelho)",
+    "tooltip": "Nível Médio:",
+}
+
+
+def _color_value(value: float, bins: List[float]) -> float:
+    # Valores fora das faixas da legenda ficam na primeira/última cor
+    return max(bins[0], min(bins[-1] - 0.01, value))
+
+
+# Renderizações idênticas (scope, se, metric) concorrentes compartilham uma única execução
+_render_flight = SingleFlight()
+
+
+async def render_map(db: AsyncSession, se: int, scope: str = "br", metric: str = "alert") -> str:
+    # scope: "br" (estados) ou a sigla de uma UF em minúsculas (municípios)
+
+    async def _render() -> str:
+        if scope == "br":
+            return await generate_choropleth_map(db, se, metric)
+        return await generate_city_map(db, se, UF_TO_STATE_CODE[scope.upper()], metric)
+
+    return await _render_flight.do((scope, se, metric), _render)
+
+
+@lru_cache(maxsize=4)
+def _read_geojson_text(path: str) -> str:
+    # Cache por processo do arquivo bruto; o parse é refeito a cada render porque
+    # o Folium altera as features (propriedades do tooltip).
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _load_geojson(path: str) -> dict:
+    return json.loads(_read_geojson_text(path))
+
+
+async def generate_choropleth_map(db: AsyncSession, se: int, metric: str = "alert") -> str:
     
-    stmt = (
-        select(
-            Territory.state_code,
-            func.avg(WeeklyReport.alert_level).label("avg_alert_level"),
-            func.sum(WeeklyReport.reported_cases).label("total_cases")
-        )
-        .join(Territory, WeeklyReport.geocode == Territory.geocode)
-        .where(WeeklyReport.se == se)
-        .group_by(Territory.state_code)
-    )
+    spec = STATE_ALERT_SPEC if metric == "alert" else MAP_METRICS[metric]
+    stmt = choropleth_query(se) if metric == "alert" else state_metric_query(se, spec["column"])
     result = await db.execute(stmt)
     rows = result.fetchall()
+    await release_read_session(db)
 
     if not rows:
         return "<h3 style='text-align:center; margin-top: 50px;'>Sem dados para o Brasil nesta semana.</h3>"
@@ -44,20 +108,35 @@ async def generate_choropleth_map(db: AsyncSession, se: int) -> str:
         uf_sigla = STATE_CODE_TO_UF.get(row.state_code)
         if uf_sigla:
             
-            raw_avg = float(row.avg_alert_level or 1.0)
+            if metric == "alert":
+                raw_value = round(max(1.0, min(4.0, float(row.avg_alert_level or 1.0))), 1)
+            elif row.value is None:
+                continue
+            else:
+                raw_value = round(float(row.value), 2)
             
             data.append({
                 "uf": uf_sigla,
-                "Nível de Alerta Médio": round(max(1.0, min(4.0, raw_avg)), 1),
+                "Valor": _color_value(raw_value, spec["bins"]),
+                "Exibido": raw_value,
                 "Total de Casos": row.total_cases
             })
+
+    # Métrica sem valor em nenhuma UF (ex: growth sem a SE anterior)
+    if not data:
+        return "<h3 style='text-align:center; margin-top: 50px;'>Sem dados para o Brasil nesta semana.</h3>"
+
+    # Etapa CPU-bound (pandas/Folium) roda fora do event loop
+    return await run_in_render_pool(render_choropleth_html, data, spec)
+
+
+def render_choropleth_html(data: List[dict], spec: dict = STATE_ALERT_SPEC) -> str:
     
     df_state_data = pd.DataFrame(data)
 
     
     try:
-        with open(GEOJSON_BR_PATH, "r", encoding="utf-8") as f:
-            geo_data = json.load(f)
+        geo_data = _load_geojson(GEOJSON_BR_PATH)
     except FileNotFoundError:
         return "<h3>Erro: GeoJSON do Brasil não encontrado em src/static/geo/br_states.json</h3>"
 
@@ -73,15 +152,15 @@ async def generate_choropleth_map(db: AsyncSession, se: int) -> str:
     
     choropleth = folium.Choropleth(
         geo_data=geo_data,
-        name="Nível de Alerta (Médio)",
+        name=spec["label"],
         data=df_state_data,
-        columns=["uf", "Nível de Alerta Médio"],
+        columns=["uf", "Valor"],
         key_on="feature.properties.sigla",
         fill_color="YlOrRd",
         fill_opacity=0.8,
         line_opacity=0.2,
-        legend_name="Nível de Alerta Médio (1=Verde, 4=Vermelho)",
-        bins=[1, 1.75, 2.5, 3.25, 4.01],
+        legend_name=spec["legend"],
+        bins=spec["bins"],
         highlight=True,
     ).add_to(m)
 
@@ -90,7 +169,7 @@ async def generate_choropleth_map(db: AsyncSession, se: int) -> str:
     for feature in choropleth.geojson.data['features']:
         uf_sigla = feature['properties']['sigla']
         if uf_sigla in df_indexed.index:
-            feature['properties']['alert'] = str(df_indexed.loc[uf_sigla, 'Nível de Alerta Médio'])
+            feature['properties']['alert'] = str(df_indexed.loc[uf_sigla, 'Exibido'])
             feature['properties']['cases'] = str(df_indexed.loc[uf_sigla, 'Total de Casos'])
         else:
             feature['properties']['alert'] = 'N/A'
@@ -98,7 +177,7 @@ async def generate_choropleth_map(db: AsyncSession, se: int) -> str:
 
     folium.GeoJsonTooltip(
         fields=["sigla", "name", "alert", "cases"], 
-        aliases=["Sigla:", "Estado:", "Nível Médio:", "Total Casos:"],
+        aliases=["Sigla:", "Estado:", spec["tooltip"], "Total Casos:"],
         localize=True,
         sticky=False,
         labels=True,
@@ -108,24 +187,14 @@ async def generate_choropleth_map(db: AsyncSession, se: int) -> str:
     return m.get_root().render()
 
 
-async def generate_city_map(db: AsyncSession, se: int, state_code: int = 26) -> str:
+async def generate_city_map(db: AsyncSession, se: int, state_code: int, metric: str = "alert") -> str:
     
-    
-    stmt = (
-        select(
-            WeeklyReport.geocode,
-            Territory.name,
-            WeeklyReport.alert_level,
-            WeeklyReport.reported_cases
-        )
-        .join(Territory, WeeklyReport.geocode == Territory.geocode)
-        .where(
-            WeeklyReport.se == se,
-            Territory.state_code == state_code
-        )
-    )
+    spec = MAP_METRICS[metric]
+    await ensure_territory_registry(db)
+    stmt = city_map_query(se, state_code, spec["column"])
     result = await db.execute(stmt)
     rows = result.fetchall()
+    await release_read_session(db)
 
     if not rows:
         return "<h3 style='text-align:center; margin-top: 50px;'>Sem dados municipais para este período.</h3>"
@@ -133,43 +202,58 @@ async def generate_city_map(db: AsyncSession, se: int, state_code: int = 26) ->
     
     data = []
     for row in rows:
+        if metric == "alert":
+            raw_value = float(row.alert_level or 1.0)
+        elif row.value is None:
+            continue
+        else:
+            raw_value = round(float(row.value), 2)
         data.append({
             "geocode": row.geocode,
-            "Município": row.name,
-            "Nível de Alerta": float(row.alert_level or 1.0), 
+            "Município": territory_registry.name(row.geocode) or row.geocode,
+            "Valor": _color_value(raw_value, spec["bins"]),
+            "Exibido": raw_value,
             "Casos": row.reported_cases
         })
+
+    if not data:
+        return "<h3 style='text-align:center; margin-top: 50px;'>Sem dados municipais para este período.</h3>"
+
+    return await run_in_render_pool(render_city_html, data, STATE_CODE_TO_UF[state_code], spec)
+
+
+def render_city_html(data: List[dict], uf: str, spec: dict = MAP_METRICS["alert"]) -> str:
     
     df_city_data = pd.DataFrame(data)
 
     
-    try:
-        with open(GEOJSON_PE_PATH, "r", encoding="utf-8") as f:
-            geo_data = json.load(f)
-    except FileNotFoundError:
-        return "<h3>Erro: GeoJSON de Pernambuco não encontrado em src/static/geo/pe_municipalities.json</h3>"
+    geometry = geometry_store.get(uf)
+    if geometry is None:
+        return f"<h3>Erro: GeoJSON municipal de {uf} não encontrado em src/static/geo/municipalities/{uf}.json</h3>"
+    geo_data = geometry.load_geojson()
 
     
     m = folium.Map(
-        location=[-8.4, -37.5], 
+        location=geometry.centroid,
         zoom_start=7,
         tiles=None,
         zoom_control=False,
         attr="InfoDengue / IBGE"
     )
+    m.fit_bounds(geometry.bounds)
 
     
     choropleth = folium.Choropleth(
         geo_data=geo_data,
-        name="Nível de Alerta",
+        name=spec["label"],
         data=df_city_data,
-        columns=["geocode", "Nível de Alerta"],
+        columns=["geocode", "Valor"],
         key_on="feature.properties.id", 
         fill_color="YlOrRd",
         fill_opacity=0.8,
         line_opacity=0.2,
-        legend_name="Nível de Alerta (1=Verde, 4=Vermelho)",
-        bins=[1, 1.75, 2.5, 3.25, 4.01],
+        legend_name=spec["legend"],
+        bins=spec["bins"],
         highlight=True,
     ).add_to(m)
 
@@ -178,7 +262,7 @@ async def generate_city_map(db: AsyncSession, se: int, state_code: int = 26) ->
     for feature in choropleth.geojson.data['features']:
         geocode_geo = str(feature['properties']['id'])
         if geocode_geo in df_indexed.index:
-            feature['properties']['alert'] = str(df_indexed.loc[geocode_geo, 'Nível de Alerta'])
+            feature['properties']['alert'] = str(df_indexed.loc[geocode_geo, 'Exibido'])
             feature['properties']['cases'] = str(df_indexed.loc[geocode_geo, 'Casos'])
             feature['properties']['name'] = str(df_indexed.loc[geocode_geo, 'Município'])
         else:
@@ -188,7 +272,7 @@ async def generate_city_map(db: AsyncSession, se: int, state_code: int = 26) ->
 
     folium.GeoJsonTooltip(
         fields=["name", "alert", "cases"],
-        aliases=["Cidade:", "Nível:", "Casos:"],
+        aliases=["Cidade:", spec["tooltip"], "Casos:"],
         localize=True,
         sticky=False,
         labels=True,
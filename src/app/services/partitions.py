@@ -0,0 +1,92 @@
+import logging
+from typing import Iterable, List, Optional
+
+from sqlalchemy import func, select, text
+
+from app.core.config import settings
+from app.core.epiweek import current_se
+
+logger = logging.getLogger(__name__)
+
+
+# weekly_reports é particionada por RANGE (se), uma partição por ano epidemiológico:
+# weekly_reports_2025 guarda as SEs 202501..202553 (FOR VALUES FROM (202500) TO (202600)).
+PARENT_TABLE = "weekly_reports"
+
+# Serializa a criação de partições entre processos (API, workers, scripts)
+PARTITION_LOCK_KEY = 72_450_003
+
+
+def partition_name(year: int) -> str:
+    return f"{PARENT_TABLE}_{year}"
+
+
+def partition_bounds(year: int) -> tuple:
+    return year * 100, (year + 1) * 100
+
+
+def partition_ddl(year: int) -> str:
+    start, end = partition_bounds(year)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(year)} "
+        f"PARTITION OF {PARENT_TABLE} FOR VALUES FROM ({start}) TO ({end})"
+    )
+
+
+def default_partition_years() -> List[int]:
+    # Ano corrente e os próximos, para que a virada do ano nunca encontre a partição faltando
+    # Ano epidemiológico (a SE 1 pode começar no fim de dezembro), não o ano civil
+    current = current_se() // 100
+    return list(range(current, current + settings.WEEKLY_REPORTS_PARTITIONS_AHEAD + 1))
+
+
+async def list_partition_years(session) -> List[int]:
+
+    result = await session.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :parent"
+    ), {"parent": PARENT_TABLE})
+    prefix = f"{PARENT_TABLE}_"
+    return sorted(
+        int(name[len(prefix):]) for name in result.scalars()
+        if name.startswith(prefix) and name[len(prefix):].isdigit()
+    )
+
+
+async def _is_partitioned(session) -> bool:
+
+    # relkind 'p' = tabela particionada; antes da migração a tabela ainda é um heap comum.
+    # relkind é do tipo "char", que o asyncpg devolve como bytes: ::text para comparar com str
+    relkind = await session.scalar(
+        text("SELECT relkind::text FROM pg_class WHERE relname = :parent AND relkind IN ('r', 'p')"),
+        {"parent": PARENT_TABLE},
+    )
+    return relkind == "p"
+
+
+async def ensure_partitions(session_factory, years: Optional[Iterable[int]] = None) -> List[int]:
+    # Cria as partições anuais que faltam; devolve os anos criados
+
+    wanted = sorted(set(years) if years is not None else default_partition_years())
+    if not wanted:
+        return []
+
+    async with session_factory() as session:
+        if not await _is_partitioned(session):
+            return []
+
+        existing = set(await list_partition_years(session))
+        missing = [year for year in wanted if year not in existing]
+        if not missing:
+            return []
+
+        # CREATE ... PARTITION OF trava a tabela pai; o lock evita corridas entre processos
+        await session.execute(select(func.pg_advisory_xact_lock(PARTITION_LOCK_KEY)))
+        for year in missing:
+            await session.execute(text(partition_ddl(year)))
+        await session.commit()
+
+    logger.info(f"Partições de {PARENT_TABLE} criadas para os anos: {missing}")
+    return missing
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+from app.core.metrics import register_callback_gauge
+
+logger = logging.getLogger(__name__)
+
+
+class RenderQueueFullError(Exception):
+
+    pass
+
+
+_executor: Optional[Executor] = None
+
+render_pool_stats = {
+    "executor": settings.MAP_RENDER_EXECUTOR,
+    "max_workers": settings.MAP_RENDER_WORKERS,
+    "max_queue": settings.MAP_RENDER_MAX_QUEUE,
+    "pending": 0,
+    "queue_depth": 0,
+    "completed": 0,
+    "failed": 0,
+    "rejected": 0,
+}
+
+
+register_callback_gauge(
+    "map_render_pool", "Estado do pool de renderização de mapas (tarefas e contadores).",
+    ("stat",),
+    callback=lambda: {
+        (key,): value for key, value in render_pool_stats.items() if isinstance(value, int)
+    },
+)
+
+
+def get_render_executor() -> Executor:
+
+    global _executor
+    if _executor is None:
+        if settings.MAP_RENDER_EXECUTOR == "thread":
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.MAP_RENDER_WORKERS,
+                thread_name_prefix="map-render",
+            )
+        else:
+            # "spawn" evita herdar o event loop e conexões do processo da API
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.MAP_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        logger.info(
+            f"Pool de renderização iniciado ({settings.MAP_RENDER_EXECUTOR}, "
+            f"{settings.MAP_RENDER_WORKERS} workers)."
+        )
+    return _executor
+
+
+def _update_queue_depth() -> None:
+    render_pool_stats["queue_depth"] = max(0, render_pool_stats["pending"] - settings.MAP_RENDER_WORKERS)
+
+
+async def run_in_render_pool(fn: Callable[..., Any], *args: Any) -> Any:
+
+    if render_pool_stats["queue_depth"] >= settings.MAP_RENDER_MAX_QUEUE:
+        render_pool_stats["rejected"] += 1
+        raise RenderQueueFullError("Fila de renderização de mapas cheia.")
+
+    loop = asyncio.get_running_loop()
+    render_pool_stats["pending"] += 1
+    _update_queue_depth()
+    try:
+        result = await loop.run_in_executor(get_render_executor(), fn, *args)
+        render_pool_stats["completed"] += 1
+        return result
+    except Exception:
+        render_pool_stats["failed"] += 1
+        raise
+    finally:
+        render_pool_stats["pending"] -= 1
+        _update_queue_depth()
+
+
+def shutdown_render_pool() -> None:
+
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        logger.info("Pool de renderização finalizado.")
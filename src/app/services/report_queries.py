@@ -0,0 +1,184 @@
+from typing import Optional
+
+from sqlalchemy import Select, String, Integer, select, func, desc, cast, any_, bindparam, literal_column, and_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import noload
+
+from app.models.models import WeeklyReport, WeeklyReportMetrics, Territory
+from app.services.territory_registry import territory_registry
+
+
+# Queries dos endpoints de leitura, compartilhadas entre as rotas/serviços e os
+# benchmarks (benchmarks/scale_benchmark.py roda EXPLAIN exatamente nestes SELECTs).
+# Metadados de territories vêm do registro em memória (territory_registry), sem join.
+
+# Os dois primeiros dígitos do geocode IBGE são o código da UF (constantes inline para que
+# SELECT e GROUP BY tenham exatamente a mesma expressão)
+STATE_CODE_EXPR = cast(func.substr(WeeklyReport.geocode, literal_column("1"), literal_column("2")), Integer)
+
+
+def _state_filter(state_code: int):
+    # Lista de geocodes da UF como um único parâmetro array: o texto do SQL é o mesmo
+    # para qualquer UF (statement preparado reaproveitado), ao contrário de IN (...)
+    if territory_registry.loaded:
+        geocodes = list(territory_registry.geocodes_for_state(state_code))
+        return WeeklyReport.geocode == any_(bindparam("state_geocodes", geocodes, type_=ARRAY(String)))
+    return WeeklyReport.geocode.in_(select(Territory.geocode).where(Territory.state_code == state_code))
+
+
+# Métricas derivadas da mesma (se, geocode): join pela PK de weekly_report_metrics
+METRICS_JOIN = and_(
+    WeeklyReportMetrics.se == WeeklyReport.se,
+    WeeklyReportMetrics.geocode == WeeklyReport.geocode,
+)
+
+
+def reports_list_query(
+    skip: int = 0,
+    limit: int = 100,
+    geocode: Optional[str] = None,
+    state_code: Optional[int] = None,
+    se: Optional[int] = None,
+    se_start: Optional[int] = None,
+    se_end: Optional[int] = None,
+) -> Select:
+
+    # territory é preenchido pelo endpoint a partir do registro; métricas vêm no mesmo SELECT
+    stmt = (
+        select(WeeklyReport, WeeklyReportMetrics)
+        .outerjoin(WeeklyReportMetrics, METRICS_JOIN)
+        .options(noload(WeeklyReport.territory))
+    )
+
+    if geocode:
+        stmt = stmt.where(WeeklyReport.geocode == geocode)
+    if state_code:
+        stmt = stmt.where(_state_filter(state_code))
+    if se:
+        stmt = stmt.where(WeeklyReport.se == se)
+    if se_start:
+        stmt = stmt.where(WeeklyReport.se >= se_start)
+    if se_end:
+        stmt = stmt.where(WeeklyReport.se <= se_end)
+
+    return stmt.order_by(desc(WeeklyReport.se), WeeklyReport.geocode).offset(skip).limit(limit)
+
+
+def state_aggregation_query(se: int) -> Select:
+
+    return (
+        select(
+            STATE_CODE_EXPR.label("state_code"),
+            func.sum(WeeklyReport.reported_cases).label("total_cases"),
+            func.avg(WeeklyReport.alert_level).label("avg_alert_level"),
+            func.sum(WeeklyReport.population).label("total_population"),
+            # count(*) em vez de count(id): id não está no índice coberto (index-only scan)
+            func.count().label("report_count")
+        )
+        .where(WeeklyReport.se == se)
+        .group_by(STATE_CODE_EXPR)
+        .order_by(STATE_CODE_EXPR)
+    )
+
+
+def choropleth_query(se: int) -> Select:
+
+    return (
+        select(
+            STATE_CODE_EXPR.label("state_code"),
+            func.avg(WeeklyReport.alert_level).label("avg_alert_level"),
+            func.sum(WeeklyReport.reported_cases).label("total_cases")
+        )
+        .where(WeeklyReport.se == se)
+        .group_by(STATE_CODE_EXPR)
+    )
+
+
+def state_metric_query(se: int, metric: str) -> Select:
+
+    # Métrica derivada da UF: média dos municípios ponderada pela população
+    # (para a incidência, equivale a casos da UF / população da UF * 100 mil)
+    value = getattr(WeeklyReportMetrics, metric)
+    weighted_population = func.sum(WeeklyReport.population).filter(value.isnot(None))
+    return (
+        select(
+            STATE_CODE_EXPR.label("state_code"),
+            (func.sum(value * WeeklyReport.population) / func.nullif(weighted_population, 0)).label("value"),
+            func.sum(WeeklyReport.reported_cases).label("total_cases")
+        )
+        .select_from(WeeklyReport)
+        .outerjoin(WeeklyReportMetrics, METRICS_JOIN)
+        .where(WeeklyReport.se == se)
+        .group_by(STATE_CODE_EXPR)
+    )
+
+
+def city_map_query(se: int, state_code: int, metric: Optional[str] = None) -> Select:
+
+    # O nome do município vem de territory_registry.name(geocode) na renderização
+    stmt = (
+        select(
+            WeeklyReport.geocode,
+            WeeklyReport.alert_level,
+            WeeklyReport.reported_cases
+        )
+        .where(
+            WeeklyReport.se == se,
+            _state_filter(state_code)
+        )
+    )
+    if metric:
+        stmt = stmt.add_columns(getattr(WeeklyReportMetrics, metric).label("value")).outerjoin(
+            WeeklyReportMetrics, METRICS_JOIN
+        )
+    return stmt
+
+
+def tile_data_query(se: int) -> Select:
+
+    # Métricas derivadas vão como propriedades extras das features (cor alternativa no cliente)
+    return (
+        select(
+            WeeklyReport.geocode,
+            WeeklyReport.alert_level,
+            WeeklyReport.reported_cases,
+            WeeklyReportMetrics.incidence,
+            WeeklyReportMetrics.growth_rate,
+            WeeklyReportMetrics.incidence_ma3,
+        )
+        .outerjoin(WeeklyReportMetrics, METRICS_JOIN)
+        .where(WeeklyReport.se == se)
+    )
+
+
+def available_ses_query() -> Select:
+
+    # SEs com dados, da mais recente para a mais antiga. DISTINCT leria o índice coberto
+    # inteiro (uma entrada por município e SE); aqui cada SE candidata do intervalo
+    # [min, max] (ano * 100 + 1..53, as inexistentes simplesmente não casam) é testada com
+    # uma sonda LIMIT 1 no índice: ~53 buscas por ano, cada uma em uma única partição.
+    bounds = select(
+        func.min(WeeklyReport.se).label("lo"), func.max(WeeklyReport.se).label("hi")
+    ).cte("se_bounds")
+    year = (
+        func.generate_series(bounds.c.lo // 100, bounds.c.hi // 100)
+        .table_valued("value").render_derived(name="y")
+    )
+    week = func.generate_series(1, 53).table_valued("value").render_derived(name="w")
+    candidate = (
+        select((year.c.value * 100 + week.c.value).label("se"), bounds.c.lo, bounds.c.hi)
+        .select_from(bounds).join(year, literal_column("true")).join(week, literal_column("true"))
+        .subquery("candidate")
+    )
+    probe = (
+        select(literal_column("1").label("hit"))
+        .where(WeeklyReport.se == candidate.c.se)
+        .limit(1)
+        .lateral("probe")
+    )
+    return (
+        select(candidate.c.se)
+        .join(probe, literal_column("true"))
+        .where(candidate.c.se.between(candidate.c.lo, candidate.c.hi))
+        .order_by(desc(candidate.c.se))
+    )
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update, func
+
+from app.core.config import settings
+from app.core.leader import INSTANCE_ID
+from app.models.models import SyncRun
+from app.services.infodengue_sync import InfoDengueSyncService
+from app.services.partitions import ensure_partitions
+from app.services.sync_queue import enqueue_sync_shards
+from app.services.sync_runs import mark_sync_run_running, execute_sync, sync_run_heartbeat
+
+logger = logging.getLogger(__name__)
+
+
+# Chaves dos advisory locks do Postgres usados pelo coordenador
+SUBMIT_LOCK_KEY = 72_450_001   # seção crítica curta: decidir entre coalescer ou enfileirar
+EXECUTE_LOCK_KEY = 72_450_002  # mantido durante toda a execução de um sync
+
+
+class SyncSubmission:
+    __slots__ = ("run_id", "coalesced", "window", "default_window")
+
+    def __init__(self, run_id: int, coalesced: bool, window: dict, default_window: bool = False):
+        self.run_id = run_id
+        self.coalesced = coalesced
+        self.window = window
+        self.default_window = default_window
+
+
+def _is_default_window(params: Optional[dict]) -> bool:
+    params = params or {}
+    return not all(params.get(k) for k in ("ew_start", "ey_start", "ew_end", "ey_end"))
+
+
+def resolve_window(params: Optional[dict]) -> dict:
+
+    if _is_default_window(params):
+        return InfoDengueSyncService._calculate_sync_window()
+    return {k: params[k] for k in ("ew_start", "ey_start", "ew_end", "ey_end")}
+
+
+def _window_range(window: dict) -> Tuple[int, int]:
+    # (ano, semana) -> inteiro ordenável no formato da SE (ex: 202545)
+    return (
+        window["ey_start"] * 100 + window["ew_start"],
+        window["ey_end"] * 100 + window["ew_end"],
+    )
+
+
+def window_contains(outer: dict, inner: dict) -> bool:
+
+    outer_start, outer_end = _window_range(outer)
+    inner_start, inner_end = _window_range(inner)
+    return outer_start <= inner_start and inner_end <= outer_end
+
+
+def _run_window(run: SyncRun) -> Optional[dict]:
+    if None in (run.ew_start, run.ey_start, run.ew_end, run.ey_end):
+        return None
+    return {"ew_start": run.ew_start, "ey_start": run.ey_start, "ew_end": run.ew_end, "ey_end": run.ey_end}
+
+
+async def submit_sync(session_factory, trigger: str, params: Optional[dict] = None) -> SyncSubmission:
+
+    window = resolve_window(params)
+    stale_before = datetime.now().astimezone() - timedelta(minutes=settings.SYNC_RUN_STALE_MINUTES)
+
+    async with session_factory() as session:
+        # Lock transacional: dois submits simultâneos nunca enfileiram a mesma janela
+        await session.execute(select(func.pg_advisory_xact_lock(SUBMIT_LOCK_KEY)))
+
+        # Runs "presos" (processo morreu no meio) não podem absorver novos pedidos para sempre.
+        # Vale o heartbeat, e não started_at: um sync longo mas vivo não expira.
+        await session.execute(
+            update(SyncRun)
+            .where(SyncRun.status.in_(("queued", "running")), SyncRun.heartbeat_at < stale_before)
+            .values(status="failed", finished_at=func.now(), error="Execução abandonada (stale).")
+        )
+
+        result = await session.execute(
+            select(SyncRun).where(SyncRun.status.in_(("queued", "running"))).order_by(SyncRun.id)
+        )
+        for run in result.scalars().all():
+            run_window = _run_window(run)
+            if run_window and window_contains(run_window, window):
+                await session.commit()
+                logger.info(
+                    f"Sync {trigger} com janela {window} coalescido no run #{run.id} ({run.status})."
+                )
+                return SyncSubmission(run.id, True, run_window)
+
+        run = SyncRun(
+            trigger=trigger,
+            status="queued",
+            host=INSTANCE_ID,
+            ew_start=window["ew_start"],
+            ey_start=window["ey_start"],
+            ew_end=window["ew_end"],
+            ey_end=window["ey_end"],
+        )
+        session.add(run)
+        await session.commit()
+        logger.info(f"Sync {trigger} com janela {window} enfileirado como run #{run.id}.")
+        return SyncSubmission(run.id, False, window, _is_default_window(params))
+
+
+async def run_submitted_sync(session_factory, submission: SyncSubmission, trigger: str) -> dict:
+
+    # Garante as partições anuais de weekly_reports que a janela vai tocar (ex: backfill)
+    await ensure_partitions(
+        session_factory, range(submission.window["ey_start"], submission.window["ey_end"] + 1)
+    )
+
+    if settings.SYNC_EXECUTION_MODE == "queue":
+        # Modo fila: o run é quebrado em shards e executado pelos consumidores
+        # (python -m app.worker), em paralelo e em quantos nós houver. A serialização
+        # entre runs fica no claim (claim_sync_task), não no EXECUTE_LOCK_KEY.
+        await mark_sync_run_running(session_factory, submission.run_id)
+        shards = await enqueue_sync_shards(
+            session_factory, submission.run_id, skip_quiet=submission.default_window
+        )
+        return {"run_id": submission.run_id, "queued_shards": shards}
+
+    # Conexão dedicada segura o advisory lock de execução durante todo o sync,
+    # serializando syncs entre todos os processos (API, workers, scheduler).
+    # Heartbeat desde a espera pelo lock: um run enfileirado atrás de um sync longo segue vivo
+    heartbeat = asyncio.create_task(sync_run_heartbeat(session_factory, submission.run_id))
+    engine = session_factory.kw["bind"]
+    try:
+        async with engine.connect() as lock_conn:
+            logger.info(f"Run #{submission.run_id} aguardando a vez de executar...")
+            await lock_conn.execute(select(func.pg_advisory_lock(EXECUTE_LOCK_KEY)))
+            await lock_conn.commit()
+            try:
+                await mark_sync_run_running(session_factory, submission.run_id)
+                # Janela já resolvida; só a padrão permite pular municípios quietos
+                return await execute_sync(
+                    session_factory, trigger, submission.window,
+                    run_id=submission.run_id, skip_quiet=submission.default_window,
+                )
+            finally:
+                await lock_conn.execute(select(func.pg_advisory_unlock(EXECUTE_LOCK_KEY)))
+                await lock_conn.commit()
+    finally:
+        heartbeat.cancel()
+
+
+async def wait_for_sync_run(session_factory, run_id: int, poll_seconds: float = 5.0) -> SyncRun:
+
+    while True:
+        async with session_factory() as session:
+            run = await session.get(SyncRun, run_id)
+            if run is None or run.status in ("success", "failed"):
+                return run
+        await asyncio.sleep(poll_seconds)
+
+
+async def coordinated_sync(session_factory, trigger: str, params: Optional[dict] = None) -> dict:
+    # Submete e executa (ou aguarda o run que já cobre a janela / os shards da fila)
+
+    submission = await submit_sync(session_factory, trigger, params)
+    if not submission.coalesced:
+        stats = await run_submitted_sync(session_factory, submission, trigger)
+        if "queued_shards" not in stats:
+            return stats
+
+    run = await wait_for_sync_run(session_factory, submission.run_id)
+    if run is not None and run.status == "failed":
+        raise RuntimeError(f"Sync #{run.id} falhou: {run.error}")
+    return {
+        "run_id": submission.run_id,
+        "coalesced": submission.coalesced,
+        "inserted": run.inserted if run else None,
+        "updated": run.updated if run else None,
+        "geocodes_synced": run.geocodes_synced if run else None,
+        "geocodes_failed": run.geocodes_failed if run else None,
+    }
@@ -0,0 +1,25 @@
+import logging
+
+from app.core.cache import invalidate_read_cache
+from app.core.config import settings
+from app.services.map_artifacts import invalidate_map_artifacts, warm_map_artifacts
+from app.services.tile_service import invalidate_tiles
+
+logger = logging.getLogger(__name__)
+
+
+async def run_post_sync_hooks(stats: dict, session_factory=None) -> None:
+    # Deve ser chamado somente APÓS o commit da sincronização
+
+    affected_ses = (stats or {}).get("affected_ses", [])
+
+    # Artefatos das SEs alteradas ficam obsoletos: remove antes de qualquer outra coisa
+    invalidate_map_artifacts(affected_ses)
+    invalidate_tiles(affected_ses)
+    await invalidate_read_cache()
+
+    if settings.MAP_PRERENDER_ENABLED and session_factory is not None and affected_ses:
+        try:
+            await warm_map_artifacts(session_factory, affected_ses)
+        except Exception as e:
+            logger.error(f"Falha na pré-renderização pós-sync: {e}")
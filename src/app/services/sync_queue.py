@@ -0,0 +1,351 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import select, update, func, case
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.config import settings
+from app.core.leader import INSTANCE_ID
+from app.core.profiling import create_sync_profiler
+from app.models.models import SyncRun, SyncTask
+from app.services.infodengue_sync import InfoDengueSyncService, CONCURRENT_REQUESTS_LIMIT
+from app.services.sync_hooks import run_post_sync_hooks
+from app.services.sync_runs import sync_run_values, finish_sync_run, touch_sync_run
+
+logger = logging.getLogger(__name__)
+
+
+def _run_window(run: SyncRun) -> dict:
+    return {"ew_start": run.ew_start, "ey_start": run.ey_start, "ew_end": run.ew_end, "ey_end": run.ey_end}
+
+
+async def enqueue_sync_shards(session_factory, run_id: int, skip_quiet: bool = False) -> int:
+
+    # Os shards seguem a ordem de prioridade do run: shard 0 = municípios mais ativos
+    async with session_factory() as session:
+        service = InfoDengueSyncService(session)
+        try:
+            geocodes, _ = await service.plan_geocodes(run_id, skip_quiet=skip_quiet)
+        finally:
+            await service.aclose()
+
+        shard_size = max(1, settings.SYNC_QUEUE_SHARD_SIZE)
+        shards = [
+            {"run_id": run_id, "shard": i, "geocodes": geocodes[start:start + shard_size]}
+            for i, start in enumerate(range(0, len(geocodes), shard_size))
+        ]
+        if shards:
+            await session.execute(pg_insert(SyncTask).values(shards))
+        await session.commit()
+
+    if not shards:
+        logger.error(f"Run #{run_id}: nenhum território (geocode) para enfileirar.")
+        await finish_sync_run(session_factory, run_id, error="Nenhum território para sincronizar.")
+        return 0
+
+    logger.info(f"Run #{run_id}: {len(geocodes)} municípios enfileirados em {len(shards)} shards.")
+    return len(shards)
+
+
+async def _fail_exhausted_tasks(session_factory) -> set:
+
+    # Claims expirados que já esgotaram as tentativas não voltam para a fila
+    async with session_factory() as session:
+        result = await session.execute(
+            update(SyncTask)
+            .where(
+                SyncTask.status == "claimed",
+                SyncTask.visible_at <= func.now(),
+                SyncTask.attempts >= settings.SYNC_TASK_MAX_ATTEMPTS,
+            )
+            .values(status="failed", finished_at=func.now(), error="Visibility timeout esgotado.")
+            .returning(SyncTask.run_id)
+        )
+        run_ids = {row.run_id for row in result.fetchall()}
+        await session.commit()
+    return run_ids
+
+
+async def claim_sync_task(session_factory) -> Optional[dict]:
+
+    for run_id in await _fail_exhausted_tasks(session_factory):
+        await try_finalize_sync_run(session_factory, run_id)
+
+    visibility = timedelta(seconds=settings.SYNC_TASK_VISIBILITY_SECONDS)
+
+    # Runs não coalescidos executam um de cada vez, como o EXECUTE_LOCK_KEY no modo local:
+    # só há claim de shards do run mais antigo que ainda tem shards abertos. Os shards do
+    # run seguinte esperam até o último shard do anterior terminar (done ou failed).
+    oldest_open_run = (
+        select(func.min(SyncTask.run_id))
+        .where(SyncTask.status.in_(("pending", "claimed")))
+        .scalar_subquery()
+    )
+
+    # SKIP LOCKED: vários workers (em qualquer nó) disputam a fila sem se bloquear.
+    # Um shard "claimed" cujo visible_at passou pertence a um worker que morreu.
+    next_task = (
+        select(SyncTask.id)
+        .where(
+            SyncTask.run_id == oldest_open_run,
+            SyncTask.status.in_(("pending", "claimed")),
+            SyncTask.visible_at <= func.now(),
+            SyncTask.attempts < settings.SYNC_TASK_MAX_ATTEMPTS,
+        )
+        .order_by(SyncTask.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(SyncTask)
+        .where(SyncTask.id == next_task)
+        .values(
+            status="claimed",
+            claimed_by=INSTANCE_ID,
+            claimed_at=func.now(),
+            visible_at=func.now() + visibility,
+            attempts=SyncTask.attempts + 1,
+        )
+        .returning(SyncTask.id, SyncTask.run_id, SyncTask.shard, SyncTask.geocodes, SyncTask.attempts)
+    )
+
+    async with session_factory() as session:
+        row = (await session.execute(stmt)).first()
+        await session.commit()
+
+    if row is None:
+        return None
+    return {"id": row.id, "run_id": row.run_id, "shard": row.shard,
+            "geocodes": row.geocodes, "attempts": row.attempts}
+
+
+async def _extend_claim(session_factory, task_id: int, run_id: int) -> None:
+
+    # Renova o visibility timeout do shard e o heartbeat do run enquanto o shard é processado
+    interval = max(1, min(settings.SYNC_TASK_VISIBILITY_SECONDS // 3, settings.SYNC_RUN_HEARTBEAT_SECONDS))
+    visibility = timedelta(seconds=settings.SYNC_TASK_VISIBILITY_SECONDS)
+    while True:
+        try:
+            async with session_factory() as session:
+                await session.execute(
+                    update(SyncTask)
+                    .where(SyncTask.id == task_id, SyncTask.claimed_by == INSTANCE_ID,
+                           SyncTask.status == "claimed")
+                    .values(visible_at=func.now() + visibility)
+                )
+                await touch_sync_run(session, run_id)
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"Falha ao renovar o claim do shard #{task_id}: {e}")
+        await asyncio.sleep(interval)
+
+
+async def process_sync_task(session_factory, task: dict) -> None:
+
+    logger.info(
+        f"Processando shard {task['shard']} do run #{task['run_id']} "
+        f"({len(task['geocodes'])} municípios, tentativa {task['attempts']})..."
+    )
+    heartbeat = asyncio.create_task(_extend_claim(session_factory, task["id"], task["run_id"]))
+
+    try:
+        async with session_factory() as session:
+            run = await session.get(SyncRun, task["run_id"])
+            service = InfoDengueSyncService(session)
+            service.profiler = create_sync_profiler(f"run-{task['run_id']}-shard-{task['shard']}")
+            try:
+                totals = await service.sync_geocodes(
+                    task["geocodes"], _run_window(run), commit_chunks=False
+                )
+            finally:
+                await service.aclose()
+            if service.profiler is not None:
+                service.profiler.dump()
+
+            # Dados e conclusão do shard no mesmo commit. Se o claim expirou e outro worker
+            # assumiu, o UPDATE não afeta nada; o UPSERT é idempotente de qualquer forma.
+            await session.execute(
+                update(SyncTask)
+                .where(SyncTask.id == task["id"], SyncTask.claimed_by == INSTANCE_ID,
+                       SyncTask.status == "claimed")
+                .values(
+                    status="done",
+                    finished_at=func.now(),
+                    inserted=totals["inserted"],
+                    updated=totals["updated"],
+                    geocodes_failed=totals["failed"],
+                    ses=sorted(totals["ses"]),
+                    fetch_seconds=round(totals["fetch_seconds"], 3),
+                    parse_seconds=round(totals["parse_seconds"], 3),
+                    upsert_seconds=round(totals["upsert_seconds"], 3),
+                    derive_seconds=round(totals["derive_seconds"], 3),
+                    error=None,
+                )
+            )
+            await session.commit()
+
+    except Exception as e:
+        logger.error(f"Falha no shard {task['shard']} do run #{task['run_id']}: {e}")
+        exhausted = task["attempts"] >= settings.SYNC_TASK_MAX_ATTEMPTS
+        async with session_factory() as session:
+            await session.execute(
+                update(SyncTask)
+                .where(SyncTask.id == task["id"], SyncTask.claimed_by == INSTANCE_ID)
+                .values(
+                    status="failed" if exhausted else "pending",
+                    finished_at=func.now() if exhausted else None,
+                    # Nova tentativa com atraso, para não martelar a mesma falha
+                    visible_at=func.now() + timedelta(seconds=settings.SYNC_QUEUE_POLL_SECONDS),
+                    error=str(e),
+                )
+            )
+            await session.commit()
+    finally:
+        heartbeat.cancel()
+
+    await try_finalize_sync_run(session_factory, task["run_id"])
+
+
+async def try_finalize_sync_run(session_factory, run_id: int) -> Optional[dict]:
+
+    async with session_factory() as session:
+        # Lock na linha do run: só um worker fecha o run, mesmo que vários terminem juntos
+        run = (await session.execute(
+            select(SyncRun)
+            .where(SyncRun.id == run_id, SyncRun.status.in_(("running", "failed")))
+            .with_for_update()
+        )).scalar_one_or_none()
+        if run is None:
+            return None
+
+        # Run marcado como failed (ex: heartbeat expirado) com shards ainda ativos: os shards
+        # que terminarem depois disso ainda gravam dados, então o run é fechado de novo com o
+        # resultado real. Sem shard concluído depois do finished_at, não há nada a refazer.
+        if run.status == "failed":
+            finished_late = await session.scalar(
+                select(func.count()).select_from(SyncTask)
+                .where(
+                    SyncTask.run_id == run_id,
+                    SyncTask.finished_at > func.coalesce(run.finished_at, run.started_at),
+                )
+            )
+            if not finished_late:
+                await session.rollback()
+                return None
+
+        pending = await session.scalar(
+            select(func.count()).select_from(SyncTask)
+            .where(SyncTask.run_id == run_id, SyncTask.status.in_(("pending", "claimed")))
+        )
+        if pending:
+            await session.rollback()
+            return None
+
+        agg = (await session.execute(
+            select(
+                func.count().label("shards"),
+                func.count().filter(SyncTask.status == "failed").label("failed_shards"),
+                func.coalesce(func.sum(SyncTask.inserted), 0).label("inserted"),
+                func.coalesce(func.sum(SyncTask.updated), 0).label("updated"),
+                func.coalesce(func.sum(func.cardinality(SyncTask.geocodes)), 0).label("geocodes"),
+                func.coalesce(func.sum(case(
+                    (SyncTask.status == "failed", func.cardinality(SyncTask.geocodes)),
+                    else_=SyncTask.geocodes_failed,
+                )), 0).label("geocodes_failed"),
+                func.coalesce(func.sum(SyncTask.fetch_seconds), 0.0).label("fetch_seconds"),
+                func.coalesce(func.sum(SyncTask.parse_seconds), 0.0).label("parse_seconds"),
+                func.coalesce(func.sum(SyncTask.upsert_seconds), 0.0).label("upsert_seconds"),
+                func.coalesce(func.sum(SyncTask.derive_seconds), 0.0).label("derive_seconds"),
+            ).where(SyncTask.run_id == run_id)
+        )).one()
+        ses = (await session.execute(
+            select(func.unnest(SyncTask.ses).label("se")).where(SyncTask.run_id == run_id).distinct()
+        )).scalars().all()
+
+        stats = {
+            "inserted": agg.inserted,
+            "updated": agg.updated,
+            "geocodes_synced": agg.geocodes - agg.geocodes_failed,
+            "geocodes_failed": agg.geocodes_failed,
+            "affected_ses": sorted(ses),
+            "window": _run_window(run),
+            "concurrency": CONCURRENT_REQUESTS_LIMIT,
+            # Soma dos tempos de todos os shards (tempo de CPU/espera, não de relógio)
+            "timings": {
+                "fetch_seconds": round(agg.fetch_seconds, 3),
+                "parse_seconds": round(agg.parse_seconds, 3),
+                "upsert_seconds": round(agg.upsert_seconds, 3),
+                "derive_seconds": round(agg.derive_seconds, 3),
+            },
+            "shards": agg.shards,
+            "failed_shards": agg.failed_shards,
+        }
+        error = None
+        if agg.failed_shards and agg.failed_shards == agg.shards:
+            error = "Todos os shards falharam."
+
+        values = sync_run_values(stats, error)
+        # Relógio do banco, o mesmo de sync_tasks.finished_at (comparação acima)
+        values["finished_at"] = func.now()
+        if agg.failed_shards and not error:
+            values["error"] = f"{agg.failed_shards} de {agg.shards} shards falharam."
+        await session.execute(update(SyncRun).where(SyncRun.id == run_id).values(**values))
+        await session.commit()
+
+    logger.info(f"Run #{run_id} (fila) finalizado. Stats: {stats}")
+    if not error:
+        await run_post_sync_hooks(stats, session_factory)
+    stats["run_id"] = run_id
+    return stats
+
+
+async def touch_queued_sync_runs(session_factory) -> None:
+
+    # Runs com shards ainda na fila seguem vivos enquanto houver consumidor ativo,
+    # mesmo que nenhum shard deles esteja em processamento agora
+    has_open_shards = (
+        select(SyncTask.id)
+        .where(SyncTask.run_id == SyncRun.id, SyncTask.status.in_(("pending", "claimed")))
+        .exists()
+    )
+    async with session_factory() as session:
+        await session.execute(
+            update(SyncRun)
+            .where(SyncRun.status == "running", has_open_shards)
+            .values(heartbeat_at=func.now())
+        )
+        await session.commit()
+
+
+async def consume_sync_queue(session_factory, stop_event: asyncio.Event, consumer_id: int = 0) -> None:
+
+    logger.info(f"Consumidor {consumer_id} da fila de sync iniciado ({INSTANCE_ID}).")
+    loop = asyncio.get_running_loop()
+    last_touch = 0.0
+    while not stop_event.is_set():
+        if loop.time() - last_touch >= settings.SYNC_RUN_HEARTBEAT_SECONDS:
+            try:
+                await touch_queued_sync_runs(session_factory)
+            except Exception as e:
+                logger.warning(f"Falha ao renovar o heartbeat dos runs na fila: {e}")
+            last_touch = loop.time()
+
+        try:
+            task = await claim_sync_task(session_factory)
+        except Exception as e:
+            logger.error(f"Falha ao buscar shard na fila de sync: {e}")
+            task = None
+
+        if task is None:
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=settings.SYNC_QUEUE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        await process_sync_task(session_factory, task)
+
+    logger.info(f"Consumidor {consumer_id} da fila de sync finalizado.")
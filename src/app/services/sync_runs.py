@@ -0,0 +1,183 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import select, update, desc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.leader import INSTANCE_ID
+from app.models.models import SyncRun
+from app.services.infodengue_sync import InfoDengueSyncService
+from app.services.sync_hooks import run_post_sync_hooks
+
+logger = logging.getLogger(__name__)
+
+
+async def create_sync_run(
+    session_factory, trigger: str, window: Optional[dict] = None, status: str = "running"
+) -> int:
+
+    window = window or {}
+    async with session_factory() as session:
+        run = SyncRun(
+            trigger=trigger,
+            status=status,
+            host=INSTANCE_ID,
+            ew_start=window.get("ew_start"),
+            ey_start=window.get("ey_start"),
+            ew_end=window.get("ew_end"),
+            ey_end=window.get("ey_end"),
+        )
+        session.add(run)
+        await session.commit()
+        return run.id
+
+
+async def mark_sync_run_running(session_factory, run_id: int) -> None:
+
+    async with session_factory() as session:
+        await session.execute(
+            update(SyncRun)
+            .where(SyncRun.id == run_id)
+            .values(status="running", host=INSTANCE_ID, started_at=datetime.now().astimezone(),
+                    heartbeat_at=func.now())
+        )
+        await session.commit()
+
+
+async def touch_sync_run(session, run_id: int) -> None:
+    # Sinal de vida do run (só enquanto ativo); o commit fica com quem chama
+
+    await session.execute(
+        update(SyncRun)
+        .where(SyncRun.id == run_id, SyncRun.status.in_(("queued", "running")))
+        .values(heartbeat_at=func.now())
+    )
+
+
+async def sync_run_heartbeat(session_factory, run_id: int) -> None:
+
+    # Roda em paralelo à execução (ou à espera pelo lock); cancelada ao final
+    while True:
+        try:
+            async with session_factory() as session:
+                await touch_sync_run(session, run_id)
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"Falha ao renovar o heartbeat do run #{run_id}: {e}")
+        await asyncio.sleep(settings.SYNC_RUN_HEARTBEAT_SECONDS)
+
+
+def sync_run_values(stats: Optional[dict] = None, error: Optional[str] = None) -> dict:
+    # Colunas de sync_runs preenchidas ao final de uma execução
+
+    stats = stats or {}
+    window = stats.get("window", {})
+    timings = stats.get("timings", {})
+
+    values = {
+        "status": "failed" if error else "success",
+        "finished_at": datetime.now().astimezone(),
+        "error": error,
+        "fetch_seconds": timings.get("fetch_seconds"),
+        "parse_seconds": timings.get("parse_seconds"),
+        "upsert_seconds": timings.get("upsert_seconds"),
+        "derive_seconds": timings.get("derive_seconds"),
+        "inserted": stats.get("inserted"),
+        "updated": stats.get("updated"),
+        "geocodes_synced": stats.get("geocodes_synced"),
+        "geocodes_failed": stats.get("geocodes_failed"),
+        "concurrency": stats.get("concurrency"),
+    }
+    # A janela efetiva (calculada pelo serviço quando não informada) substitui a solicitada
+    for key in ("ew_start", "ey_start", "ew_end", "ey_end"):
+        if window.get(key) is not None:
+            values[key] = window[key]
+    return values
+
+
+async def finish_sync_run(
+    session_factory, run_id: int, stats: Optional[dict] = None, error: Optional[str] = None
+) -> None:
+
+    values = sync_run_values(stats, error)
+    async with session_factory() as session:
+        await session.execute(update(SyncRun).where(SyncRun.id == run_id).values(**values))
+        await session.commit()
+
+
+async def execute_sync(
+    session_factory,
+    trigger: str,
+    params: Optional[dict] = None,
+    run_id: Optional[int] = None,
+    skip_quiet: Optional[bool] = None,
+) -> dict:
+    # Ponto único de execução do sync: registra o run, faz commit e dispara os hooks pós-sync
+
+    params = params or {}
+    if run_id is None:
+        run_id = await create_sync_run(session_factory, trigger, params)
+
+    async with session_factory() as session:
+        service = InfoDengueSyncService(session)
+        try:
+            stats = await service.run_full_sync(**params, run_number=run_id, skip_quiet=skip_quiet)
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Sync #{run_id} ({trigger}) falhou: {e}")
+            await finish_sync_run(session_factory, run_id, error=str(e))
+            # Blocos commitados antes da falha já estão no banco: caches e artefatos dessas SEs
+            # ficariam obsoletos (sem pré-renderização, que fica para o próximo sync)
+            if service.committed_ses:
+                try:
+                    await run_post_sync_hooks({"affected_ses": sorted(service.committed_ses)})
+                except Exception as hook_error:
+                    logger.error(f"Falha ao invalidar caches após o sync #{run_id}: {hook_error}")
+            raise
+        finally:
+            # Cliente HTTP do serviço fechado em qualquer saída (inclusive sem geocodes)
+            await service.aclose()
+
+    await finish_sync_run(session_factory, run_id, stats)
+    await run_post_sync_hooks(stats, session_factory)
+
+    stats["run_id"] = run_id
+    return stats
+
+
+async def list_sync_runs(
+    db: AsyncSession, skip: int = 0, limit: int = 50, status: Optional[str] = None
+) -> List[SyncRun]:
+
+    stmt = select(SyncRun)
+    if status:
+        stmt = stmt.where(SyncRun.status == status)
+    stmt = stmt.order_by(desc(SyncRun.id)).offset(skip).limit(limit)
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
+
+async def get_sync_run(db: AsyncSession, run_id: int) -> Optional[SyncRun]:
+
+    return await db.get(SyncRun, run_id)
+
+
+async def list_active_sync_runs(db: AsyncSession) -> List[SyncRun]:
+
+    stmt = (
+        select(SyncRun)
+        .where(SyncRun.status.in_(("queued", "running")))
+        .order_by(SyncRun.id)
+    )
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
+
+async def get_latest_sync_run(db: AsyncSession) -> Optional[SyncRun]:
+
+    result = await db.execute(select(SyncRun).order_by(desc(SyncRun.id)).limit(1))
+    return result.scalar_one_or_none()
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.core.leader import INSTANCE_ID
+from app.core.pg_events import listen_forever, publish
+from app.models.models import Territory
+
+logger = logging.getLogger(__name__)
+
+
+# Canal avisado pelo seed quando a tabela territories muda
+TERRITORIES_CHANNEL = "territories_changed"
+
+
+class TerritoryInfo:
+    __slots__ = ("geocode", "name", "state_code")
+
+    def __init__(self, geocode: str, name: str, state_code: int):
+        self.geocode = geocode
+        self.name = name
+        self.state_code = state_code
+
+
+class _Snapshot:
+    # Colunas paralelas ordenadas por geocode: ~5.570 municípios cabem em poucas centenas de KB.
+    # Imutável depois de montado; um refresh troca o snapshot inteiro de uma vez.
+    __slots__ = ("geocodes", "names", "state_codes", "by_state", "loaded_at")
+
+    def __init__(self, rows: List[Tuple[str, str, int]]):
+        rows = sorted(rows)
+        self.geocodes: List[str] = [r[0] for r in rows]
+        self.names: List[str] = [r[1] for r in rows]
+        self.state_codes = array("B", (r[2] for r in rows))  # códigos de UF do IBGE cabem em 1 byte
+        by_state: Dict[int, List[str]] = {}
+        for geocode, _, state_code in rows:
+            by_state.setdefault(state_code, []).append(geocode)
+        self.by_state: Dict[int, Tuple[str, ...]] = {k: tuple(v) for k, v in by_state.items()}
+        self.loaded_at = time.time()
+
+
+class TerritoryRegistry:
+    # Metadados de territories (geocode -> nome/UF, UF -> geocodes) em memória, por processo.
+    # A tabela muda quase nunca; os caminhos quentes consultam o registro em vez de fazer join.
+
+    __slots__ = ("_snapshot",)
+
+    def __init__(self):
+        self._snapshot = _Snapshot([])
+
+    def __len__(self) -> int:
+        return len(self._snapshot.geocodes)
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._snapshot.geocodes)
+
+    def replace(self, rows: List[Tuple[str, str, int]]) -> None:
+        self._snapshot = _Snapshot(rows)
+
+    def _position(self, geocode: str) -> int:
+        snap = self._snapshot
+        i = bisect_left(snap.geocodes, geocode)
+        return i if i < len(snap.geocodes) and snap.geocodes[i] == geocode else -1
+
+    def get(self, geocode: str) -> Optional[TerritoryInfo]:
+        snap = self._snapshot
+        i = self._position(geocode)
+        if i < 0:
+            return None
+        return TerritoryInfo(geocode, snap.names[i], snap.state_codes[i])
+
+    def name(self, geocode: str) -> Optional[str]:
+        i = self._position(geocode)
+        return self._snapshot.names[i] if i >= 0 else None
+
+    def state_code(self, geocode: str) -> Optional[int]:
+        i = self._position(geocode)
+        return self._snapshot.state_codes[i] if i >= 0 else None
+
+    def geocodes(self) -> List[str]:
+        return list(self._snapshot.geocodes)
+
+    def geocodes_for_state(self, state_code: int) -> Tuple[str, ...]:
+        return self._snapshot.by_state.get(state_code, ())
+
+    def stats(self) -> dict:
+        snap = self._snapshot
+        return {"territories": len(snap.geocodes), "states": len(snap.by_state), "loaded_at": snap.loaded_at}
+
+
+territory_registry = TerritoryRegistry()
+
+
+async def _load_from_session(session) -> int:
+
+    result = await session.execute(select(Territory.geocode, Territory.name, Territory.state_code))
+    rows = [tuple(row) for row in result.fetchall()]
+    territory_registry.replace(rows)
+    logger.info(f"Registro de territórios carregado: {len(rows)} municípios.")
+    return len(rows)
+
+
+async def load_territory_registry(session_factory) -> int:
+
+    async with session_factory() as session:
+        return await _load_from_session(session)
+
+
+async def ensure_territory_registry(session) -> None:
+    # Processo que não carregou no startup (banco fora do ar, script): carrega na primeira leitura
+    if not territory_registry.loaded:
+        await _load_from_session(session)
+
+
+async def publish_territories_changed() -> None:
+    # Chamado pelo seed depois do commit: os processos recarregam o registro
+    await publish(TERRITORIES_CHANNEL, INSTANCE_ID)
+
+
+async def refresh_territory_registry(session_factory) -> None:
+
+    try:
+        await load_territory_registry(session_factory)
+    except Exception as e:
+        # Mantém o snapshot anterior; o próximo aviso (ou restart) tenta de novo
+        logger.error(f"Falha ao carregar o registro de territórios: {e}")
+
+
+_listener_task: Optional[asyncio.Task] = None
+# Uma recarga por vez: avisos durante uma recarga viram uma única recarga seguinte
+_refresh_task: Optional[asyncio.Task] = None
+_refresh_pending = False
+
+
+async def _refresh_until_current(session_factory) -> None:
+
+    global _refresh_pending
+    while _refresh_pending:
+        _refresh_pending = False
+        await refresh_territory_registry(session_factory)
+
+
+def _schedule_refresh(session_factory) -> None:
+
+    global _refresh_task, _refresh_pending
+    _refresh_pending = True
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.get_running_loop().create_task(_refresh_until_current(session_factory))
+
+
+def start_territory_listener(session_factory) -> None:
+
+    global _listener_task
+
+    def _on_change(connection, pid, channel, payload) -> None:
+        logger.info(f"Territórios alterados (aviso de {payload}); recarregando o registro.")
+        _schedule_refresh(session_factory)
+
+    if _listener_task is None:
+        _listener_task = asyncio.get_running_loop().create_task(listen_forever(TERRITORIES_CHANNEL, _on_change))
+
+
+async def stop_territory_listener() -> None:
+
+    global _listener_task, _refresh_task
+    for task in (_listener_task, _refresh_task):
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    _listener_task = _refresh_task = None
@@ -0,0 +1,323 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import shutil
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache_backend
+from app.core.config import settings
+from app.core.metrics import cache_requests_total
+from app.core.singleflight import SingleFlight
+from app.db.read_routing import release_read_session
+from app.services.geo_store import GEO_DIR, available_states, state_geometry_path
+from app.services.render_pool import run_in_render_pool
+from app.services.report_queries import tile_data_query
+
+logger = logging.getLogger(__name__)
+
+
+# Malha nacional de municípios (opcional); sem ela, usa a união das malhas por UF
+GEOJSON_BR_MUNICIPALITIES_PATH = os.path.join(GEO_DIR, "br_municipalities.json")
+
+MVT_LAYER_NAME = "municipalities"
+MVT_EXTENT = 4096
+# Meia-largura do mundo em Web Mercator (EPSG:3857)
+WEB_MERCATOR_HALF_WORLD = 20037508.342789244
+
+
+class TileServiceError(Exception):
+
+    pass
+
+
+def tile_bounds(z: int, x: int, y: int):
+    # Retorna (minx, miny, maxx, maxy) do tile em EPSG:3857 (esquema XYZ, origem no topo)
+    tile_size = 2 * WEB_MERCATOR_HALF_WORLD / (2 ** z)
+    minx = -WEB_MERCATOR_HALF_WORLD + x * tile_size
+    maxy = WEB_MERCATOR_HALF_WORLD - y * tile_size
+    return minx, maxy - tile_size, minx + tile_size, maxy
+
+
+def _tile_clip_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    # Margem de 1/64 do tile evita artefatos de borda entre tiles vizinhos
+    minx, miny, maxx, maxy = tile_bounds(z, x, y)
+    buffer = (maxx - minx) / 64
+    return minx - buffer, miny - buffer, maxx + buffer, maxy + buffer
+
+
+# Versão das tiles de uma SE em disco (tiles/<se>/.version): criada na primeira escrita e
+# apagada junto com o diretório por invalidate_tiles. Fica no disco compartilhado, então vale
+# entre worker e API mesmo antes de a geração do cache chegar aos outros processos.
+TILE_VERSION_FILE = ".version"
+
+
+def _tile_se_dir(se: int) -> str:
+    return os.path.join(settings.MAP_OUTPUT_DIR, "tiles", str(se))
+
+
+def _tile_path(se: int, z: int, x: int, y: int) -> str:
+    return os.path.join(_tile_se_dir(se), str(z), str(x), f"{y}.pbf")
+
+
+def _municipality_sources() -> List[str]:
+    # Malha nacional se existir; senão, as malhas por UF
+    if os.path.exists(GEOJSON_BR_MUNICIPALITIES_PATH):
+        return [GEOJSON_BR_MUNICIPALITIES_PATH]
+    states = available_states()
+    logger.warning(
+        f"Malha nacional {GEOJSON_BR_MUNICIPALITIES_PATH} ausente: as tiles cobrem só as UFs "
+        f"com malha municipal própria ({', '.join(states) or 'nenhuma'})."
+    )
+    return [state_geometry_path(uf) for uf in states]
+
+
+def _to_web_mercator(lon: np.ndarray, lat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    x = lon * WEB_MERCATOR_HALF_WORLD / 180
+    y = np.log(np.tan((90 + lat) * math.pi / 360)) * WEB_MERCATOR_HALF_WORLD / math.pi
+    return x, y
+
+
+@lru_cache(maxsize=1)
+def _municipality_bounds() -> Tuple[np.ndarray, np.ndarray]:
+    # Bounding box (EPSG:3857) de cada município, no processo da API: só o necessário para
+    # mandar ao pool os dados dos municípios do tile, sem carregar geopandas/shapely aqui.
+    # Feito uma vez por processo.
+    geocodes, bounds = [], []
+    for path in _municipality_sources():
+        with open(path, "r", encoding="utf-8") as f:
+            geo_data = json.load(f)
+        for feature in geo_data["features"]:
+            geometry = feature["geometry"]
+            polygons = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+            coords = np.concatenate([np.asarray(polygon[0], dtype=float)[:, :2] for polygon in polygons])
+            geocodes.append(str(feature["properties"]["id"]))
+            bounds.append((*coords.min(axis=0), *coords.max(axis=0)))
+
+    if not bounds:
+        return np.array([], dtype=object), np.empty((0, 4))
+    bounds = np.asarray(bounds)
+    bounds[:, 0], bounds[:, 1] = _to_web_mercator(bounds[:, 0], bounds[:, 1])
+    bounds[:, 2], bounds[:, 3] = _to_web_mercator(bounds[:, 2], bounds[:, 3])
+    return np.asarray(geocodes, dtype=object), bounds
+
+
+def geocodes_in_tile(z: int, x: int, y: int) -> List[str]:
+
+    geocodes, bounds = _municipality_bounds()
+    minx, miny, maxx, maxy = _tile_clip_bounds(z, x, y)
+    hits = (
+        (bounds[:, 0] <= maxx) & (bounds[:, 2] >= minx)
+        & (bounds[:, 1] <= maxy) & (bounds[:, 3] >= miny)
+    )
+    return geocodes[hits].tolist()
+
+
+@lru_cache(maxsize=1)
+def _load_municipalities():
+    # Carregado uma vez por processo do pool de renderização
+    import geopandas as gpd
+    import pandas as pd
+
+    frames = [gpd.read_file(path) for path in _municipality_sources()]
+    if not frames:
+        raise TileServiceError("Nenhuma geometria municipal disponível para gerar tiles.")
+    gdf = frames[0] if len(frames) == 1 else gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), crs=frames[0].crs)
+
+    gdf = gdf.rename(columns={"id": "geocode"})[["geocode", "geometry"]]
+    gdf["geocode"] = gdf["geocode"].astype(str)
+    if gdf.crs is None:
+        gdf = gdf.set_crs(epsg=4326)
+    gdf = gdf.to_crs(epsg=3857)
+    # Malhas do IBGE trazem polígonos com auto-interseção; o recorte por tile exige geometrias válidas
+    gdf["geometry"] = gdf.geometry.make_valid()
+    # Força a construção do índice espacial agora, e não no primeiro tile
+    gdf.sindex
+    logger.info(f"Malha municipal carregada para tiles ({len(gdf)} municípios).")
+    return gdf
+
+
+def render_tile(z: int, x: int, y: int, data: Dict[str, dict]) -> bytes:
+
+    import mapbox_vector_tile
+    from shapely.geometry import box
+
+    gdf = _load_municipalities()
+    minx, miny, maxx, maxy = tile_bounds(z, x, y)
+    clip_box = box(*_tile_clip_bounds(z, x, y))
+
+    candidates = gdf.iloc[gdf.sindex.query(clip_box, predicate="intersects")]
+
+    # Tolerância de simplificação ~ meio pixel do grid MVT
+    tolerance = (maxx - minx) / MVT_EXTENT / 2
+
+    features = []
+    for geocode, geometry in zip(candidates["geocode"], candidates.geometry):
+        clipped = geometry.intersection(clip_box).simplify(tolerance, preserve_topology=True)
+        if clipped.is_empty:
+            continue
+
+        properties = {"geocode": geocode}
+        properties.update({k: v for k, v in data.get(geocode, {}).items() if v is not None})
+        features.append({"geometry": clipped, "properties": properties})
+
+    return mapbox_vector_tile.encode(
+        [{"name": MVT_LAYER_NAME, "features": features}],
+        default_options={
+            "quantize_bounds": (minx, miny, maxx, maxy),
+            "extents": MVT_EXTENT,
+        },
+    )
+
+
+async def _fetch_tile_data(db: AsyncSession, se: int) -> Dict[str, dict]:
+
+    stmt = tile_data_query(se)
+    result = await db.execute(stmt)
+    rows = result.fetchall()
+    await release_read_session(db)
+    return {
+        row.geocode: {
+            "alert_level": row.alert_level,
+            "reported_cases": row.reported_cases,
+            "incidence": row.incidence,
+            "growth_rate": row.growth_rate,
+            "incidence_ma3": row.incidence_ma3,
+        }
+        for row in rows
+    }
+
+
+# Dados por SE mantidos em memória (poucas SEs, LRU): a chave inclui a geração do cache de
+# leitura, que todo sync incrementa (nos outros processos, via NOTIFY), e a versão das tiles
+# da SE em disco, trocada assim que o sync invalida as tiles
+_tile_data_cache: "OrderedDict[Tuple[int, str, int], Dict[str, dict]]" = OrderedDict()
+_tile_data_flight = SingleFlight()
+
+
+async def _get_tile_data(db: AsyncSession, se: int, version: str) -> Dict[str, dict]:
+
+    key = (await cache_backend.get_generation(), version, se)
+    data = _tile_data_cache.get(key)
+    if data is not None:
+        _tile_data_cache.move_to_end(key)
+        return data
+
+    async def _load() -> Dict[str, dict]:
+        data = await _fetch_tile_data(db, se)
+        _tile_data_cache[key] = data
+        while len(_tile_data_cache) > settings.MVT_DATA_CACHE_SES:
+            _tile_data_cache.popitem(last=False)
+        return data
+
+    return await _tile_data_flight.do(key, _load)
+
+
+def _read_if_exists(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _read_tile_version(se: int) -> Optional[str]:
+    try:
+        with open(os.path.join(_tile_se_dir(se), TILE_VERSION_FILE), "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _tile_version(se: int) -> str:
+    # Versão atual das tiles da SE, criando uma nova se o diretório foi invalidado
+
+    version = _read_tile_version(se)
+    if version is not None:
+        return version
+
+    directory = _tile_se_dir(se)
+    os.makedirs(directory, exist_ok=True)
+    version = uuid.uuid4().hex
+    tmp_path = os.path.join(directory, f"{TILE_VERSION_FILE}.{os.getpid()}.{version}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    try:
+        # link falha se outro processo criou a versão antes: vale a dele
+        os.link(tmp_path, os.path.join(directory, TILE_VERSION_FILE))
+    except FileExistsError:
+        version = _read_tile_version(se) or version
+    finally:
+        os.unlink(tmp_path)
+    return version
+
+
+def _write_tile(se: int, version: str, path: str, content: bytes) -> bool:
+    # Grava a tile só se as tiles da SE não foram invalidadas durante a renderização
+    # (senão uma tile anterior ao sync voltaria ao disco e seria servida até a próxima invalidação)
+
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        if _read_tile_version(se) != version:
+            os.unlink(tmp_path)
+            return False
+        os.replace(tmp_path, path)
+        return True
+    except FileNotFoundError:
+        # Diretório removido por invalidate_tiles no meio da escrita
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        return False
+
+
+async def get_tile(db: AsyncSession, se: int, z: int, x: int, y: int) -> bytes:
+
+    if not 0 <= z <= settings.MVT_MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise TileServiceError(f"Tile inválido: {z}/{x}/{y}")
+
+    path = _tile_path(se, z, x, y)
+    cached = await asyncio.to_thread(_read_if_exists, path)
+    cache_requests_total.labels(cache="tile", result="miss" if cached is None else "hit").inc()
+    if cached is not None:
+        return cached
+
+    # Versão lida antes dos dados: se um sync invalidar a SE durante a renderização, a tile
+    # ainda é devolvida nesta resposta, mas não é gravada
+    version = await asyncio.to_thread(_tile_version, se)
+
+    # Só os municípios cujo bbox cruza o tile vão para o pool (e não o Brasil inteiro)
+    data = await _get_tile_data(db, se, version)
+    geocodes = await asyncio.to_thread(geocodes_in_tile, z, x, y)
+    tile_data = {geocode: data[geocode] for geocode in geocodes if geocode in data}
+
+    tile = await run_in_render_pool(render_tile, z, x, y, tile_data)
+    if not await asyncio.to_thread(_write_tile, se, version, path, tile):
+        logger.info(f"Tiles da SE {se} invalidadas durante a renderização de {z}/{x}/{y}; tile não gravada.")
+    return tile
+
+
+def invalidate_tiles(ses: Iterable[int]) -> None:
+
+    ses = set(ses)
+    for key in [key for key in _tile_data_cache if key[2] in ses]:
+        del _tile_data_cache[key]
+    for se in ses:
+        # rename atômico antes do rmtree: some junto com a versão, e uma escrita em andamento
+        # (caminhos dentro do diretório antigo) falha em vez de regravar uma tile antiga
+        directory = _tile_se_dir(se)
+        trash = f"{directory}.{os.getpid()}.{uuid.uuid4().hex}.deleted"
+        try:
+            os.rename(directory, trash)
+        except FileNotFoundError:
+            continue
+        shutil.rmtree(trash, ignore_errors=True)
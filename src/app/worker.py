@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.core.config import settings
+from app.core.scheduler import scheduled_sync_job, setup_scheduler, shutdown_scheduler
+from app.core.metrics import instrument_engine, register_pool_metrics, start_metrics_server
+from app.core.profiling import instrument_slow_queries
+from app.db.session import create_engine, create_session_factory
+from app.services.render_pool import shutdown_render_pool
+from app.services.sync_queue import consume_sync_queue
+from app.services.territory_registry import (
+    refresh_territory_registry, start_territory_listener, stop_territory_listener,
+)
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("sync_worker")
+
+
+async def main(run_now: bool = False, consumer_only: bool = False, consumers: int = None):
+
+    logger.info("--- INICIANDO WORKER DE SINCRONIZAÇÃO (InfoDengue) ---")
+
+    # Engine próprio, dimensionado para o ETL e independente do pool da API
+    engine = create_engine(settings.WORKER_DB_POOL_SIZE, settings.WORKER_DB_MAX_OVERFLOW)
+    session_factory = create_session_factory(engine)
+
+    metrics_server = None
+    if settings.METRICS_ENABLED:
+        instrument_engine(engine)
+        register_pool_metrics(engine, "worker")
+        if settings.METRICS_WORKER_PORT:
+            metrics_server = start_metrics_server(settings.METRICS_WORKER_PORT)
+    if settings.SLOW_QUERY_THRESHOLD_MS > 0:
+        instrument_slow_queries(engine)
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    await refresh_territory_registry(session_factory)
+    start_territory_listener(session_factory)
+
+    if not consumer_only:
+        setup_scheduler(session_factory)
+
+    # Consumidores da fila de shards (sync_tasks); cada processo/nó pode rodar vários
+    consumer_tasks = []
+    if settings.SYNC_EXECUTION_MODE == "queue" or consumer_only:
+        consumers = consumers if consumers is not None else settings.SYNC_QUEUE_CONSUMERS
+        consumer_tasks = [
+            asyncio.create_task(consume_sync_queue(session_factory, stop_event, consumer_id=i))
+            for i in range(consumers)
+        ]
+
+    if run_now and not consumer_only:
+        await scheduled_sync_job()
+
+    await stop_event.wait()
+
+    logger.info("Finalizando o worker de sincronização...")
+    # Shards em andamento são interrompidos; voltam para a fila quando o claim expirar
+    for task in consumer_tasks:
+        task.cancel()
+    await asyncio.gather(*consumer_tasks, return_exceptions=True)
+    if not consumer_only:
+        await shutdown_scheduler()
+    shutdown_render_pool()
+    await stop_territory_listener()
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    await engine.dispose()
+    logger.info("Worker finalizado.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker dedicado de sincronização do InfoDengue")
+    parser.add_argument("--run-now", action="store_true", help="Executa um sync imediatamente ao iniciar")
+    parser.add_argument("--consumer-only", action="store_true",
+                        help="Apenas consome a fila de shards (sem scheduler); para nós adicionais")
+    parser.add_argument("--consumers", type=int, default=None,
+                        help="Número de consumidores da fila neste processo (padrão: SYNC_QUEUE_CONSUMERS)")
+    args = parser.parse_args()
+
+    asyncio.run(main(run_now=args.run_now, consumer_only=args.consumer_only, consumers=args.consumers))
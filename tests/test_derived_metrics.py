@@ -0,0 +1,127 @@
+import math
+
+import pytest
+
+from app.core.epiweek import se_range
+from app.services.derived_metrics import compute_metrics
+
+
+def _compute(rows, start_se, end_se, output_start=None):
+    # rows: [(geocode, se, casos, população)]
+    geocodes, ses, cases, population = (list(col) for col in zip(*rows))
+    weeks = se_range(start_se, end_se)
+    return compute_metrics(geocodes, ses, cases, population, weeks, output_start or start_se)
+
+
+def _by_key(metrics):
+    return {
+        (se, geocode): {k: metrics[k][i] for k in ("incidence", "growth_rate", "cases_ma3", "incidence_ma3")}
+        for i, (se, geocode) in enumerate(zip(metrics["se"], metrics["geocode"]))
+    }
+
+
+def test_incidence_growth_and_moving_averages():
+    rows = [
+        ("2611606", 202540, 10, 100_000.0),
+        ("2611606", 202541, 20, 100_000.0),
+        ("2611606", 202542, 30, 100_000.0),
+    ]
+
+    result = _by_key(_compute(rows, 202540, 202542))
+
+    assert result[(202540, "2611606")] == {
+        "incidence": 10.0, "growth_rate": None, "cases_ma3": None, "incidence_ma3": None,
+    }
+    assert result[(202541, "2611606")]["growth_rate"] == pytest.approx(1.0)
+    week = result[(202542, "2611606")]
+    assert week["incidence"] == pytest.approx(30.0)
+    assert week["growth_rate"] == pytest.approx(0.5)
+    assert week["cases_ma3"] == pytest.approx(20.0)
+    assert week["incidence_ma3"] == pytest.approx(20.0)
+
+
+def test_missing_week_becomes_null_not_zero():
+    # SE 202541 ausente: variação da 202542 e médias de 3 semanas que a incluem ficam nulas
+    rows = [
+        ("2611606", 202540, 10, 100_000.0),
+        ("2611606", 202542, 30, 100_000.0),
+        ("2611606", 202543, 40, 100_000.0),
+        ("2611606", 202544, 50, 100_000.0),
+    ]
+
+    result = _by_key(_compute(rows, 202540, 202544))
+
+    assert (202541, "2611606") not in result
+    assert result[(202542, "2611606")]["growth_rate"] is None
+    assert result[(202542, "2611606")]["cases_ma3"] is None
+    assert result[(202543, "2611606")]["growth_rate"] == pytest.approx(1 / 3)
+    assert result[(202543, "2611606")]["cases_ma3"] is None
+    assert result[(202544, "2611606")]["cases_ma3"] == pytest.approx(40.0)
+
+
+def test_previous_week_with_zero_cases_has_no_growth_rate():
+    rows = [
+        ("2611606", 202540, 0, 100_000.0),
+        ("2611606", 202541, 12, 100_000.0),
+    ]
+
+    result = _by_key(_compute(rows, 202540, 202541))
+
+    assert result[(202541, "2611606")]["growth_rate"] is None
+    assert result[(202541, "2611606")]["incidence"] == pytest.approx(12.0)
+
+
+def test_unknown_cases_or_population_are_null():
+    rows = [
+        ("2611606", 202540, None, 100_000.0),
+        ("2607901", 202540, 5, 0.0),
+        ("2600054", 202540, 5, None),
+    ]
+
+    result = _by_key(_compute(rows, 202540, 202540))
+
+    # Sem casos não há linha; população zero/desconhecida deixa a incidência nula
+    assert (202540, "2611606") not in result
+    assert result[(202540, "2607901")]["incidence"] is None
+    assert result[(202540, "2600054")]["incidence"] is None
+
+
+def test_year_boundary_uses_epidemiological_calendar():
+    # 2025 tem 53 semanas: a SE anterior a 202601 é 202553, e não 202552
+    rows = [
+        ("2611606", 202552, 10, 100_000.0),
+        ("2611606", 202553, 20, 100_000.0),
+        ("2611606", 202601, 40, 100_000.0),
+    ]
+
+    result = _by_key(_compute(rows, 202552, 202601))
+
+    week = result[(202601, "2611606")]
+    assert week["growth_rate"] == pytest.approx(1.0)
+    assert week["cases_ma3"] == pytest.approx(70 / 3)
+
+
+def test_only_weeks_from_output_start_are_returned():
+    rows = [
+        ("2611606", 202452, 10, 100_000.0),
+        ("2611606", 202501, 20, 100_000.0),
+        ("2611606", 202502, 30, 100_000.0),
+    ]
+
+    metrics = _compute(rows, 202452, 202502, output_start=202501)
+
+    assert sorted(metrics["se"]) == [202501, 202502]
+    result = _by_key(metrics)
+    # O histórico anterior a output_start entra no cálculo, mas não é devolvido
+    assert result[(202501, "2611606")]["growth_rate"] == pytest.approx(1.0)
+    assert result[(202502, "2611606")]["cases_ma3"] == pytest.approx(20.0)
+
+
+def test_values_are_plain_floats_without_nan():
+    rows = [("2611606", 202540, 10, 100_000.0), ("2607901", 202541, 3, 50_000.0)]
+
+    metrics = _compute(rows, 202540, 202541)
+
+    for column in ("incidence", "growth_rate", "cases_ma3", "incidence_ma3"):
+        for value in metrics[column]:
+            assert value is None or (isinstance(value, float) and not math.isnan(value))
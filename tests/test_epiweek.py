@@ -0,0 +1,70 @@
+from datetime import date
+
+import pytest
+
+from app.core.epiweek import (
+    current_se, epiweek_start, se_date_range, se_label, se_of, se_range, shift_se, sync_window,
+    weeks_in_year,
+)
+
+
+def test_first_week_of_2025_starts_in_december_2024():
+    assert epiweek_start(2025, 1) == date(2024, 12, 29)
+    assert se_date_range(202501) == (date(2024, 12, 29), date(2025, 1, 4))
+    assert se_of(date(2024, 12, 29)) == 202501
+    assert se_of(date(2024, 12, 28)) == 202452
+
+
+def test_week_starts_on_sunday_and_ends_on_saturday():
+    start, end = se_date_range(202545)
+    assert start.weekday() == 6
+    assert end.weekday() == 5
+    assert se_of(start) == se_of(end) == 202545
+
+
+@pytest.mark.parametrize("year", [2014, 2020, 2025])
+def test_years_with_53_weeks(year):
+    assert weeks_in_year(year) == 53
+    assert se_of(se_date_range(year * 100 + 53)[1]) == year * 100 + 53
+    assert shift_se(year * 100 + 53, 1) == (year + 1) * 100 + 1
+
+
+@pytest.mark.parametrize("year", [2019, 2023, 2024, 2026])
+def test_years_with_52_weeks(year):
+    assert weeks_in_year(year) == 52
+    with pytest.raises(ValueError):
+        se_date_range(year * 100 + 53)
+
+
+def test_shift_se_crosses_year_boundary():
+    assert shift_se(202501, -1) == 202452
+    assert shift_se(202452, 1) == 202501
+    assert shift_se(202601, -1) == 202553
+    assert shift_se(202510, -10) == 202452
+    assert shift_se(202545, 0) == 202545
+
+
+def test_se_range_is_contiguous_across_years():
+    assert se_range(202551, 202602) == [202551, 202552, 202553, 202601, 202602]
+
+
+def test_sync_window_in_early_january():
+    # 05/01/2026 cai na SE 202601; 8 semanas antes atravessa a SE 53 de 2025
+    assert sync_window(8, date(2026, 1, 5)) == {"ew_start": 46, "ey_start": 2025, "ew_end": 1, "ey_end": 2026}
+    # 02/01/2025 já é SE 202501 (começou em 29/12/2024)
+    assert sync_window(8, date(2025, 1, 2)) == {"ew_start": 45, "ey_start": 2024, "ew_end": 1, "ey_end": 2025}
+
+
+def test_current_se_uses_given_day():
+    assert current_se(date(2026, 1, 3)) == 202553
+
+
+def test_invalid_week_raises():
+    with pytest.raises(ValueError):
+        se_date_range(202500)
+    with pytest.raises(ValueError):
+        shift_se(189001, 0)
+
+
+def test_se_label():
+    assert se_label(202501) == "SE 01/2025 (29/12 a 04/01)"
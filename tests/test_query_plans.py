@@ -0,0 +1,131 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Planos reais (EXPLAIN ANALYZE, BUFFERS) das queries de report_queries.py contra o banco de
+# DATABASE_URL. Pulado sem banco acessível ou com weekly_reports vazio; para semear um banco
+# dedicado: python benchmarks/plan_check.py --synthetic-territories 5570 --seed-years 3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+CONNECT_TIMEOUT_SECONDS = 2
+
+# Queries de uma única SE: no máximo uma linha por município na partição daquela SE
+SINGLE_SE_QUERIES = ("reports_by_se", "by_state", "map_choropleth", "map_city",
+                     "by_state_incidence", "map_city_growth", "tile_data")
+
+# Buffers por SE candidata na listagem do dashboard (descida no btree de uma partição)
+DASHBOARD_BUFFERS_PER_PROBE = 5
+
+
+def _database_available() -> bool:
+
+    import asyncpg
+    from app.core.pg_events import asyncpg_dsn
+
+    async def probe():
+        conn = await asyncpg.connect(asyncpg_dsn(), timeout=CONNECT_TIMEOUT_SECONDS)
+        await conn.close()
+
+    try:
+        asyncio.run(probe())
+    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError):
+        return False
+    return True
+
+
+async def _collect_plans() -> dict:
+
+    from sqlalchemy import func, select, text
+    from app.db.session import AsyncSessionFactory, engine
+    from app.models.models import Territory, WeeklyReport
+    from app.services.partitions import list_partition_years
+    from app.services.territory_registry import ensure_territory_registry
+    from plans import explain, query_cases
+
+    try:
+        async with AsyncSessionFactory() as session:
+            if await session.scalar(select(WeeklyReport.id).limit(1)) is None:
+                return {}
+
+        # Visibility map atualizado, como em plan_check.py
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("VACUUM (ANALYZE) weekly_reports"))
+
+        async with AsyncSessionFactory() as session:
+            se = await session.scalar(select(func.max(WeeklyReport.se)))
+            geocode = await session.scalar(select(WeeklyReport.geocode).where(WeeklyReport.se == se).limit(1))
+            state_code = await session.scalar(select(Territory.state_code).where(Territory.geocode == geocode))
+            await ensure_territory_registry(session)
+
+            context = {
+                "territories": await session.scalar(select(func.count()).select_from(Territory)),
+                "ses": await session.scalar(select(func.count(WeeklyReport.se.distinct()))),
+                "years": await session.scalar(
+                    select(func.max(WeeklyReport.se) / 100 - func.min(WeeklyReport.se) / 100 + 1)
+                ),
+                "partitions": len(await list_partition_years(session)),
+                "plans": {},
+            }
+            for name, stmt in query_cases(se, state_code, geocode).items():
+                context["plans"][name] = await explain(session, stmt)
+            await session.rollback()
+        return context
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def plans():
+
+    if not _database_available():
+        pytest.skip("banco de DATABASE_URL inacessível")
+    context = asyncio.run(_collect_plans())
+    if not context:
+        pytest.skip("weekly_reports vazio")
+    return context
+
+
+def test_no_seq_scan_and_expected_access(plans):
+
+    from plan_check import check_plan
+
+    results = {name: check_plan(name, plan) for name, plan in plans["plans"].items()}
+    assert {name: r for name, r in results.items() if r[0] != "ok"} == {}
+
+
+@pytest.mark.parametrize("name", SINGLE_SE_QUERIES)
+def test_single_se_queries_read_one_partition(plans, name):
+
+    from plan_check import rows_read, weekly_report_scans
+
+    plan = plans["plans"][name]
+    executed = {n["relation"] for n in weekly_report_scans(plan) if n["loops"]}
+    assert len(executed) == 1
+    assert rows_read(plan) <= plans["territories"]
+
+
+def test_range_queries_row_budget(plans):
+
+    from plan_check import rows_read
+
+    # reports_by_state_range cobre 5 SEs; reports_latest acha a SE máxima com uma sonda por partição
+    assert rows_read(plans["plans"]["reports_by_state_range"]) <= 5 * plans["territories"]
+    assert rows_read(plans["plans"]["reports_latest"]) <= plans["territories"] + plans["partitions"]
+    assert rows_read(plans["plans"]["reports_by_geocode"]) <= plans["ses"]
+
+
+def test_dashboard_ses_probes_instead_of_scanning_the_index(plans):
+
+    from plan_check import rows_read
+
+    plan = plans["plans"]["dashboard_ses"]
+    # Uma entrada por SE com dados, mais as duas sondas de min/max por partição
+    assert rows_read(plan) <= plans["ses"] + 2 * plans["partitions"]
+
+    candidates = 53 * plans["years"]
+    buffers = plan["shared_hit_blocks"] + plan["shared_read_blocks"]
+    assert buffers <= DASHBOARD_BUFFERS_PER_PROBE * (candidates + 2 * plans["partitions"])
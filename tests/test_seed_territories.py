@@ -0,0 +1,68 @@
+from app.scripts.seed_territories import diff_territories
+
+
+CURRENT = {
+    "2611606": ("Recife", 26),
+    "2607901": ("Jaboatão dos Guararapes", 26),
+    "3550308": ("São Paulo", 35),
+}
+
+
+def test_identical_rows_are_unchanged():
+    incoming = [(geocode, name, state_code) for geocode, (name, state_code) in CURRENT.items()]
+
+    diff = diff_territories(incoming, CURRENT)
+
+    assert diff == {"inserts": [], "updates": [], "missing": [], "unchanged": 3}
+
+
+def test_new_geocode_is_inserted():
+    incoming = [
+        ("2611606", "Recife", 26),
+        ("2607901", "Jaboatão dos Guararapes", 26),
+        ("3550308", "São Paulo", 35),
+        ("2600054", "Abreu e Lima", 26),
+    ]
+
+    diff = diff_territories(incoming, CURRENT)
+
+    assert diff["inserts"] == [("2600054", "Abreu e Lima", 26)]
+    assert diff["updates"] == []
+    assert diff["unchanged"] == 3
+
+
+def test_rename_and_state_change_are_updates_with_previous_values():
+    incoming = [
+        ("2611606", "Recife", 26),
+        ("2607901", "Jaboatão", 26),
+        ("3550308", "São Paulo", 33),
+    ]
+
+    diff = diff_territories(incoming, CURRENT)
+
+    assert diff["inserts"] == []
+    assert diff["updates"] == [
+        (("2607901", "Jaboatão", 26), ("Jaboatão dos Guararapes", 26)),
+        (("3550308", "São Paulo", 33), ("São Paulo", 35)),
+    ]
+    assert diff["unchanged"] == 1
+
+
+def test_geocodes_missing_from_csv_are_reported_not_deleted():
+    incoming = [("2611606", "Recife", 26)]
+
+    diff = diff_territories(incoming, CURRENT)
+
+    assert diff["missing"] == ["2607901", "3550308"]
+    assert diff["inserts"] == [] and diff["updates"] == []
+    assert diff["unchanged"] == 1
+
+
+def test_empty_table_inserts_everything():
+    incoming = [("2611606", "Recife", 26), ("3550308", "São Paulo", 35)]
+
+    diff = diff_territories(incoming, {})
+
+    assert diff["inserts"] == incoming
+    assert diff["missing"] == []
+    assert diff["unchanged"] == 0